@@ -0,0 +1,238 @@
+import heapq
+import os
+import select
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from database import SessionLocal, engine
+from models import OrdemServico
+
+# ⚙️ Varredura de segurança mesmo sem prazos agendados (cobre alterações fora do bot)
+INTERVALO_SEGURANCA = int(os.getenv("SLA_VARREDURA_SEGURANCA", "21600"))
+# Recarga completa dos prazos: rede de segurança, já que os de outras réplicas
+# (lideranca.py) chegam na hora pelo canal CANAL_PRAZOS
+INTERVALO_RESSEMEAR = int(os.getenv("SLA_RESSEMEAR", "1800"))
+# NOTIFY com o thread_ts de cada chamado cujo prazo mudou (trigger da migração 9)
+CANAL_PRAZOS = "prazos_sla"
+ESPERA_RECONEXAO = 5
+
+
+# ⏰ Agendador de SLA orientado a prazos (min-heap de sla_limite)
+# sla_limite é gravado em UTC (datetime.utcnow() em nova_ordem_servico), então o
+# heap é comparado com utcnow(); com now() os prazos disparariam deslocados do
+# fuso do host.
+class AgendadorSLA:
+    def __init__(self):
+        self._heap = []  # (sla_limite, thread_ts)
+        self._prazos = {}  # thread_ts -> sla_limite vigente
+        self._cond = threading.Condition()
+        self._thread = None
+        self._parar = False
+        self._ativo = False
+        self._varredura = None
+        self._ouvinte = None
+        self._parar_ouvinte = threading.Event()
+        self.avisos = 0
+
+    def agendar(self, thread_ts, sla_limite):
+        if not thread_ts or not sla_limite:
+            return
+        with self._cond:
+            # Fora do líder não há loop para consumir o heap; o líder recarrega do banco
+            if not self._ativo:
+                return
+            if self._prazos.get(thread_ts) == sla_limite:
+                return
+            self._prazos[thread_ts] = sla_limite
+            heapq.heappush(self._heap, (sla_limite, thread_ts))
+            # Só acorda o loop se o novo prazo vira o próximo
+            if self._heap[0] == (sla_limite, thread_ts):
+                self._cond.notify()
+
+    def remover(self, thread_ts):
+        # Remoção preguiçosa: a entrada antiga é descartada quando chegar ao topo
+        with self._cond:
+            self._prazos.pop(thread_ts, None)
+
+    def proximo_prazo(self):
+        with self._cond:
+            self._descartar_obsoletos()
+            return self._heap[0][0] if self._heap else None
+
+    def pendentes(self):
+        with self._cond:
+            return len(self._prazos)
+
+    def _descartar_obsoletos(self):
+        while self._heap and self._prazos.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    @staticmethod
+    def _consultar(thread_ts=None):
+        db = SessionLocal()
+        try:
+            q = db.query(OrdemServico.thread_ts, OrdemServico.sla_limite).filter(
+                OrdemServico.status.in_(["aberto", "em análise"]),
+                OrdemServico.sla_status == "dentro do prazo",
+                OrdemServico.sla_limite.isnot(None),
+                OrdemServico.thread_ts.isnot(None)
+            )
+            if thread_ts is not None:
+                q = q.filter(OrdemServico.thread_ts.in_(thread_ts))
+            return q.all()
+        finally:
+            db.close()
+
+    # 🌱 Carrega os prazos dos chamados ainda dentro do prazo
+    def semear(self):
+        linhas = self._consultar()
+
+        with self._cond:
+            if not self._ativo:
+                return 0
+            self._heap = [(sla_limite, ts) for ts, sla_limite in linhas]
+            heapq.heapify(self._heap)
+            self._prazos = {ts: sla_limite for ts, sla_limite in linhas}
+            self._cond.notify()
+        return len(linhas)
+
+    # 🔔 Relê só os chamados avisados: agenda os que seguem no prazo, tira os demais
+    def recarregar(self, thread_ts):
+        prazos = dict(self._consultar(list(thread_ts)))
+        for ts in thread_ts:
+            if ts in prazos:
+                self.agendar(ts, prazos[ts])
+            else:
+                self.remover(ts)
+
+    def iniciar(self, varredura):
+        if self._thread and self._thread.is_alive():
+            return
+        self._varredura = varredura
+        with self._cond:
+            self._parar = False
+            self._ativo = True
+        # No Postgres a carga inicial sai do _ouvir, já depois do LISTEN: assim
+        # nenhum prazo alterado entre a carga e a escuta se perde
+        if engine.dialect.name != "postgresql":
+            self._semear_inicial()
+        self._thread = threading.Thread(target=self._loop, name="agendador-sla", daemon=True)
+        self._thread.start()
+        if engine.dialect.name == "postgresql":
+            self._parar_ouvinte.clear()
+            self._ouvinte = threading.Thread(target=self._ouvir, name="agendador-sla-listen", daemon=True)
+            self._ouvinte.start()
+
+    def _semear_inicial(self):
+        try:
+            total = self.semear()
+            print(f"⏰ Agendador de SLA iniciado com {total} prazo(s) pendente(s).")
+        except Exception as e:
+            print(f"❌ Erro ao carregar prazos de SLA: {e}")
+
+    def parar(self):
+        self._parar_ouvinte.set()
+        with self._cond:
+            self._parar = True
+            self._ativo = False
+            self._heap = []
+            self._prazos = {}
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=30)
+        if self._ouvinte:
+            self._ouvinte.join(timeout=5)
+
+    # 👂 LISTEN numa conexão dedicada (fora do pool). A primeira conexão faz a
+    # carga inicial; cada reconexão recarrega tudo, porque os avisos enviados
+    # enquanto ninguém escutava se perderam.
+    def _ouvir(self):
+        from lideranca import KEEPALIVE
+
+        motor = create_engine(engine.url, poolclass=NullPool, connect_args=KEEPALIVE)
+        primeira = True
+        while not self._parar_ouvinte.is_set():
+            bruta = None
+            try:
+                bruta = motor.raw_connection()
+                conexao = bruta.connection
+                conexao.autocommit = True
+                conexao.cursor().execute(f"LISTEN {CANAL_PRAZOS}")
+                if primeira:
+                    primeira = False
+                    self._semear_inicial()
+                else:
+                    self.semear()
+                while not self._parar_ouvinte.is_set():
+                    if select.select([conexao], [], [], 1.0)[0]:
+                        conexao.poll()
+                    avisados = {n.payload for n in conexao.notifies}
+                    conexao.notifies.clear()
+                    if avisados:
+                        self.avisos += len(avisados)
+                        self.recarregar(avisados)
+            except Exception as e:
+                print(f"❌ Erro ao escutar prazos de SLA: {e}")
+                self._parar_ouvinte.wait(ESPERA_RECONEXAO)
+            finally:
+                if bruta is not None:
+                    try:
+                        bruta.close()
+                    except Exception:
+                        pass
+        motor.dispose()
+
+    def _loop(self):
+        # Varredura inicial pega o que venceu enquanto o bot estava fora
+        self._executar_varredura()
+        ultima_varredura = ultima_semeadura = time.monotonic()
+        while True:
+            with self._cond:
+                while not self._parar:
+                    self._descartar_obsoletos()
+                    agora = datetime.utcnow()
+                    if self._heap and self._heap[0][0] <= agora:
+                        break
+                    espera = min(
+                        INTERVALO_SEGURANCA - (time.monotonic() - ultima_varredura),
+                        INTERVALO_RESSEMEAR - (time.monotonic() - ultima_semeadura),
+                    )
+                    if espera <= 0:
+                        break
+                    if self._heap:
+                        espera = min(espera, (self._heap[0][0] - agora).total_seconds())
+                    self._cond.wait(timeout=max(espera, 0.05))
+                if self._parar:
+                    return
+                vencidos = self._retirar_vencidos(datetime.utcnow())
+            if time.monotonic() - ultima_semeadura >= INTERVALO_RESSEMEAR:
+                try:
+                    self.semear()
+                except Exception as e:
+                    print(f"❌ Erro ao recarregar prazos de SLA: {e}")
+                ultima_semeadura = time.monotonic()
+            if vencidos or time.monotonic() - ultima_varredura >= INTERVALO_SEGURANCA:
+                self._executar_varredura()
+                ultima_varredura = time.monotonic()
+
+    def _retirar_vencidos(self, agora):
+        retirados = 0
+        while self._heap and self._heap[0][0] <= agora:
+            sla_limite, ts = heapq.heappop(self._heap)
+            if self._prazos.get(ts) == sla_limite:
+                del self._prazos[ts]
+                retirados += 1
+        return retirados
+
+    def _executar_varredura(self):
+        try:
+            self._varredura()
+        except Exception as e:
+            print(f"❌ Erro na varredura de SLA: {e}")
+
+
+agendador = AgendadorSLA()
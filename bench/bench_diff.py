@@ -0,0 +1,107 @@
+# 📊 Micro-benchmark do diff de campos: DeepDiff x diff_campos
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.bench_diff
+#   python -m bench.bench_diff --repeticoes 50000
+#
+# Mede µs por chamada do log de reabertura (implementação anterior com
+# DeepDiff x services.log_reabertura) e do diff da edição. O deepdiff saiu do
+# requirements.txt; sem ele instalado, só o diff_campos é medido.
+import argparse
+import importlib.util
+import json
+import os
+import timeit
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import diff_campos  # noqa: E402
+import services  # noqa: E402
+
+ANTES_REABERTURA = {
+    "tipo_ticket": "Reserva",
+    "status": "fechado",
+    "responsavel": "U000RESP01",
+    "data_captura": datetime(2024, 5, 2, 9, 30),
+    "data_fechamento": datetime(2024, 5, 3, 18, 0),
+}
+DEPOIS_REABERTURA = {
+    "tipo_ticket": "Prorrogação",
+    "status": "aberto",
+    "responsavel": None,
+    "data_captura": None,
+    "data_fechamento": None,
+}
+ANTES_EDICAO = {
+    "tipo_contrato": "Temporada",
+    "locatario": "Fulano de Tal",
+    "moradores": "Fulano, Ciclana",
+    "empreendimento": "JFL125",
+    "unidade_metragem": "101 - 35m²",
+    "valor_locacao": "4500.00",
+}
+DEPOIS_EDICAO = dict(ANTES_EDICAO, locatario="Fulano de Tal Jr.", valor_locacao="4800.00")
+
+
+# 🐢 Implementação anterior do log de reabertura
+def log_reabertura_deepdiff(antes, depois):
+    from deepdiff import DeepDiff
+
+    estado_anterior = {c: antes[c] for c in services.CAMPOS_REABERTURA}
+    estado_novo = {c: depois[c] for c in services.CAMPOS_REABERTURA}
+    diferencas = DeepDiff(estado_anterior, estado_novo, ignore_order=True).to_dict()
+    log = ""
+    if "values_changed" in diferencas:
+        for campo, detalhe in diferencas["values_changed"].items():
+            campo_nome = campo.split("['")[-1].replace("']", "")
+            log += f"• {campo_nome}: '{detalhe['old_value']}' ➝ '{detalhe['new_value']}'\n"
+    return log
+
+
+def alteracoes_deepdiff(antes, depois):
+    from deepdiff import DeepDiff
+
+    diferencas = DeepDiff(antes, depois, ignore_order=True).to_dict()
+    return {
+        campo.split("['")[-1].replace("']", ""): [d["old_value"], d["new_value"]]
+        for campo, d in diferencas.get("values_changed", {}).items()
+    }
+
+
+CASOS = {
+    "reabertura": (
+        lambda: log_reabertura_deepdiff(ANTES_REABERTURA, DEPOIS_REABERTURA),
+        lambda: services.log_reabertura(ANTES_REABERTURA, DEPOIS_REABERTURA),
+    ),
+    "edicao": (
+        lambda: alteracoes_deepdiff(ANTES_EDICAO, DEPOIS_EDICAO),
+        lambda: diff_campos.como_dict(diff_campos.diferencas(ANTES_EDICAO, DEPOIS_EDICAO, services.CAMPOS_EDICAO)),
+    ),
+}
+
+
+def medir(funcao, repeticoes):
+    return round(min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    com_deepdiff = importlib.util.find_spec("deepdiff") is not None
+    saida = {}
+    for nome, (antigo, novo) in CASOS.items():
+        resultado = {"diff_campos_us": medir(novo, args.repeticoes), "saida": novo()}
+        if com_deepdiff:
+            # DeepDiff é ordens de grandeza mais lento; menos repetições bastam
+            resultado["deepdiff_us"] = medir(antigo, max(1, args.repeticoes // 20))
+            resultado["deepdiff_saida"] = antigo()
+            resultado["aceleracao"] = round(resultado["deepdiff_us"] / max(resultado["diff_campos_us"], 1e-9), 1)
+        saida[nome] = resultado
+    print(json.dumps(saida, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# 📊 Micro-benchmark de renderização das views Block Kit
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.bench_templates
+#   python -m bench.bench_templates --repeticoes 50000
+#
+# Compara, para cada view, a montagem completa a cada chamada (construir_*,
+# o custo antigo) com a renderização a partir do registro pré-montado
+# (render_* / constantes). Mede µs por render e blocos de memória alocados.
+import argparse
+import json
+import timeit
+import tracemalloc
+
+import templates
+
+TS = "1718000000.000100"
+TEXTO = "(Fulano de Tal) - JFL125 - 101 - *Reserva:* 123 <@U000>: *Reserva*"
+
+CASOS = {
+    "abertura": (
+        templates.construir_view_abertura,
+        lambda: templates.VIEW_ABERTURA,
+    ),
+    "exportacao": (
+        lambda: templates.construir_view_exportacao("U000"),
+        lambda: templates.render_view_exportacao("U000"),
+    ),
+    "reabertura": (
+        lambda: templates.construir_view_reabertura(TS),
+        lambda: templates.render_view_reabertura(TS),
+    ),
+    "cancelamento": (
+        lambda: templates.construir_view_cancelamento(TS),
+        lambda: templates.render_view_cancelamento(TS),
+    ),
+    "mensagem_chamado": (
+        lambda: [{"type": "section", "text": {"type": "mrkdwn", "text": TEXTO}},
+                 templates.construir_botoes(editavel=True)],
+        lambda: templates.render_mensagem_chamado(TEXTO, editavel=True),
+    ),
+}
+
+
+def medir(funcao, repeticoes):
+    us = min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1e6
+
+    # Mantém os resultados vivos para contar o que cada render aloca
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    resultados = [funcao() for _ in range(1000)]
+    depois = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = sum(s.size_diff for s in depois.compare_to(antes, "filename"))
+    del resultados
+    return {"us_por_render": round(us, 3), "bytes_por_render": round(diff / 1000)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    saida = {}
+    for nome, (construir, renderizar) in CASOS.items():
+        antigo = medir(construir, args.repeticoes)
+        novo = medir(renderizar, args.repeticoes)
+        saida[nome] = {
+            "construir": antigo,
+            "render": novo,
+            "aceleracao": round(antigo["us_por_render"] / max(novo["us_por_render"], 1e-9), 1),
+        }
+    print(json.dumps(saida, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
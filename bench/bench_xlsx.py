@@ -0,0 +1,133 @@
+# 📊 Benchmark do exportador Excel: Workbook normal x write-only
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.bench_xlsx                 # 10k, 100k e 500k linhas
+#   python -m bench.bench_xlsx --linhas 10000
+#
+# Cada combinação roda num subprocesso separado para que o pico de RSS
+# (ru_maxrss) reflita apenas aquela implementação.
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+TAMANHOS_PADRAO = [10_000, 100_000, 500_000]
+IMPLEMENTACOES = ["atual", "write_only"]
+
+
+def gerar_linhas(n, semente=42):
+    rnd = random.Random(semente)
+    base = date(2024, 1, 1)
+    tipos = ["Lista de Espera", "Pré bloqueio", "Reserva", "Aditivo", "Prorrogação"]
+    empreendimentos = ["JFL125", "JML747", "VO699", "VHOUSE", "AVNU"]
+    status = ["aberto", "em análise", "fechado", "cancelado"]
+    for i in range(n, 0, -1):
+        abertura = base + timedelta(days=rnd.randint(0, 600))
+        yield [
+            i,
+            rnd.choice(tipos),
+            "–",
+            f"Locatário {rnd.randint(1, 5000)}",
+            "–",
+            rnd.choice(empreendimentos),
+            f"{rnd.randint(1, 300)}",
+            "–",
+            "–",
+            "–",
+            f"Responsável {rnd.randint(1, 6)}",
+            f"Responsável {rnd.randint(1, 6)}",
+            f"Solicitante {rnd.randint(1, 40)}",
+            rnd.choice(status),
+            abertura.strftime("%d/%m/%Y"),
+            rnd.choice(["dentro do prazo", "fora do prazo"]),
+            "–",
+        ]
+
+
+# 🐢 Implementação anterior (Workbook normal mantendo todas as células)
+def escrever_xlsx_atual(linhas, destino):
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
+    from relatorio_xlsx import CABECALHO_XLSX
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Chamados"
+    ws.append(CABECALHO_XLSX)
+
+    bold = Font(bold=True)
+    center = Alignment(horizontal="center", vertical="center")
+    for col_num, _ in enumerate(CABECALHO_XLSX, 1):
+        cell = ws.cell(row=1, column=col_num)
+        cell.font = bold
+        cell.alignment = center
+        ws.column_dimensions[get_column_letter(col_num)].width = 18
+
+    for linha in linhas:
+        ws.append(linha)
+    wb.save(destino)
+
+
+def executar_caso(implementacao, n):
+    from relatorio_xlsx import escrever_xlsx
+
+    escritor = escrever_xlsx_atual if implementacao == "atual" else escrever_xlsx
+    with tempfile.TemporaryDirectory() as pasta:
+        destino = os.path.join(pasta, "bench.xlsx")
+        inicio = time.perf_counter()
+        escritor(gerar_linhas(n), destino)
+        duracao = time.perf_counter() - inicio
+        tamanho = os.path.getsize(destino)
+
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    pico_mb = pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    return {
+        "implementacao": implementacao,
+        "linhas": n,
+        "segundos": round(duracao, 3),
+        "linhas_por_segundo": round(n / duracao, 1) if duracao else None,
+        "pico_rss_mb": round(pico_mb, 1),
+        "arquivo_bytes": tamanho,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do exportador Excel")
+    parser.add_argument("--linhas", type=int, action="append")
+    parser.add_argument("--implementacao", choices=IMPLEMENTACOES, action="append")
+    parser.add_argument("--caso", nargs=2, metavar=("IMPL", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        print(json.dumps(executar_caso(args.caso[0], int(args.caso[1]))))
+        return
+
+    resultados = []
+    for n in args.linhas or TAMANHOS_PADRAO:
+        for impl in args.implementacao or IMPLEMENTACOES:
+            saida = subprocess.run(
+                [sys.executable, "-m", "bench.bench_xlsx", "--caso", impl, str(n)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            resultado = json.loads(saida.strip().splitlines()[-1])
+            resultados.append(resultado)
+            print(
+                f"{impl:>11} | {n:>7} linhas | {resultado['segundos']:>8.2f}s | "
+                f"{resultado['linhas_por_segundo']:>10.0f} linhas/s | {resultado['pico_rss_mb']:>7.1f} MB",
+                file=sys.stderr,
+            )
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# 🚦 Gerador de carga: payloads sintéticos do Slack despachados no App do main.py
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.carga                                   # concorrência 1, 4, 16 e 64
+#   python -m bench.carga --concorrencia 8 --concorrencia 32 --requisicoes 2000
+#   python -m bench.carga --latencia-slack 80 --sem-limite-slack --saida carga.json
+#
+# Comandos, cliques em botões de threads existentes e envios dos modais
+# (abertura, edição, cancelamento, reabertura) entram por app.dispatch() como
+# no Socket Mode, de N threads em paralelo. A Web API é um servidor HTTP local
+# (SLACK_API_URL), com latência configurável.
+#
+# Por listener: vazão, latência até o ack (vista por quem despachou) e duração
+# total do listener (p50/p95/p99). O banco segue BENCH_DATABASE_URL como em
+# bench/executar.py; em SQLite as escritas concorrentes serializam no arquivo,
+# então números de escala só valem em Postgres.
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import dados
+
+CONCORRENCIAS_PADRAO = [1, 4, 16, 64]
+CANAL = "CBENCH0001"
+TIME = "TBENCH"
+SEM_LIMITE = (1e9, 1e9)
+
+# tipo de payload -> (peso no mix, listener que o atende)
+MIX = {
+    "comando_abertura": (10, "handle_chamado_command"),
+    "comando_lista": (10, "handle_meus_chamados"),
+    "comando_exportar": (3, "handle_exportar_command"),
+    "comando_sla": (2, "handle_sla_command"),
+    "filtro_lista": (5, "handle_lista"),
+    "abertura": (15, "handle_modal_submission"),
+    "capturar": (15, "handle_capturar"),
+    "finalizar": (12, "handle_finalizar"),
+    "botao_reabrir": (3, "handle_reabrir"),
+    "botao_editar": (5, "handle_editar"),
+    "botao_cancelar": (3, "handle_cancelar"),
+    "reabrir": (5, "handle_reabrir_submit"),
+    "editar": (10, "handle_editar_submit"),
+    "cancelar": (4, "handle_cancelar_submit"),
+}
+# Usam UPDATE ... RETURNING (transicoes.py), gravam em ordens_servico_eventos
+# (JSONB) ou leem os resumos de SLA; só rodam em Postgres
+TIPOS_POSTGRES = {"capturar", "finalizar", "reabrir", "cancelar", "editar", "comando_sla"}
+
+
+def percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 1)
+
+
+# 🧾 Payloads no formato que o Socket Mode entrega ao Bolt
+class GeradorPayloads:
+    def __init__(self, engine, response_url, semente=7):
+        from sqlalchemy import text
+
+        self.rnd = random.Random(semente)
+        self.response_url = response_url
+        self._seq = 0
+        with engine.connect() as conn:
+            linhas = conn.execute(text("SELECT status, thread_ts, solicitante FROM ordens_servico")).all()
+        self.por_status = defaultdict(list)
+        for status, ts, _ in linhas:
+            self.por_status[status].append(ts)
+        for lista in self.por_status.values():
+            self.rnd.shuffle(lista)
+        self.todos = [ts for _, ts, _ in linhas]
+        self.solicitantes = sorted({s for _, _, s in linhas})
+
+    def _trigger(self):
+        self._seq += 1
+        return f"{self._seq}.bench.trigger"
+
+    def _usuario(self):
+        return self.rnd.choice(self.solicitantes)
+
+    # Cada clique consome um chamado no status certo; sem estoque, cai num
+    # qualquer (o listener responde com o aviso de status inválido)
+    def _ts(self, *status):
+        for s in status:
+            if self.por_status[s]:
+                return self.por_status[s].pop()
+        return self.rnd.choice(self.todos)
+
+    def _comando(self, comando):
+        return {
+            "command": comando, "text": "", "trigger_id": self._trigger(),
+            "user_id": self._usuario(), "channel_id": CANAL, "team_id": TIME,
+            "response_url": self.response_url,
+        }
+
+    def _acao(self, action_id, ts, **acao):
+        return {
+            "type": "block_actions",
+            "user": {"id": self._usuario()},
+            "team": {"id": TIME},
+            "channel": {"id": CANAL},
+            "container": {"type": "message", "message_ts": ts, "channel_id": CANAL},
+            "message": {"ts": ts},
+            "trigger_id": self._trigger(),
+            "response_url": self.response_url,
+            "actions": [dict({"action_id": action_id, "block_id": "bench", "type": "button"}, **acao)],
+        }
+
+    def _envio(self, callback_id, valores, private_metadata=""):
+        self._seq += 1  # view.id único: é a chave de idempotência da abertura
+        return {
+            "type": "view_submission",
+            "user": {"id": self._usuario()},
+            "team": {"id": TIME},
+            "view": {
+                "id": f"VCARGA{self._seq:06d}",
+                "type": "modal",
+                "callback_id": callback_id,
+                "private_metadata": private_metadata,
+                "state": {"values": valores},
+            },
+        }
+
+    def _selecao(self, valor):
+        return {"value": {"type": "static_select", "selected_option": {"value": valor}}}
+
+    def _texto(self, valor):
+        return {"value": {"type": "plain_text_input", "value": valor}}
+
+    def gerar(self, tipo):
+        from templates import EMPREENDIMENTOS, RESPONSAVEIS, TIPOS_CONTRATO, TIPOS_TICKET
+        import lista_chamados
+
+        rnd = self.rnd
+        if tipo == "comando_abertura":
+            return self._comando("/comercial-os")
+        if tipo == "comando_lista":
+            return self._comando("/minhas-os-comercial")
+        if tipo == "comando_exportar":
+            return self._comando("/exportar-os-comercial")
+        if tipo == "comando_sla":
+            return self._comando("/sla-comercial")
+        if tipo == "filtro_lista":
+            estado = json.dumps(lista_chamados.estado_padrao(), separators=(",", ":"))
+            corpo = self._acao(lista_chamados.FILTRO_STATUS, "1700000000.000000",
+                selected_option={"value": rnd.choice(lista_chamados.STATUS_LISTA)})
+            corpo["actions"][0].update(block_id=lista_chamados.PREFIXO_BLOCO + estado, type="static_select")
+            return corpo
+        if tipo == "abertura":
+            return self._envio("modal_abertura_chamado", {
+                "tipo_ticket": self._selecao(rnd.choice(TIPOS_TICKET)),
+                "locatario": self._texto(f"Locatário carga {self._seq}"),
+                "empreendimento": self._selecao(rnd.choice(EMPREENDIMENTOS)),
+                "unidade_metragem": self._texto(str(rnd.randint(1, 400))),
+                "numero_reserva": self._texto(str(rnd.randint(100000, 999999))),
+                "responsavel": self._selecao(rnd.choice(RESPONSAVEIS)[1]),
+            })
+        if tipo == "capturar":
+            return self._acao("capturar_chamado", self._ts("aberto"))
+        if tipo == "finalizar":
+            return self._acao("finalizar_chamado", self._ts("em análise", "aberto"))
+        if tipo == "botao_reabrir":
+            return self._acao("reabrir_chamado", rnd.choice(self.todos))
+        if tipo == "botao_editar":
+            return self._acao("editar_chamado", rnd.choice(self.todos))
+        if tipo == "botao_cancelar":
+            return self._acao("cancelar_chamado", rnd.choice(self.todos))
+        if tipo == "reabrir":
+            return self._envio("reabrir_chamado_modal", {
+                "novo_tipo_ticket": self._selecao(rnd.choice(TIPOS_TICKET)),
+            }, self._ts("fechado", "cancelado"))
+        if tipo == "editar":
+            return self._envio("editar_chamado_modal", {
+                "tipo_contrato": self._selecao(rnd.choice(TIPOS_CONTRATO)),
+                "locatario": self._texto(f"Locatário editado {self._seq}"),
+                "moradores": self._texto(str(rnd.randint(1, 6))),
+                "empreendimento": self._selecao(rnd.choice(EMPREENDIMENTOS)),
+                "unidade_metragem": self._texto(str(rnd.randint(1, 400))),
+                "valor_locacao": self._texto(f"R$ {rnd.randint(1500, 15000)},00"),
+            }, rnd.choice(self.todos))
+        if tipo == "cancelar":
+            return self._envio("cancelar_chamado_modal", {
+                "motivo": self._texto("Cancelado pelo teste de carga"),
+            }, self._ts("aberto", "em análise"))
+        raise ValueError(f"tipo de payload desconhecido: {tipo}")
+
+    def sortear(self, n, mix=MIX):
+        tipos = list(mix)
+        pesos = [mix[t][0] for t in tipos]
+        return [(t, self.gerar(t)) for t in self.rnd.choices(tipos, pesos, k=n)]
+
+
+# ⏱️ Durações observadas pelo metricas.instrumentar, por listener
+class Coletor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terminou = threading.Condition(self._lock)
+        self.duracoes = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.concluidos = 0
+
+    def ligar(self, metricas):
+        observar = metricas.listener_segundos.observar
+        incrementar = metricas.listener_erros.inc
+
+        def observar_gravando(segundos, *valores):
+            observar(segundos, *valores)
+            with self._lock:
+                self.duracoes[valores[0]].append(segundos)
+                self.concluidos += 1
+                self._terminou.notify_all()
+
+        def inc_gravando(*valores, quantidade=1):
+            incrementar(*valores, quantidade=quantidade)
+            with self._lock:
+                self.erros[valores[0]] += quantidade
+
+        metricas.listener_segundos.observar = observar_gravando
+        metricas.listener_erros.inc = inc_gravando
+
+    def zerar(self):
+        with self._lock:
+            self.duracoes.clear()
+            self.erros.clear()
+            self.concluidos = 0
+
+    def aguardar(self, total, timeout):
+        limite = time.monotonic() + timeout
+        with self._lock:
+            while self.concluidos < total:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._terminou.wait(restante)
+        return True
+
+
+def preparar_ambiente(latencia_slack):
+    from bench.slack_falso import ServidorSlackFalso
+    from templates import RESPONSAVEIS
+
+    dados.configurar_banco()
+    usuarios = [u for _, u in RESPONSAVEIS] + [dados.solicitante_id(i) for i in range(dados.N_SOLICITANTES)]
+    slack = ServidorSlackFalso(usuarios=usuarios, latencia=latencia_slack).iniciar()
+    os.environ["SLACK_API_URL"] = slack.url_api
+    os.environ["SLACK_BOT_TOKEN"] = "xoxb-carga"
+    os.environ["SLACK_CANAL_ID"] = CANAL
+    os.environ["SLACK_CANAL_CHAMADOS"] = CANAL
+    return slack
+
+
+def executar_nivel(app, gerador, coletor, concorrencia, requisicoes, timeout, mix=MIX):
+    from slack_bolt.request import BoltRequest
+
+    payloads = gerador.sortear(requisicoes, mix)
+    acks = defaultdict(list)
+    falhas = defaultdict(int)
+    lock = threading.Lock()
+
+    def despachar(item):
+        tipo, corpo = item
+        inicio = time.perf_counter()
+        resposta = app.dispatch(BoltRequest(body=corpo, mode="socket_mode"))
+        duracao = time.perf_counter() - inicio
+        with lock:
+            acks[MIX[tipo][1]].append(duracao)
+            if resposta.status != 200:
+                falhas[MIX[tipo][1]] += 1
+
+    coletor.zerar()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        list(pool.map(despachar, payloads))
+    fim_acks = time.perf_counter() - inicio
+    completo = coletor.aguardar(len(payloads), timeout)
+    parede = time.perf_counter() - inicio
+
+    listeners = {}
+    for nome in sorted(set(acks) | set(coletor.duracoes)):
+        ack = sorted(acks.get(nome, []))
+        total = sorted(coletor.duracoes.get(nome, []))
+        listeners[nome] = {
+            "requisicoes": len(ack),
+            "concluidas": len(total),
+            "vazao_por_s": round(len(total) / parede, 1) if parede else None,
+            "ack_p50_ms": _ms(percentil(ack, 0.50)),
+            "ack_p95_ms": _ms(percentil(ack, 0.95)),
+            "ack_p99_ms": _ms(percentil(ack, 0.99)),
+            "total_p50_ms": _ms(percentil(total, 0.50)),
+            "total_p95_ms": _ms(percentil(total, 0.95)),
+            "total_p99_ms": _ms(percentil(total, 0.99)),
+            "erros": coletor.erros.get(nome, 0) + falhas.get(nome, 0),
+        }
+    return {
+        "concorrencia": concorrencia,
+        "requisicoes": len(payloads),
+        "concluidas": coletor.concluidos,
+        "completo": completo,
+        "segundos_ate_ultimo_ack": round(fim_acks, 3),
+        "segundos": round(parede, 3),
+        "vazao_por_s": round(coletor.concluidos / parede, 1) if parede else None,
+        "listeners": listeners,
+    }
+
+
+def imprimir(nivel):
+    print(
+        f"\n🚦 concorrência {nivel['concorrencia']}: {nivel['concluidas']}/{nivel['requisicoes']} em "
+        f"{nivel['segundos']:.2f}s ({nivel['vazao_por_s']}/s)" + ("" if nivel["completo"] else " ⚠️ incompleto"),
+        file=sys.stderr,
+    )
+    print(f"{'listener':>26} | {'n':>5} | {'req/s':>7} | {'ack p50/p95/p99 ms':>22} | "
+          f"{'total p50/p95/p99 ms':>24} | erros", file=sys.stderr)
+    for nome, m in nivel["listeners"].items():
+        ack = "/".join(str(m[f"ack_p{p}_ms"]) for p in (50, 95, 99))
+        total = "/".join(str(m[f"total_p{p}_ms"]) for p in (50, 95, 99))
+        print(f"{nome:>26} | {m['requisicoes']:>5} | {m['vazao_por_s']:>7} | {ack:>22} | {total:>24} | {m['erros']}",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga sintética nos listeners do main.py")
+    parser.add_argument("--concorrencia", type=int, action="append", help="threads despachando (repetível)")
+    parser.add_argument("--requisicoes", type=int, default=500, help="payloads por nível de concorrência")
+    parser.add_argument("--linhas", type=int, default=5000, help="chamados no dataset (recriado a cada nível)")
+    parser.add_argument("--latencia-slack", type=float, default=50, help="latência da Web API falsa, em ms")
+    parser.add_argument("--sem-limite-slack", action="store_true",
+                        help="desliga os baldes do despachante para medir só o bot")
+    parser.add_argument("--timeout", type=float, default=300, help="espera máxima pelos listeners, em s")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo além do stdout")
+    args = parser.parse_args()
+
+    slack = preparar_ambiente(args.latencia_slack / 1000)
+
+    import despachante as modulo_despachante
+    import metricas
+    from database import engine
+    from main import app
+
+    if args.sem_limite_slack:
+        modulo_despachante.LIMITE_PADRAO = SEM_LIMITE
+        modulo_despachante.despachante.limites = {m: SEM_LIMITE for m in modulo_despachante.LIMITES_METODO}
+
+    coletor = Coletor()
+    coletor.ligar(metricas)
+
+    mix = MIX
+    if engine.dialect.name != "postgresql":
+        mix = {t: v for t, v in MIX.items() if t not in TIPOS_POSTGRES}
+        print(f"⚠️ {engine.dialect.name}: sem {', '.join(sorted(TIPOS_POSTGRES))} (exigem Postgres)", file=sys.stderr)
+
+    relatorio = {
+        "banco": engine.dialect.name,
+        "latencia_slack_ms": args.latencia_slack,
+        "limite_slack": not args.sem_limite_slack,
+        "mix": {t: peso for t, (peso, _) in mix.items()},
+        "niveis": [],
+    }
+    for concorrencia in args.concorrencia or CONCORRENCIAS_PADRAO:
+        dados.popular(engine, args.linhas)
+        modulo_despachante.despachante._baldes.clear()
+        gerador = GeradorPayloads(engine, slack.url + "resposta", semente=concorrencia)
+        nivel = executar_nivel(app, gerador, coletor, concorrencia, args.requisicoes, args.timeout, mix)
+        nivel["despachante"] = modulo_despachante.despachante.metricas()
+        relatorio["niveis"].append(nivel)
+        imprimir(nivel)
+
+    relatorio["chamadas_slack"] = slack.resumo()
+    slack.parar()
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# 🧪 Dataset sintético de chamados para os benchmarks
+#
+# Distribuições aproximadas da operação real:
+# - 70% fechados, 8% cancelados, 7% em análise, 15% abertos
+# - poucos solicitantes concentram a maior parte dos chamados (Pareto)
+# - abertos/em análise são recentes; cerca de 2/3 já passaram do SLA
+#   mas continuam "dentro do prazo", para a varredura de SLA ter trabalho
+#
+# A geração é determinística (semente fixa); só os chamados abertos são
+# ancorados na hora cheia atual, para que o SLA vencido seja relativo a agora.
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+URL_PADRAO = "sqlite:///" + os.path.join(tempfile.gettempdir(), "os_comercial_bench.sqlite")
+
+
+# Precisa rodar antes de qualquer import de database/services
+def configurar_banco():
+    url = os.getenv("BENCH_DATABASE_URL") or URL_PADRAO
+    os.environ["DATABASE_URL"] = url
+    return url
+
+
+TAMANHO_LOTE = 10_000
+N_SOLICITANTES = 200
+STATUS_PESOS = [("fechado", 70), ("cancelado", 8), ("em análise", 7), ("aberto", 15)]
+SLA = timedelta(hours=24)
+INICIO_HISTORICO = datetime(2023, 1, 1)
+FIM_HISTORICO = datetime(2025, 1, 1)
+
+
+def solicitante_id(i):
+    return f"UBENCH{i:05d}"
+
+
+def _escolher_status(rnd):
+    alvo = rnd.uniform(0, 100)
+    for status, peso in STATUS_PESOS:
+        alvo -= peso
+        if alvo <= 0:
+            return status
+    return STATUS_PESOS[-1][0]
+
+
+def gerar_chamados(n, semente=42, agora=None):
+    from templates import EMPREENDIMENTOS, RESPONSAVEIS, TIPOS_TICKET, TIPOS_CONTRATO
+
+    rnd = random.Random(semente)
+    agora = agora or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    janela = (FIM_HISTORICO - INICIO_HISTORICO).total_seconds()
+    responsaveis = [user_id for _, user_id in RESPONSAVEIS]
+
+    for i in range(n):
+        status = _escolher_status(rnd)
+        if status in ("aberto", "em análise"):
+            abertura = agora - timedelta(hours=rnd.uniform(0, 72))
+        else:
+            abertura = INICIO_HISTORICO + timedelta(seconds=rnd.uniform(0, janela))
+        sla_limite = abertura + SLA
+
+        captura = fechamento = None
+        sla_status = "dentro do prazo"
+        if status in ("em análise", "fechado"):
+            captura = abertura + timedelta(hours=rnd.expovariate(1 / 4))
+        if status in ("fechado", "cancelado"):
+            fechamento = abertura + timedelta(hours=rnd.expovariate(1 / 18))
+            if fechamento > sla_limite:
+                sla_status = "fora do prazo"
+
+        solicitante = min(int(rnd.paretovariate(1.2)) - 1, N_SOLICITANTES - 1)
+        responsavel = rnd.choice(responsaveis)
+        yield {
+            "tipo_ticket": rnd.choice(TIPOS_TICKET),
+            "tipo_contrato": rnd.choice(TIPOS_CONTRATO),
+            "locatario": f"Locatário {rnd.randint(1, n)}",
+            "moradores": None,
+            "empreendimento": rnd.choice(EMPREENDIMENTOS),
+            "unidade_metragem": str(rnd.randint(1, 400)),
+            "numero_reserva": str(rnd.randint(100000, 999999)),
+            "valor_locacao": round(rnd.uniform(1500, 15000), 2),
+            "responsavel": responsavel,
+            "capturado_por": responsavel if captura else None,
+            "solicitante": solicitante_id(solicitante),
+            "status": status,
+            "data_abertura": abertura,
+            "data_captura": captura,
+            "data_fechamento": fechamento,
+            "sla_limite": sla_limite,
+            "sla_status": sla_status,
+            "thread_ts": f"{int(abertura.timestamp())}.{i:06d}",
+            "canal_id": "CBENCH0001",
+            "historico_reaberturas": "" if rnd.random() > 0.03 else
+                f"[{abertura:%Y-%m-%d %H:%M:%S}] Bench reabriu para *Reserva*\n",
+        }
+
+
+def _criar_schema(engine):
+    from models import OrdemServico
+
+    if engine.dialect.name == "postgresql":
+        import migracoes
+        migracoes.aplicar()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("TRUNCATE ordens_servico RESTART IDENTITY CASCADE")
+            # Sem marca, a próxima resumos.atualizar() reconstrói tudo
+            conn.exec_driver_sql(
+                "TRUNCATE ordens_servico_resumo_diario, ordens_servico_resumo_marca, ordens_servico_resumo_pendente"
+            )
+    else:
+        OrdemServico.__table__.drop(engine, checkfirst=True)
+        OrdemServico.__table__.create(engine)
+
+
+def contar(engine):
+    from sqlalchemy import text
+
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM ordens_servico")).scalar()
+    except Exception:
+        return None
+
+
+# 📥 Recria a tabela com N chamados (insert em lotes)
+def popular(engine, n, semente=42):
+    from models import OrdemServico
+
+    _criar_schema(engine)
+    insert = OrdemServico.__table__.insert()
+    lote = []
+    with engine.begin() as conn:
+        for chamado in gerar_chamados(n, semente):
+            lote.append(chamado)
+            if len(lote) >= TAMANHO_LOTE:
+                conn.execute(insert, lote)
+                lote = []
+        if lote:
+            conn.execute(insert, lote)
+
+
+# 🔁 Desfaz o efeito da varredura de SLA para a próxima execução
+def restaurar_sla(engine):
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE ordens_servico SET sla_status = 'dentro do prazo' "
+            "WHERE status IN ('aberto', 'em análise')"
+        ))
+
+
+def solicitante_mais_ativo(engine):
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT solicitante FROM ordens_servico GROUP BY solicitante ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
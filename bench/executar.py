@@ -0,0 +1,235 @@
+# 📊 Suíte de benchmarks dos caminhos reais do bot
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.executar                          # 10k linhas, todos os casos
+#   python -m bench.executar --linhas 100000 --caso exportar_csv --caso exibir_lista
+#   python -m bench.executar --saida resultado.json   # para comparar entre commits
+#
+# Banco: BENCH_DATABASE_URL (ex.: postgresql://localhost/os_bench) ou, na
+# falta dele, um SQLite temporário. A varredura de SLA usa UPDATE ... RETURNING
+# e só roda em Postgres.
+#
+# Cada caso roda num subprocesso separado; o JSON traz tempo de parede, pico
+# de RSS, número de comandos SQL e de chamadas à Slack API.
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from bench import dados
+
+TAMANHOS_PADRAO = [10_000]
+USUARIO_BENCH = "UBENCH00000"
+
+
+def _rss_mb():
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _caso_buscar_chamados(services, client, engine):
+    return {"linhas": len(services.buscar_chamados())}
+
+
+def _caso_exportar_csv(services, client, engine):
+    services.enviar_relatorio(client, USUARIO_BENCH)
+
+
+def _caso_exportar_xlsx(services, client, engine):
+    services.enviar_relatorio_xlsx(client, USUARIO_BENCH)
+
+
+def _caso_exportar_pdf(services, client, engine):
+    services.exportar_pdf(client, USUARIO_BENCH)
+
+
+def _caso_exibir_lista(services, client, engine):
+    services.exibir_lista(client, dados.solicitante_mais_ativo(engine))
+
+
+def _caso_sla_comercial(services, client, engine):
+    if engine.dialect.name != "postgresql":
+        return {"ignorado": "requer Postgres (GROUPING SETS, advisory lock)"}
+    import resumos
+
+    resumos.atualizar()
+    inicio = time.perf_counter()
+    resumos.mensagem("30")
+    return {"resposta_ms": round((time.perf_counter() - inicio) * 1000, 2)}
+
+
+def _caso_verificar_sla(services, client, engine):
+    if engine.dialect.name != "postgresql":
+        return {"ignorado": "requer Postgres (UPDATE ... RETURNING)"}
+    dados.restaurar_sla(engine)
+    try:
+        return {"vencidos": len(services.verificar_sla_vencido() or [])}
+    finally:
+        dados.restaurar_sla(engine)
+
+
+# Finaliza os chamados abertos de um empreendimento: um UPDATE em lote x um
+# transicionar() por chamado. As duas versões rodam numa transação desfeita.
+def _caso_lote_finalizar(services, client, engine):
+    if engine.dialect.name != "postgresql":
+        return {"ignorado": "requer Postgres (UPDATE ... RETURNING em CTE)"}
+    from sqlalchemy import text
+
+    import eventos
+    import lote
+    import transicoes
+    from templates import EMPREENDIMENTOS
+
+    pedido = lote.Pedido("finalizar", EMPREENDIMENTOS[0], None, ("aberto", "em análise"), None, None, None)
+    with engine.connect() as conn:
+        with conn.begin() as tx:
+            inicio = time.perf_counter()
+            linhas = lote.aplicar(pedido, USUARIO_BENCH, conexao=conn)
+            lote_ms = (time.perf_counter() - inicio) * 1000
+            tx.rollback()
+
+        with conn.begin() as tx:
+            tss = conn.execute(text(
+                "SELECT thread_ts FROM ordens_servico "
+                "WHERE empreendimento = :e AND status IN ('aberto', 'em análise')"
+            ), {"e": pedido.empreendimento}).scalars().all()
+            inicio = time.perf_counter()
+            for ts in tss:
+                resultado = transicoes.transicionar("finalizar", ts, {"data_fechamento": datetime.utcnow()}, conexao=conn)
+                if resultado.codigo == transicoes.OK:
+                    eventos.registrar_transicao(conn, eventos.FINALIZAR, resultado, USUARIO_BENCH)
+            individual_ms = (time.perf_counter() - inicio) * 1000
+            tx.rollback()
+
+    return {
+        "chamados": len(linhas),
+        "lote_ms": round(lote_ms, 2),
+        "um_a_um_ms": round(individual_ms, 2),
+        "aceleracao": round(individual_ms / max(lote_ms, 1e-9), 1),
+    }
+
+
+CASOS = {
+    "buscar_chamados": _caso_buscar_chamados,
+    "exportar_csv": _caso_exportar_csv,
+    "exportar_xlsx": _caso_exportar_xlsx,
+    "exportar_pdf": _caso_exportar_pdf,
+    "exibir_lista": _caso_exibir_lista,
+    "verificar_sla_vencido": _caso_verificar_sla,
+    "sla_comercial": _caso_sla_comercial,
+    "lote_finalizar": _caso_lote_finalizar,
+}
+
+
+def executar_caso(nome):
+    dados.configurar_banco()
+    from sqlalchemy import event
+
+    import services
+    from bench.slack_falso import WebClientGravador
+    from cache_usuarios import diretorio
+    from database import engine
+    from templates import RESPONSAVEIS
+
+    usuarios = [u for _, u in RESPONSAVEIS] + [dados.solicitante_id(i) for i in range(dados.N_SOLICITANTES)]
+    client = WebClientGravador(usuarios=usuarios)
+    services.client_slack = client
+    diretorio.limpar()
+
+    consultas = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def contar(*args):
+        consultas[0] += 1
+
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    erro = extra = None
+    try:
+        extra = CASOS[nome](services, client, engine)
+    except Exception as e:
+        erro = f"{type(e).__name__}: {e}"
+    duracao = time.perf_counter() - inicio
+
+    resultado = {
+        "caso": nome,
+        "segundos": round(duracao, 4),
+        "rss_inicial_mb": round(rss_inicial, 1),
+        "pico_rss_mb": round(_rss_mb(), 1),
+        "consultas_sql": consultas[0],
+        "chamadas_slack": client.resumo(),
+    }
+    if extra:
+        resultado.update(extra)
+    if erro:
+        resultado["erro"] = erro
+    return resultado
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def preparar(n, recriar=False):
+    dados.configurar_banco()
+    from database import engine
+
+    if recriar or dados.contar(engine) != n:
+        inicio = time.perf_counter()
+        dados.popular(engine, n)
+        print(f"🧪 Dataset com {n} chamados gerado em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    return engine.dialect.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos reais do bot")
+    parser.add_argument("--linhas", type=int, action="append", help="tamanho do dataset (repetível)")
+    parser.add_argument("--caso", choices=sorted(CASOS), action="append", help="caso a rodar (repetível)")
+    parser.add_argument("--recriar", action="store_true", help="regera o dataset mesmo se já existir")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo além do stdout")
+    parser.add_argument("--executar-caso", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar_caso:
+        print(json.dumps(executar_caso(args.executar_caso), ensure_ascii=False))
+        return
+
+    relatorio = {"commit": _commit_atual(), "execucoes": []}
+    for n in args.linhas or TAMANHOS_PADRAO:
+        banco = preparar(n, args.recriar)
+        execucao = {"linhas": n, "banco": banco, "casos": []}
+        for nome in args.caso or list(CASOS):
+            saida = subprocess.run(
+                [sys.executable, "-m", "bench.executar", "--executar-caso", nome],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            resultado = json.loads(saida.strip().splitlines()[-1])
+            execucao["casos"].append(resultado)
+            print(
+                f"{nome:>22} | {n:>8} linhas | {resultado['segundos']:>8.2f}s | "
+                f"{resultado['pico_rss_mb']:>7.1f} MB | {resultado['consultas_sql']:>5} SQL | "
+                f"{resultado['chamadas_slack']['total']:>5} Slack"
+                + (f" | {resultado['erro']}" if "erro" in resultado else "")
+                + (f" | ignorado: {resultado['ignorado']}" if "ignorado" in resultado else ""),
+                file=sys.stderr,
+            )
+        relatorio["execucoes"].append(execucao)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# ⏱️ Partida a frio do bot: tempo de import e tempo até o primeiro ack
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.importtime                    # 5 repetições
+#   python -m bench.importtime --repeticoes 10 --top 30 --saida partida.json
+#
+# Cada repetição roda dois processos novos, com a Web API apontada para o
+# Slack falso (bench/slack_falso.py):
+# - `python -X importtime -c "import main"`: custo acumulado por pacote
+# - um processo que importa main.py e despacha um /comercial-os no App;
+#   o tempo vai do Popen até o ack (inclui a subida do interpretador)
+#
+# Também confere se reportlab/openpyxl/deepdiff ficaram fora do boot.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from bench import carga
+
+PACOTES_PESADOS = ("reportlab", "openpyxl", "deepdiff")
+
+
+# Linhas do -X importtime: "import time: self [us] | cumulative | imported package"
+def ler_importtime(stderr):
+    por_pacote = defaultdict(int)
+    total = None
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        nome_limpo = nome.strip()
+        por_pacote[nome_limpo.split(".")[0]] += int(proprio)
+        if nome_limpo == "main" and not nome.startswith("  "):  # só o import de nível 1
+            total = int(acumulado)
+    return total, dict(por_pacote)
+
+
+def medir_import():
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True,
+    )
+    return ler_importtime(resultado.stderr)
+
+
+# 🚀 Processo filho: importa o bot e mede até o ack do primeiro comando
+def primeiro_ack():
+    inicio = time.perf_counter()
+    from slack_bolt.request import BoltRequest
+
+    from main import app
+    importado = time.perf_counter()
+
+    corpo = {
+        "command": "/comercial-os", "text": "", "trigger_id": "1.bench.trigger",
+        "user_id": "UBENCH00000", "channel_id": carga.CANAL, "team_id": carga.TIME,
+        "response_url": os.environ["SLACK_API_URL"].replace("/api/", "/resposta"),
+    }
+    resposta = app.dispatch(BoltRequest(body=corpo, mode="socket_mode"))
+    ack = time.time()
+    return {
+        "import_main_s": round(importado - inicio, 4),
+        "dispatch_s": round(time.perf_counter() - importado, 4),
+        "ack_epoch": ack,
+        "status": resposta.status,
+        "pesados_no_boot": sorted(p for p in PACOTES_PESADOS if p in sys.modules),
+    }
+
+
+def medir_primeiro_ack():
+    antes = time.time()
+    saida = subprocess.run(
+        [sys.executable, "-m", "bench.importtime", "--primeiro-ack"],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    resultado = json.loads(saida.strip().splitlines()[-1])
+    resultado["ate_primeiro_ack_s"] = round(resultado.pop("ack_epoch") - antes, 4)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partida a frio do bot")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="pacotes mais caros no relatório")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo além do stdout")
+    parser.add_argument("--primeiro-ack", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.primeiro_ack:
+        print(json.dumps(primeiro_ack()))
+        return
+
+    slack = carga.preparar_ambiente(0)
+    totais, acks, pacotes = [], [], defaultdict(list)
+    for i in range(args.repeticoes):
+        total, por_pacote = medir_import()
+        ack = medir_primeiro_ack()
+        totais.append(total)
+        acks.append(ack)
+        for nome, us in por_pacote.items():
+            pacotes[nome].append(us)
+        print(
+            f"#{i + 1}: import main {total / 1e6:.3f}s | primeiro ack {ack['ate_primeiro_ack_s']:.3f}s"
+            + (f" | pesados no boot: {', '.join(ack['pesados_no_boot'])}" if ack["pesados_no_boot"] else ""),
+            file=sys.stderr,
+        )
+    slack.parar()
+
+    mais_caros = sorted(pacotes.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    relatorio = {
+        "repeticoes": args.repeticoes,
+        "import_main_mediana_s": round(statistics.median(totais) / 1e6, 4),
+        "ate_primeiro_ack_mediana_s": round(statistics.median(a["ate_primeiro_ack_s"] for a in acks), 4),
+        "dispatch_mediana_s": round(statistics.median(a["dispatch_s"] for a in acks), 4),
+        "pesados_no_boot": sorted({p for a in acks for p in a["pesados_no_boot"]}),
+        "pacotes_mais_caros_s": {
+            nome: round(statistics.median(us) / 1e6, 4) for nome, us in mais_caros[:args.top]
+        },
+        "execucoes": acks,
+    }
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
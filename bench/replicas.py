@@ -0,0 +1,163 @@
+# 👑 Failover da liderança com várias réplicas contra o mesmo Postgres
+#
+# Uso (a partir da raiz do repositório, com BENCH_DATABASE_URL em Postgres):
+#   python -m bench.replicas                       # 3 réplicas, 5 trocas de líder
+#   python -m bench.replicas --replicas 5 --trocas 10 --intervalo 0.5
+#
+# Cada réplica é um processo que roda lideranca.Lideranca com uma tarefa
+# única que só avisa quando inicia e para. A cada troca o líder é derrubado,
+# alternando SIGKILL (morte sem aviso; o Postgres solta o lock ao fechar a
+# sessão) e SIGTERM (desligamento limpo com pg_advisory_unlock), e uma réplica
+# nova entra no lugar. Mede o tempo até outra réplica assumir e confere que
+# nunca houve dois líderes ao mesmo tempo.
+import argparse
+import json
+import os
+import queue
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from bench import dados
+
+PREFIXO = "EVENTO "
+
+
+# 🧵 Processo filho: uma réplica com uma tarefa única de marcação
+def replica(intervalo):
+    import lideranca
+
+    def emitir(tipo):
+        print(PREFIXO + json.dumps({"tipo": tipo, "pid": os.getpid(), "t": time.time()}), flush=True)
+
+    lider = lideranca.Lideranca(intervalo=intervalo)
+    lider.registrar("marcador", lambda: emitir("inicio"), lambda: emitir("fim"))
+
+    encerrar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: encerrar.set())
+    lider.iniciar()
+    emitir("pronta")
+    encerrar.wait()
+    lider.parar()
+
+
+class Replicas:
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.processos = {}
+        self.eventos = queue.Queue()
+
+    def subir(self):
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "bench.replicas", "--replica", "--intervalo", str(self.intervalo)],
+            stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        self.processos[processo.pid] = processo
+        threading.Thread(target=self._ler, args=(processo,), daemon=True).start()
+        return processo.pid
+
+    def _ler(self, processo):
+        for linha in processo.stdout:
+            if linha.startswith(PREFIXO):
+                self.eventos.put(json.loads(linha[len(PREFIXO):]))
+
+    def derrubar(self, pid, sinal):
+        processo = self.processos.pop(pid)
+        processo.send_signal(sinal)
+        processo.wait(timeout=30)
+
+    def encerrar(self):
+        for processo in self.processos.values():
+            processo.kill()
+            processo.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Failover da liderança entre réplicas")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--trocas", type=int, default=5)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="LIDER_INTERVALO das réplicas, em s")
+    parser.add_argument("--timeout", type=float, default=30, help="espera máxima por um novo líder, em s")
+    parser.add_argument("--replica", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    dados.configurar_banco()
+    if args.replica:
+        replica(args.intervalo)
+        return
+
+    from database import engine
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("❌ Liderança usa advisory lock: rode com BENCH_DATABASE_URL apontando para Postgres.")
+
+    replicas = Replicas(args.intervalo)
+    lideres = set()
+    violacoes = []
+    trocas = []
+
+    # Consome eventos até `condicao()` valer; registra quem lidera a cada instante
+    def aguardar(condicao):
+        limite = time.monotonic() + args.timeout
+        while not condicao():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise TimeoutError("nenhuma réplica assumiu a liderança a tempo")
+            try:
+                evento = replicas.eventos.get(timeout=restante)
+            except queue.Empty:
+                continue
+            if evento["tipo"] == "inicio":
+                if lideres:
+                    violacoes.append({"novo": evento["pid"], "ativos": sorted(lideres), "t": evento["t"]})
+                lideres.add(evento["pid"])
+                ultimo_inicio.update(evento)
+            elif evento["tipo"] == "fim":
+                lideres.discard(evento["pid"])
+
+    ultimo_inicio = {}
+    try:
+        for _ in range(args.replicas):
+            replicas.subir()
+        aguardar(lambda: bool(lideres))
+
+        for i in range(args.trocas):
+            atual = ultimo_inicio["pid"]
+            sinal = signal.SIGKILL if i % 2 == 0 else signal.SIGTERM
+            antes = time.time()
+            replicas.derrubar(atual, sinal)
+            lideres.discard(atual)  # SIGKILL não deixa a réplica avisar
+            aguardar(lambda: bool(lideres) and ultimo_inicio["pid"] != atual)
+            segundos = ultimo_inicio["t"] - antes
+            trocas.append({"sinal": signal.Signals(sinal).name, "de": atual, "para": ultimo_inicio["pid"],
+                           "segundos": round(segundos, 3)})
+            print(f"#{i + 1}: {signal.Signals(sinal).name:>7} em {atual} -> líder {ultimo_inicio['pid']} "
+                  f"em {segundos:.2f}s", file=sys.stderr)
+            replicas.subir()
+        # Dá tempo de uma réplica indevida se promover antes de encerrar
+        time.sleep(args.intervalo * 2)
+        aguardar(lambda: replicas.eventos.empty())
+    finally:
+        replicas.encerrar()
+
+    por_sinal = {}
+    for nome in ("SIGKILL", "SIGTERM"):
+        tempos = [t["segundos"] for t in trocas if t["sinal"] == nome]
+        if tempos:
+            por_sinal[nome] = {"mediana_s": round(statistics.median(tempos), 3), "max_s": max(tempos)}
+    print(json.dumps({
+        "replicas": args.replicas,
+        "intervalo_s": args.intervalo,
+        "failover": por_sinal,
+        "lideres_simultaneos": violacoes,
+        "trocas": trocas,
+    }, indent=2, ensure_ascii=False))
+    if violacoes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
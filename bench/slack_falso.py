@@ -0,0 +1,215 @@
+# 🎭 Slack falso para os benchmarks
+#
+# - WebClientGravador: WebClient que grava as chamadas em vez de ir à rede
+# - ServidorSlackFalso: Web API local (HTTP) para apontar SLACK_API_URL
+#
+# Ambos respondem cada método com o mínimo que o bot lê (ts, channel, user,
+# members...) e contam chamadas e bytes enviados por método.
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from slack_sdk import WebClient
+from slack_sdk.web.slack_response import SlackResponse
+
+
+def resposta_falsa(metodo, args, seq, usuarios=(), url_base=""):
+    if metodo == "auth.test":
+        return {"ok": True, "user_id": "UBOTBENCH", "bot_id": "BBENCH", "team_id": "TBENCH", "user": "bot"}
+    if metodo == "users.list":
+        return {
+            "ok": True,
+            "members": [{"id": u, "real_name": f"Usuário {u}", "name": u} for u in usuarios],
+            "response_metadata": {"next_cursor": ""},
+        }
+    if metodo == "usergroups.list":
+        return {"ok": True, "usergroups": []}
+    if metodo == "users.info":
+        user = args.get("user")
+        return {"ok": True, "user": {"id": user, "real_name": f"Usuário {user}", "name": user}}
+    if metodo == "conversations.open":
+        return {"ok": True, "channel": {"id": "DBENCH0001"}}
+    if metodo == "files.getUploadURLExternal":
+        return {"ok": True, "upload_url": f"{url_base}upload/{seq}", "file_id": f"FBENCH{seq:06d}"}
+    if metodo == "files.completeUploadExternal":
+        arquivos = json.loads(args.get("files") or "[]")
+        return {"ok": True, "files": [{"id": f.get("id"), "title": f.get("title")} for f in arquivos]}
+    if metodo == "files.info":
+        return {"ok": True, "file": {"id": args.get("file")}}
+    if metodo in ("views.open", "views.update", "views.push"):
+        return {"ok": True, "view": {"id": f"VBENCH{seq:06d}"}}
+    return {"ok": True, "channel": args.get("channel"), "ts": f"{int(time.time())}.{seq:06d}"}
+
+
+class WebClientGravador(WebClient):
+    def __init__(self, usuarios=(), **kwargs):
+        super().__init__(token="xoxb-bench", **kwargs)
+        self.usuarios = list(usuarios)
+        self.chamadas = Counter()
+        self.bytes_enviados = Counter()
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _gravar(self, metodo, tamanho=0):
+        with self._lock:
+            self.chamadas[metodo] += 1
+            self.bytes_enviados[metodo] += tamanho
+            return next(self._seq)
+
+    def api_call(self, api_method, **kwargs):
+        args = dict(kwargs.get("json") or kwargs.get("data") or kwargs.get("params") or {})
+        tamanho = len(str(args))
+        seq = self._gravar(api_method, tamanho)
+        return SlackResponse(
+            client=self, http_verb="POST", api_url=api_method, req_args=kwargs,
+            data=resposta_falsa(api_method, args, seq, self.usuarios), headers={}, status_code=200,
+        )
+
+    # O upload real faz um PUT direto numa URL externa; aqui só medimos o arquivo
+    def files_upload_v2(self, *, filename=None, file=None, content=None, **kwargs):
+        if content is not None:
+            tamanho = len(content.encode("utf-8") if isinstance(content, str) else content)
+        elif isinstance(file, (bytes, bytearray)):
+            tamanho = len(file)
+        elif isinstance(file, str):
+            tamanho = os.path.getsize(file)
+        elif isinstance(file, io.IOBase):
+            atual = file.tell()
+            file.seek(0, io.SEEK_END)
+            tamanho = file.tell() - atual
+            file.seek(atual)
+        else:
+            tamanho = 0
+        seq = self._gravar("files.upload_v2", tamanho)
+        return SlackResponse(
+            client=self, http_verb="POST", api_url="files.upload_v2", req_args=kwargs,
+            data={"ok": True, "files": [{"id": f"FBENCH{seq:06d}", "name": filename}]}, headers={}, status_code=200,
+        )
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "total": sum(self.chamadas.values()),
+                "por_metodo": dict(self.chamadas),
+                "bytes_por_metodo": dict(self.bytes_enviados),
+            }
+
+
+# 🌐 Web API falsa via HTTP: POST/GET /api/<método>, /upload/<n> (upload externo
+# do files_upload_v2); qualquer outro POST é tratado como response_url.
+# `latencia` simula o tempo de ida e volta ao Slack; `limitar` faz as próximas
+# chamadas de um método responderem 429 com Retry-After; `registro` guarda
+# (instante, método, args, status) de cada chamada à API, na ordem de chegada.
+class ServidorSlackFalso:
+    def __init__(self, usuarios=(), latencia=0.0, host="127.0.0.1", porta=0):
+        self.usuarios = list(usuarios)
+        self.latencia = latencia
+        self.chamadas = Counter()
+        self.bytes_enviados = Counter()
+        self.registro = []
+        self._limites = {}  # método -> [respostas 429 restantes, Retry-After]
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer((host, porta), self._handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}/"
+
+    @property
+    def url_api(self):
+        return self.url + "api/"
+
+    def _gravar(self, metodo, tamanho=0):
+        with self._lock:
+            self.chamadas[metodo] += 1
+            self.bytes_enviados[metodo] += tamanho
+            return next(self._seq)
+
+    def limitar(self, metodo, vezes=1, retry_after=1):
+        with self._lock:
+            self._limites[metodo] = [vezes, retry_after]
+
+    # Retry-After se a chamada deve levar 429 (e registra a chamada)
+    def _registrar(self, metodo, args):
+        with self._lock:
+            limite = self._limites.get(metodo)
+            retry_after = None
+            if limite and limite[0] > 0:
+                limite[0] -= 1
+                retry_after = limite[1]
+            self.registro.append((time.monotonic(), metodo, args, 429 if retry_after else 200))
+            return retry_after
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self):
+                url = urlparse(self.path)
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho) if tamanho else b""
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                if url.path.startswith("/api/"):
+                    metodo = url.path[len("/api/"):]
+                    args = dict(parse_qsl(url.query))
+                    if corpo and "json" in (self.headers.get("Content-Type") or ""):
+                        args.update(json.loads(corpo))
+                    elif corpo:
+                        args.update(parse_qsl(corpo.decode("utf-8")))
+                    retry_after = servidor._registrar(metodo, args)
+                    if retry_after:
+                        self._enviar(429, b'{"ok": false, "error": "ratelimited"}',
+                                     "application/json; charset=utf-8", {"Retry-After": str(retry_after)})
+                        return
+                    seq = servidor._gravar(metodo, len(corpo))
+                    dados = resposta_falsa(metodo, args, seq, servidor.usuarios, servidor.url)
+                    corpo, tipo = json.dumps(dados).encode("utf-8"), "application/json; charset=utf-8"
+                else:
+                    servidor._gravar("upload" if url.path.startswith("/upload/") else "response_url", len(corpo))
+                    corpo, tipo = b"ok", "text/plain"
+                self._enviar(200, corpo, tipo)
+
+            def _enviar(self, status, corpo, tipo, cabecalhos=None):
+                self.send_response(status)
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            do_GET = do_POST = _responder
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, name="slack-falso", daemon=True).start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "total": sum(self.chamadas.values()),
+                "por_metodo": dict(self.chamadas),
+                "bytes_por_metodo": dict(self.bytes_enviados),
+            }
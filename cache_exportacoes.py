@@ -0,0 +1,168 @@
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import case, func
+
+from database import SessionLocal
+from models import EventoOrdemServico, OrdemServico
+
+# ⚙️ Configuração via ambiente
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EXPORT_CACHE_TTL = int(os.getenv("EXPORT_CACHE_TTL", "3600"))  # nomes do Slack podem mudar
+
+
+# 🔏 Impressão digital barata dos dados de um intervalo (consultas agregadas
+# com o mesmo filtro da exportação). Contagens e datas cobrem chamado novo ou
+# removido e a varredura de SLA; o maior id de evento dos chamados do
+# intervalo cobre o resto, inclusive o que não mexe em data nem contagem
+# (reatribuição, troca de tipo na reabertura, edição): toda alteração feita
+# pelo bot grava um evento em ordens_servico_eventos.
+def impressao(data_inicio=None, data_fim=None):
+    import services
+
+    db = SessionLocal()
+    try:
+        linha = (
+            services._query_chamados(db, data_inicio, data_fim)
+            .order_by(None)
+            .with_entities(
+                func.count(OrdemServico.id),
+                func.max(OrdemServico.data_abertura),
+                func.max(OrdemServico.data_captura),
+                func.max(OrdemServico.data_fechamento),
+                func.max(OrdemServico.data_ultima_edicao),
+                func.sum(case((OrdemServico.sla_status == "fora do prazo", 1), else_=0)),
+                func.sum(case((OrdemServico.status == "aberto", 1), else_=0)),
+                func.sum(case((OrdemServico.status == "em análise", 1), else_=0)),
+                func.sum(case((OrdemServico.status == "fechado", 1), else_=0)),
+                func.sum(case((OrdemServico.status == "cancelado", 1), else_=0)),
+                func.sum(func.length(func.coalesce(OrdemServico.historico_reaberturas, ""))),
+            )
+            .one()
+        )
+        ultimo_evento = (
+            services._query_chamados(db, data_inicio, data_fim)
+            .order_by(None)
+            .join(EventoOrdemServico, EventoOrdemServico.ordem_id == OrdemServico.id)
+            .with_entities(func.max(EventoOrdemServico.id))
+            .scalar()
+        )
+    finally:
+        db.close()
+    return tuple(linha) + (ultimo_evento,)
+
+
+# 🗄️ Relatórios prontos com LRU limitado por bytes
+class CacheExportacoes:
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES, ttl=EXPORT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (impressão, dados, meta, linhas, expira_em)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.descartes = 0
+
+    def obter(self, chave, impressao_atual):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item and item[0] == impressao_atual and item[4] > agora:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return item[1], item[2], item[3]
+            if item:
+                self._remover(chave)
+            self.misses += 1
+            return None
+
+    def cabe(self, tamanho):
+        return tamanho <= self.max_bytes
+
+    def guardar(self, chave, impressao_atual, dados, meta, linhas):
+        if not self.cabe(len(dados)):
+            return
+        with self._lock:
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (impressao_atual, dados, meta, linhas, time.monotonic() + self.ttl)
+            self._bytes += len(dados)
+            while self._bytes > self.max_bytes:
+                self._remover(next(iter(self._itens)))
+                self.descartes += 1
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave)
+        self._bytes -= len(item[1])
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+                "descartes": self.descartes,
+            }
+
+
+cache = CacheExportacoes()
+
+
+def chave(formato, data_inicio=None, data_fim=None):
+    import services
+
+    variante = services.EXPORT_CSV_COMPRESSAO if formato == "csv" else ""
+    # O título e o nome do arquivo levam a data do dia
+    return (formato, variante, data_inicio, data_fim, date.today())
+
+
+# 📤 Reenvia o relatório guardado se os dados do intervalo não mudaram;
+# senão gera com `exportador` e guarda o resultado. Devolve o número de
+# chamados exportados (0: nada no intervalo, nenhum arquivo enviado)
+def exportar(formato, exportador, client, user_id, data_inicio=None, data_fim=None, progresso=None):
+    import services
+
+    k = chave(formato, data_inicio, data_fim)
+    atual = impressao(data_inicio, data_fim)
+    achado = cache.obter(k, atual)
+    if achado:
+        dados, meta, linhas = achado
+        services.enviar_buffer(client, user_id, io.BytesIO(dados), **meta)
+        if progresso:
+            progresso(linhas)
+        return linhas
+
+    linhas = [0]
+
+    def contar(total):
+        linhas[0] = total
+        if progresso:
+            progresso(total)
+
+    # O arquivo só é lido para o cache se couber nele. A impressão é refeita
+    # depois da geração: se algo mudou no meio, o arquivo pode misturar os
+    # dois estados e não é guardado
+    def guardar(buffer, meta):
+        buffer.seek(0, io.SEEK_END)
+        if not cache.cabe(buffer.tell()):
+            return
+        if impressao(data_inicio, data_fim) != atual:
+            return
+        buffer.seek(0)
+        cache.guardar(k, atual, buffer.read(), meta, linhas[0])
+
+    return exportador(client, user_id, data_inicio, data_fim, progresso=contar, guardar=guardar) or 0
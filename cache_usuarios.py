@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ⚙️ Configuração via ambiente
+CACHE_TTL = int(os.getenv("SLACK_CACHE_USUARIOS_TTL", "3600"))
+CACHE_MAX = int(os.getenv("SLACK_CACHE_USUARIOS_MAX", "5000"))
+# Espera após uma carga em lote sem nenhum nome (escopo faltando, 429) e
+# validade do cache negativo de users.info
+CACHE_TTL_FALHA = int(os.getenv("SLACK_CACHE_USUARIOS_TTL_FALHA", "120"))
+
+
+# 🧠 Diretório de usuários/grupos do Slack com TTL + LRU
+class DiretorioUsuarios:
+    def __init__(self, ttl=CACHE_TTL, max_itens=CACHE_MAX, ttl_falha=CACHE_TTL_FALHA):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.ttl_falha = ttl_falha
+        self._itens = OrderedDict()  # id -> (nome, expira_em)
+        self._falhas = OrderedDict()  # id -> expira_em (users.info que falhou)
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()  # uma carga em lote por vez
+        self._proxima_carga = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.carregamentos = 0
+        self.cargas_falhas = 0
+
+    def obter(self, id_slack):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(id_slack)
+            if item and item[1] > agora:
+                self._itens.move_to_end(id_slack)
+                self.hits += 1
+                return item[0]
+            if item:
+                del self._itens[id_slack]
+            self.misses += 1
+            return None
+
+    def definir(self, id_slack, nome):
+        with self._lock:
+            self._definir(id_slack, nome, time.monotonic() + self.ttl)
+
+    def _definir(self, id_slack, nome, expira_em):
+        self._itens[id_slack] = (nome, expira_em)
+        self._itens.move_to_end(id_slack)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    # 🚫 Cache negativo: evita repetir users.info de um id que acabou de falhar
+    def registrar_falha(self, id_slack):
+        with self._lock:
+            self._falhas[id_slack] = time.monotonic() + self.ttl_falha
+            self._falhas.move_to_end(id_slack)
+            while len(self._falhas) > self.max_itens:
+                self._falhas.popitem(last=False)
+
+    def em_falha(self, id_slack):
+        with self._lock:
+            expira_em = self._falhas.get(id_slack)
+            if expira_em is None:
+                return False
+            if expira_em > time.monotonic():
+                return True
+            del self._falhas[id_slack]
+            return False
+
+    # 📥 Carga em lote: users.list + usergroups.list paginados
+    def carregar(self, client):
+        nomes = {}
+        cursor = None
+        try:
+            while True:
+                resp = client.users_list(limit=200, cursor=cursor)
+                for u in resp.get("members", []):
+                    nome = (
+                        u.get("real_name")
+                        or u.get("profile", {}).get("real_name")
+                        or u.get("name")
+                    )
+                    if nome:
+                        nomes[u["id"]] = nome
+                cursor = resp.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+        except Exception as e:
+            print(f"❌ Erro ao carregar lista de usuários do Slack: {e}")
+
+        try:
+            resp = client.usergroups_list()
+            for g in resp.get("usergroups", []):
+                nomes[g["id"]] = g.get("name") or g.get("handle") or g["id"]
+        except Exception as e:
+            print(f"❌ Erro ao carregar grupos do Slack: {e}")
+
+        agora = time.monotonic()
+        with self._lock:
+            # A tentativa conta mesmo sem nomes: a próxima só depois de ttl_falha
+            if not nomes:
+                self._proxima_carga = agora + self.ttl_falha
+                self.cargas_falhas += 1
+                return 0
+            for id_slack, nome in nomes.items():
+                self._definir(id_slack, nome, agora + self.ttl)
+            self._proxima_carga = agora + self.ttl
+            self.carregamentos += 1
+        return len(nomes)
+
+    def _vencido(self):
+        with self._lock:
+            return time.monotonic() >= self._proxima_carga
+
+    # 🔁 Recarrega só se a última carga em lote já expirou. Chamadas simultâneas
+    # esperam a carga em andamento em vez de repetir users.list
+    def aquecer(self, client):
+        if not self._vencido():
+            return
+        with self._lock_carga:
+            if self._vencido():
+                self.carregar(client)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._falhas.clear()
+            self._proxima_carga = 0.0
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+                "carregamentos": self.carregamentos,
+                "cargas_falhas": self.cargas_falhas,
+                "falhas_cacheadas": len(self._falhas),
+            }
+
+
+diretorio = DiretorioUsuarios()
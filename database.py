@@ -1,11 +1,187 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+# ⚙️ Pool de conexões configurável via ambiente
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "sim", "yes")
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+# 📊 Estatísticas do pool (tempo de espera, conexões em uso, overflow)
+class EstatisticasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.em_uso = 0
+        self.pico_em_uso = 0
+        self.checkouts_overflow = 0
+        self.timeouts = 0
+        self.conexoes_criadas = 0
+        self.conexoes_invalidadas = 0
+        self.espera_total_ms = 0.0
+        self.espera_max_ms = 0.0
+
+    def registrar_espera(self, ms, overflow):
+        with self._lock:
+            self.espera_total_ms += ms
+            self.espera_max_ms = max(self.espera_max_ms, ms)
+            if overflow:
+                self.checkouts_overflow += 1
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.em_uso += 1
+            self.pico_em_uso = max(self.pico_em_uso, self.em_uso)
+
+    def checkin(self):
+        with self._lock:
+            self.em_uso = max(self.em_uso - 1, 0)
+
+    def conexao_criada(self):
+        with self._lock:
+            self.conexoes_criadas += 1
+
+    def conexao_invalidada(self):
+        with self._lock:
+            self.conexoes_invalidadas += 1
+
+    def resumo(self, pool=None):
+        with self._lock:
+            dados = {
+                "checkouts": self.checkouts,
+                "em_uso": self.em_uso,
+                "pico_em_uso": self.pico_em_uso,
+                "checkouts_overflow": self.checkouts_overflow,
+                "timeouts": self.timeouts,
+                "conexoes_criadas": self.conexoes_criadas,
+                "conexoes_invalidadas": self.conexoes_invalidadas,
+                "espera_media_ms": round(self.espera_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "espera_max_ms": round(self.espera_max_ms, 3),
+            }
+        if pool is not None and hasattr(pool, "size"):
+            dados.update({
+                "tamanho": pool.size(),
+                "ociosas": pool.checkedin(),
+                "overflow_atual": pool.overflow(),
+            })
+        return dados
+
+
+estatisticas = EstatisticasPool()
+
+
+# ⏱️ QueuePool que mede quanto tempo cada checkout esperou por uma conexão
+class PoolInstrumentado(QueuePool):
+    def _do_get(self):
+        inicio = time.perf_counter()
+        overflow_antes = self.overflow()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            estatisticas.registrar_timeout()
+            raise
+        # Só conta como overflow o checkout que abriu uma conexão além de pool_size
+        estatisticas.registrar_espera((time.perf_counter() - inicio) * 1000, self.overflow() > max(overflow_antes, 0))
+        return conexao
+
+
+def _opcoes_pool(url):
+    # SQLite (bench/dev) não usa QueuePool; os listeners rodam em várias threads
+    if not url:
+        return {}
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": PoolInstrumentado,
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_pre_ping": POOL_PRE_PING,
+        "pool_recycle": POOL_RECYCLE,
+    }
+
+
+engine = create_engine(DATABASE_URL, **_opcoes_pool(DATABASE_URL))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@event.listens_for(engine, "connect")
+def _ao_conectar(dbapi_conn, registro):
+    estatisticas.conexao_criada()
+
+
+@event.listens_for(engine, "checkout")
+def _ao_checkout(dbapi_conn, registro, proxy):
+    estatisticas.checkout()
+
+
+@event.listens_for(engine, "checkin")
+def _ao_checkin(dbapi_conn, registro):
+    estatisticas.checkin()
+
+
+@event.listens_for(engine, "invalidate")
+def _ao_invalidar(dbapi_conn, registro, excecao):
+    estatisticas.conexao_invalidada()
+
+
+def estatisticas_pool():
+    return estatisticas.resumo(engine.pool)
+
+
+# 🔀 Engine assíncrona (asyncpg) para o modo asyncio do bot (main_async.py)
+def url_async(url):
+    for prefixo in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefixo):
+            return "postgresql+asyncpg://" + url[len(prefixo):]
+    for prefixo in ("sqlite+pysqlite://", "sqlite://"):
+        if url.startswith(prefixo):
+            return "sqlite+aiosqlite://" + url[len(prefixo):]
+    return url
+
+def _opcoes_pool_async(url):
+    # SQLite (bench/dev) não aceita as opções do QueuePool
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_pre_ping": POOL_PRE_PING,
+        "pool_recycle": POOL_RECYCLE,
+    }
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url = url_async(DATABASE_URL)
+        _async_engine = create_async_engine(url, **_opcoes_pool_async(url))
+    return _async_engine
+
+def AsyncSessionLocal():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+        _AsyncSessionLocal = sessionmaker(get_async_engine(), class_=AsyncSession, expire_on_commit=False)
+    return _AsyncSessionLocal()
@@ -0,0 +1,276 @@
+import asyncio
+import contextvars
+import heapq
+import inspect
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+from slack_sdk.errors import SlackApiError
+
+# 📮 Despachante de mensagens para a Web API do Slack
+#
+# Toda chamada de saída entra numa fila com prioridade; cada método (e, no
+# chat.postMessage, cada canal) tem seu próprio balde de tokens. Respostas
+# 429 respeitam o Retry-After e bloqueiam só o balde afetado.
+#
+# Pedido sem token espera na fila do próprio balde (também por prioridade);
+# o balde tem um único horário de despertar no heap de adiados e libera um
+# pedido por token. Os workers dormem até o próximo despertar.
+
+PRIORIDADE_INTERATIVA = 0  # resposta a um clique/modal do usuário
+PRIORIDADE_NORMAL = 1
+PRIORIDADE_LOTE = 2  # lembretes e notificações em massa
+
+# método -> (tokens por segundo, rajada). Valores conservadores dos tiers do Slack.
+LIMITES_METODO = {
+    "chat.postMessage": (1.0, 3),  # por canal
+    "chat.postEphemeral": (100 / 60, 10),
+    "chat.update": (50 / 60, 5),
+    "conversations.open": (50 / 60, 5),
+    "views.open": (100 / 60, 10),
+}
+LIMITE_PADRAO = (20 / 60, 3)
+
+WORKERS = int(os.getenv("SLACK_DESPACHANTE_WORKERS", "2"))
+MAX_TENTATIVAS = int(os.getenv("SLACK_DESPACHANTE_TENTATIVAS", "5"))
+TIMEOUT_ASYNC = float(os.getenv("SLACK_DESPACHANTE_TIMEOUT_ASYNC", "120"))
+AMOSTRAS_LATENCIA = 500
+
+
+# 🪣 Balde de tokens e os pedidos que esperam por ele
+class BaldeTokens:
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.atualizado_em = time.monotonic()
+        self.bloqueado_ate = 0.0
+        self.espera = []  # heap (prioridade, seq, pedido)
+        self.acordar_em = None  # entrada vigente em Despachante._adiados
+
+    # Segundos até haver um token, sem consumir
+    def espera_token(self, agora):
+        if agora < self.bloqueado_ate:
+            return self.bloqueado_ate - agora
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.taxa
+
+    # Retorna 0 se consumiu um token, ou quantos segundos faltam para o próximo
+    def reservar(self, agora):
+        espera = self.espera_token(agora)
+        if espera == 0.0:
+            self.tokens -= 1
+        return espera
+
+    def bloquear(self, segundos, agora):
+        self.bloqueado_ate = max(self.bloqueado_ate, agora + segundos)
+        self.tokens = min(self.tokens, 1.0)
+
+
+class Pedido:
+    def __init__(self, client, metodo, prioridade, kwargs, loop=None):
+        self.client = client
+        self.metodo = metodo
+        self.prioridade = prioridade
+        self.kwargs = kwargs
+        self.loop = loop  # event loop do AsyncWebClient (main_async.py)
+        # Contexto de quem enviou: o tempo de Slack conta para o listener (metricas)
+        self.contexto = contextvars.copy_context()
+        self.futuro = Future()
+        self.enfileirado_em = time.monotonic()
+        self.seq = 0
+        self.com_token = False
+        self.tentativas = 0
+
+    @property
+    def chave_balde(self):
+        if self.metodo == "chat.postMessage":
+            return (self.metodo, self.kwargs.get("channel"))
+        return (self.metodo, None)
+
+
+class Despachante:
+    def __init__(self, workers=WORKERS, limites=None):
+        self.workers = workers
+        self.limites = dict(limites or LIMITES_METODO)
+        self._fila = queue.PriorityQueue()
+        self._adiados = []  # heap (acordar_em, seq, chave do balde)
+        self._seq = itertools.count()
+        self._baldes = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._latencias = defaultdict(lambda: deque(maxlen=AMOSTRAS_LATENCIA))
+        self._contadores = defaultdict(int)
+
+    # 📨 Enfileira uma chamada; devolve um Future com a resposta do Slack
+    def enviar(self, client, metodo, prioridade=PRIORIDADE_NORMAL, **kwargs):
+        return self._enviar(Pedido(client, metodo, prioridade, kwargs))
+
+    # 🔀 Mesmo caminho para o AsyncWebClient: a fila e os baldes são os mesmos;
+    # a chamada roda no event loop de quem enviou
+    async def enviar_async(self, client, metodo, prioridade=PRIORIDADE_NORMAL, **kwargs):
+        pedido = Pedido(client, metodo, prioridade, kwargs, loop=asyncio.get_running_loop())
+        return await asyncio.wrap_future(self._enviar(pedido))
+
+    def _enviar(self, pedido):
+        self._garantir_workers()
+        with self._lock:
+            pedido.seq = next(self._seq)
+            self._contadores[f"enfileirados_p{pedido.prioridade}"] += 1
+        self._enfileirar(pedido)
+        return pedido.futuro
+
+    def _enfileirar(self, pedido):
+        self._fila.put((pedido.prioridade, pedido.seq, pedido))
+
+    # ⏸️ Sem token: o pedido vai para a fila do balde. Quem já espera no balde
+    # tem a vez, então um pedido novo não fura a fila gastando o token liberado.
+    def _reservar(self, pedido):
+        agora = time.monotonic()
+        chave = pedido.chave_balde
+        with self._lock:
+            balde = self._balde(chave)
+            if not balde.espera and balde.reservar(agora) == 0.0:
+                return True
+            self._aguardar(chave, balde, pedido, agora)
+            return False
+
+    # (com self._lock) Pedido na fila do balde; agenda o despertar se ainda não há um
+    def _aguardar(self, chave, balde, pedido, agora):
+        pedido.com_token = False
+        heapq.heappush(balde.espera, (pedido.prioridade, pedido.seq, pedido))
+        if balde.acordar_em is None:
+            self._agendar(chave, balde, agora + balde.espera_token(agora), avisar=True)
+
+    def _agendar(self, chave, balde, quando, avisar=False):
+        balde.acordar_em = quando
+        heapq.heappush(self._adiados, (quando, next(self._seq), chave))
+        # Despertar mais cedo que todos: acorda um worker parado no get() para recalcular
+        if avisar and self._adiados[0][2] == chave:
+            self._fila.put((-1, next(self._seq), None))
+
+    # ⏰ Baldes cujo despertar chegou liberam um pedido por token disponível;
+    # devolve quantos segundos faltam para o próximo despertar (None: nenhum)
+    def _liberar_adiados(self):
+        agora = time.monotonic()
+        with self._lock:
+            while self._adiados and self._adiados[0][0] <= agora:
+                _, _, chave = heapq.heappop(self._adiados)
+                balde = self._baldes[chave]
+                balde.acordar_em = None
+                if not balde.espera:
+                    continue
+                if balde.reservar(agora) == 0.0:
+                    pedido = heapq.heappop(balde.espera)[2]
+                    pedido.com_token = True
+                    self._enfileirar(pedido)
+                if balde.espera:
+                    self._agendar(chave, balde, agora + balde.espera_token(agora))
+            return max(self._adiados[0][0] - agora, 0.0) if self._adiados else None
+
+    def _garantir_workers(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._loop, name=f"despachante-slack-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _balde(self, chave):
+        balde = self._baldes.get(chave)
+        if balde is None:
+            balde = BaldeTokens(*self.limites.get(chave[0], LIMITE_PADRAO))
+            self._baldes[chave] = balde
+        return balde
+
+    def _loop(self):
+        while True:
+            proximo = self._liberar_adiados()
+            try:
+                # Sem despertar agendado, dorme até chegar um pedido
+                _, _, pedido = self._fila.get(timeout=proximo)
+            except queue.Empty:
+                continue
+            if pedido is None:  # aviso de despertar novo (_agendar)
+                continue
+            if pedido.com_token or self._reservar(pedido):
+                self._executar(pedido)
+
+    def _chamar(self, pedido):
+        funcao = getattr(pedido.client, pedido.metodo.replace(".", "_"))
+        resposta = funcao(**pedido.kwargs)
+        if inspect.isawaitable(resposta):
+            resposta = asyncio.run_coroutine_threadsafe(resposta, pedido.loop).result(timeout=TIMEOUT_ASYNC)
+        return resposta
+
+    def _executar(self, pedido):
+        pedido.tentativas += 1
+        try:
+            resposta = pedido.contexto.run(self._chamar, pedido)
+        except SlackApiError as e:
+            if e.response is not None and e.response.status_code == 429 and pedido.tentativas < MAX_TENTATIVAS:
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+                agora = time.monotonic()
+                with self._lock:
+                    balde = self._balde(pedido.chave_balde)
+                    balde.bloquear(retry_after, agora)
+                    self._contadores["retries_429"] += 1
+                    self._aguardar(pedido.chave_balde, balde, pedido, agora)
+                return
+            self._finalizar(pedido, erro=e)
+            return
+        except Exception as e:
+            self._finalizar(pedido, erro=e)
+            return
+        self._finalizar(pedido, resposta=resposta)
+
+    def _finalizar(self, pedido, resposta=None, erro=None):
+        latencia = time.monotonic() - pedido.enfileirado_em
+        with self._lock:
+            self._latencias[pedido.metodo].append(latencia)
+            self._contadores["erros" if erro else "enviados"] += 1
+        if erro:
+            print(f"❌ Erro ao enviar {pedido.metodo} ao Slack: {erro}")
+            pedido.futuro.set_exception(erro)
+        else:
+            pedido.futuro.set_result(resposta)
+
+    # 📊 Profundidade da fila e latência (enfileirado -> resposta) por método
+    def metricas(self):
+        with self._lock:
+            latencias = {}
+            for metodo, amostras in self._latencias.items():
+                ordenadas = sorted(amostras)
+                latencias[metodo] = {
+                    "amostras": len(ordenadas),
+                    "media_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 1),
+                    "p95_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))] * 1000, 1),
+                    "max_ms": round(ordenadas[-1] * 1000, 1),
+                }
+            return {
+                "profundidade_fila": self._fila.qsize(),
+                "aguardando_limite": sum(len(b.espera) for b in self._baldes.values()),
+                "contadores": dict(self._contadores),
+                "latencia": latencias,
+            }
+
+
+despachante = Despachante()
+
+
+# Atalhos para os casos comuns
+def enviar(client, metodo, prioridade=PRIORIDADE_NORMAL, **kwargs):
+    return despachante.enviar(client, metodo, prioridade, **kwargs)
+
+
+async def enviar_async(client, metodo, prioridade=PRIORIDADE_NORMAL, **kwargs):
+    return await despachante.enviar_async(client, metodo, prioridade, **kwargs)
@@ -0,0 +1,33 @@
+# 🔍 Diferenças campo a campo entre dois retratos planos de um chamado
+#
+# Os retratos são dicts {coluna: valor} (transicoes.ResultadoTransicao.antes /
+# .depois, ou retrato() de um OrdemServico). Comparação direta com ==, sem
+# percorrer estruturas aninhadas: é tudo que reabertura e edição precisam.
+from collections import namedtuple
+
+Diferenca = namedtuple("Diferenca", ["campo", "antes", "depois"])
+
+
+# Campos de `campos` (padrão: todos de `depois`) cujo valor mudou, na ordem dada
+def diferencas(antes, depois, campos=None):
+    if campos is None:
+        campos = depois.keys()
+    return [
+        Diferenca(c, antes.get(c), depois.get(c))
+        for c in campos
+        if antes.get(c) != depois.get(c)
+    ]
+
+
+def retrato(objeto, campos):
+    return {c: getattr(objeto, c) for c in campos}
+
+
+# {campo: [antes, depois]}, formato gravado em ordens_servico_eventos
+def como_dict(difs):
+    return {d.campo: [d.antes, d.depois] for d in difs}
+
+
+# "• campo: 'antes' ➝ 'depois'" por linha, formato do log de reabertura
+def como_texto(difs):
+    return "".join(f"• {d.campo}: '{d.antes}' ➝ '{d.depois}'\n" for d in difs)
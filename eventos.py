@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+
+import diff_campos
+from database import engine
+
+# 🧾 Histórico append-only dos chamados (tabela ordens_servico_eventos)
+#
+# Cada captura, finalização, cancelamento, reabertura, reatribuição ou edição vira uma
+# linha nova, gravada com um único INSERT na mesma transação da alteração.
+# Substitui o acúmulo em ordens_servico.log_edicoes.
+
+CAPTURAR = "capturar"
+FINALIZAR = "finalizar"
+CANCELAR = "cancelar"
+REABRIR = "reabrir"
+REATRIBUIR = "reatribuir"  # só em lote (lote.py)
+EDITAR = "editar"
+
+SQL_INSERIR = text("""
+    INSERT INTO ordens_servico_eventos (ordem_id, tipo, autor, criado_em, dados)
+    VALUES (:ordem_id, :tipo, :autor, :criado_em, CAST(:dados AS JSONB))
+""")
+
+# Usa ix_ordens_servico_thread_ts + ix_ordens_servico_eventos_ordem_criado
+SQL_HISTORICO = text("""
+    SELECT e.id, e.tipo, e.autor, e.criado_em, e.dados
+    FROM ordens_servico_eventos e
+    JOIN ordens_servico o ON o.id = e.ordem_id
+    WHERE o.thread_ts = :ts
+    ORDER BY e.criado_em, e.id
+    LIMIT :limite
+""")
+
+SQL_HISTORICO_POR_ID = text("""
+    SELECT id, tipo, autor, criado_em, dados
+    FROM ordens_servico_eventos
+    WHERE ordem_id = :ordem_id
+    ORDER BY criado_em, id
+    LIMIT :limite
+""")
+
+
+def parametros(ordem_id, tipo, autor=None, dados=None, criado_em=None):
+    return {
+        "ordem_id": ordem_id,
+        "tipo": tipo,
+        "autor": autor,
+        "criado_em": criado_em or datetime.utcnow(),
+        "dados": json.dumps(dados or {}, default=str, ensure_ascii=False),
+    }
+
+
+# ➕ Grava um evento; `conexao` pode ser Connection ou Session (mesma transação da alteração)
+def registrar(conexao, ordem_id, tipo, autor=None, dados=None, criado_em=None):
+    conexao.execute(SQL_INSERIR, parametros(ordem_id, tipo, autor, dados, criado_em))
+
+
+async def registrar_async(conexao, ordem_id, tipo, autor=None, dados=None, criado_em=None):
+    await conexao.execute(SQL_INSERIR, parametros(ordem_id, tipo, autor, dados, criado_em))
+
+
+# 🚦 Evento de uma transição bem-sucedida (transicoes.ResultadoTransicao)
+def dados_transicao(resultado, **extras):
+    dados = {"status": [resultado.antes["status"], resultado.depois["status"]]}
+    dados.update(extras)
+    return dados
+
+
+def registrar_transicao(conexao, acao, resultado, autor, **extras):
+    registrar(conexao, resultado.depois["id"], acao, autor, dados_transicao(resultado, **extras))
+
+
+async def registrar_transicao_async(conexao, acao, resultado, autor, **extras):
+    await registrar_async(conexao, resultado.depois["id"], acao, autor, dados_transicao(resultado, **extras))
+
+
+# ✏️ Campos que mudaram numa edição: {campo: [antes, depois]}
+def alteracoes(antes, depois):
+    return diff_campos.como_dict(diff_campos.diferencas(antes, depois))
+
+
+# 📜 Histórico de um chamado, em ordem cronológica
+def historico(thread_ts, limite=500):
+    with engine.connect() as conn:
+        return [dict(l._mapping) for l in conn.execute(SQL_HISTORICO, {"ts": thread_ts, "limite": limite})]
+
+
+def historico_por_id(ordem_id, limite=500):
+    with engine.connect() as conn:
+        return [dict(l._mapping) for l in conn.execute(SQL_HISTORICO_POR_ID, {"ordem_id": ordem_id, "limite": limite})]
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cache_exportacoes
+import metricas
+import services
+from despachante import despachante, PRIORIDADE_NORMAL, PRIORIDADE_LOTE
+
+# ⚙️ Limites de concorrência por formato e tamanho máximo da fila
+LIMITES_FORMATO = {
+    "pdf": int(os.getenv("EXPORT_MAX_PDF", "1")),
+    "xlsx": int(os.getenv("EXPORT_MAX_XLSX", "2")),
+    "csv": int(os.getenv("EXPORT_MAX_CSV", "2")),
+}
+MAX_PENDENTES = int(os.getenv("EXPORT_MAX_PENDENTES", "20"))
+INTERVALO_PROGRESSO = float(os.getenv("EXPORT_INTERVALO_PROGRESSO", "2"))
+RETENCAO_JOBS = int(os.getenv("EXPORT_RETENCAO_JOBS", "3600"))
+TIMEOUT_AVISO = float(os.getenv("EXPORT_TIMEOUT_AVISO", "30"))
+
+EXPORTADORES = {
+    "pdf": metricas.instrumentar(services.exportar_pdf, nome="exportar_pdf"),
+    "xlsx": metricas.instrumentar(services.enviar_relatorio_xlsx, nome="exportar_xlsx"),
+    "csv": metricas.instrumentar(services.enviar_relatorio, nome="exportar_csv"),
+}
+
+NOMES_FORMATO = {"pdf": "PDF", "xlsx": "Excel", "csv": "CSV"}
+
+
+class FilaCheia(Exception):
+    pass
+
+
+TEXTO_FILA_CHEIA = "⚠️ Muitas exportações em andamento. Tente novamente em alguns minutos."
+
+
+# 📝 Modal de exportação: (formato, data_inicio, data_fim), datas opcionais
+def ler_formulario(view):
+    valores = view["state"]["values"]
+    tipo = valores["tipo_arquivo"]["value"]["selected_option"]["value"]
+    data_inicio = valores["data_inicio"]["value"]["selected_date"]
+    data_fim = valores["data_fim"]["value"]["selected_date"]
+
+    data_inicio = datetime.strptime(data_inicio, "%Y-%m-%d") if data_inicio else None
+    data_fim = datetime.strptime(data_fim, "%Y-%m-%d") if data_fim else None
+    return tipo, data_inicio, data_fim
+
+
+# 📦 Um pedido de exportação
+class JobExportacao:
+    def __init__(self, user_id, formato, data_inicio, data_fim):
+        self.id = uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.formato = formato
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.status = "na fila"
+        self.linhas = 0
+        self.erro = None
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.finalizado_em = None
+        self.canal_dm = None
+        self.ts_mensagem = None
+        self.aviso_pendente = None  # Future do último aviso de progresso
+
+    def resumo(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "formato": self.formato,
+            "status": self.status,
+            "linhas": self.linhas,
+            "erro": self.erro,
+            "espera_s": round((self.iniciado_em or time.time()) - self.criado_em, 2),
+            "duracao_s": round(self.finalizado_em - self.iniciado_em, 2)
+            if self.finalizado_em and self.iniciado_em else None,
+        }
+
+
+# 🧵 Fila de exportação com um pool por formato
+class FilaExportacao:
+    def __init__(self, limites=None, max_pendentes=MAX_PENDENTES):
+        self.limites = dict(limites or LIMITES_FORMATO)
+        self.max_pendentes = max_pendentes
+        self._pools = {
+            formato: ThreadPoolExecutor(max_workers=max(1, limite), thread_name_prefix=f"export-{formato}")
+            for formato, limite in self.limites.items()
+        }
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def pendentes(self):
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status in ("na fila", "gerando"))
+
+    def enviar(self, client, user_id, formato, data_inicio=None, data_fim=None):
+        if formato not in self._pools:
+            formato = "csv"
+
+        job = JobExportacao(user_id, formato, data_inicio, data_fim)
+        with self._lock:
+            self._limpar_antigos()
+            ativos = sum(1 for j in self._jobs.values() if j.status in ("na fila", "gerando"))
+            if ativos >= self.max_pendentes:
+                raise FilaCheia()
+            self._jobs[job.id] = job
+
+        self._avisar(client, job, f"⏳ Seu relatório {NOMES_FORMATO[formato]} está na fila…")
+        self._pools[formato].submit(self._executar, client, job)
+        return job
+
+    def _executar(self, client, job):
+        job.status = "gerando"
+        job.iniciado_em = time.time()
+        self._avisar(client, job, f"⚙️ Gerando relatório {NOMES_FORMATO[job.formato]}…")
+
+        ultimo_aviso = [0.0]
+
+        def progresso(linhas):
+            job.linhas = linhas
+            agora = time.monotonic()
+            if agora - ultimo_aviso[0] >= INTERVALO_PROGRESSO:
+                ultimo_aviso[0] = agora
+                self._avisar_progresso(
+                    client, job,
+                    f"⚙️ Gerando relatório {NOMES_FORMATO[job.formato]}… {linhas:,} chamados processados".replace(",", ".")
+                )
+
+        try:
+            total = cache_exportacoes.exportar(
+                job.formato, EXPORTADORES[job.formato],
+                client, job.user_id, job.data_inicio, job.data_fim, progresso=progresso
+            )
+            job.linhas = total
+            if total:
+                job.status = "concluido"
+                texto = f"✅ Relatório {NOMES_FORMATO[job.formato]} concluído ({total:,} chamados).".replace(",", ".")
+            else:
+                job.status = "vazio"
+                texto = f"ℹ️ Nenhum chamado encontrado no período para o relatório {NOMES_FORMATO[job.formato]}."
+        except Exception as e:
+            print(f"❌ Erro na exportação {job.id} ({job.formato}): {e}")
+            job.status = "erro"
+            job.erro = str(e)
+            texto = f"❌ Não foi possível gerar o relatório {NOMES_FORMATO[job.formato]}. Tente novamente."
+        finally:
+            job.finalizado_em = time.time()
+
+        self._avisar(client, job, texto)
+
+    # 💬 Mensagem de status na DM, atualizada a cada etapa (pelo despachante;
+    # a thread do job espera a resposta, então as etapas chegam em ordem)
+    def _avisar(self, client, job, texto):
+        try:
+            if job.aviso_pendente is not None:
+                job.aviso_pendente.exception(timeout=TIMEOUT_AVISO)
+                job.aviso_pendente = None
+            if job.ts_mensagem:
+                despachante.enviar(
+                    client, "chat.update", PRIORIDADE_NORMAL, channel=job.canal_dm, ts=job.ts_mensagem, text=texto
+                ).result(timeout=TIMEOUT_AVISO)
+                return
+            if not job.canal_dm:
+                job.canal_dm = despachante.enviar(
+                    client, "conversations.open", PRIORIDADE_NORMAL, users=job.user_id
+                ).result(timeout=TIMEOUT_AVISO)["channel"]["id"]
+            resp = despachante.enviar(
+                client, "chat.postMessage", PRIORIDADE_NORMAL, channel=job.canal_dm, text=texto
+            ).result(timeout=TIMEOUT_AVISO)
+            job.ts_mensagem = resp["ts"]
+        except Exception as e:
+            print(f"❌ Erro ao atualizar status da exportação {job.id}: {e}")
+
+    # ⏱️ Progresso intermediário: baixa prioridade, sem bloquear a geração;
+    # pulado enquanto o aviso anterior ainda não saiu
+    def _avisar_progresso(self, client, job, texto):
+        if not job.ts_mensagem or (job.aviso_pendente is not None and not job.aviso_pendente.done()):
+            return
+        job.aviso_pendente = despachante.enviar(
+            client, "chat.update", PRIORIDADE_LOTE, channel=job.canal_dm, ts=job.ts_mensagem, text=texto
+        )
+
+    def _limpar_antigos(self):
+        limite = time.time() - RETENCAO_JOBS
+        for job_id in [j.id for j in self._jobs.values() if j.finalizado_em and j.finalizado_em < limite]:
+            del self._jobs[job_id]
+
+    def listar(self, user_id=None):
+        with self._lock:
+            return [j.resumo() for j in self._jobs.values() if user_id is None or j.user_id == user_id]
+
+    def encerrar(self, aguardar=True):
+        for pool in self._pools.values():
+            pool.shutdown(wait=aguardar)
+
+
+fila = FilaExportacao()
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ⚙️ Configuração via ambiente
+IDEMPOTENCIA_TTL = int(os.getenv("IDEMPOTENCIA_TTL", "900"))  # retries do Slack chegam em segundos
+IDEMPOTENCIA_MAX = int(os.getenv("IDEMPOTENCIA_MAX", "10000"))
+
+
+# 🔁 Chave de um envio de modal: o mesmo view.id reaparece em retries e duplo clique
+def chave_envio(view, user_id):
+    return f"{view.get('id') or view.get('hash')}:{user_id}"
+
+
+# 🧷 Envios já vistos nesta réplica (TTL + LRU). A chave única no banco
+# (ordens_servico.chave_idempotencia) cobre as outras réplicas.
+class EnviosRecentes:
+    def __init__(self, ttl=IDEMPOTENCIA_TTL, max_itens=IDEMPOTENCIA_MAX):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # chave -> expira_em
+        self._lock = threading.Lock()
+        self.novos = 0
+        self.repetidos = 0
+        self.repetidos_banco = 0
+
+    # True se a chave é nova (e fica reservada); False se é repetição
+    def reservar(self, chave):
+        agora = time.monotonic()
+        with self._lock:
+            expira_em = self._itens.get(chave)
+            if expira_em and expira_em > agora:
+                self.repetidos += 1
+                return False
+            self._itens[chave] = agora + self.ttl
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+            self.novos += 1
+            return True
+
+    # Falha antes de criar o chamado: deixa o usuário tentar de novo
+    def liberar(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    # Repetição que passou pela memória (outra réplica) e parou na chave única
+    def repetido_no_banco(self):
+        with self._lock:
+            self.repetidos_banco += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "novos": self.novos,
+                "repetidos": self.repetidos,
+                "repetidos_banco": self.repetidos_banco,
+            }
+
+
+envios = EnviosRecentes()
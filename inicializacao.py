@@ -0,0 +1,74 @@
+# 🚀 Subida comum a main.py e main_async.py: coletores do /metrics e tarefas
+# que só rodam na réplica líder. Os dois entrypoints só montam o Bolt.
+import json
+import os
+import signal
+
+import cache_exportacoes
+import exportacoes
+import idempotencia
+import metricas
+import resumos
+import services
+from agendador_sla import agendador
+from cache_usuarios import diretorio
+from database import estatisticas_pool
+from despachante import despachante
+from lideranca import lider, TarefaPeriodica
+
+# 🔔 Lembrete periódico dos chamados vencidos (LEMBRETE_VENCIDOS_INTERVALO; 0 desliga)
+INTERVALO_LEMBRETES = int(os.getenv("LEMBRETE_VENCIDOS_INTERVALO", "0"))
+
+# 🧹 Reservas de abertura pendentes: recupera pela mensagem ou expira (RESERVA_INTERVALO)
+INTERVALO_RESERVAS = int(os.getenv("RESERVA_INTERVALO", "60"))
+
+
+# 🔁 Verificador de SLA: acorda exatamente no próximo sla_limite
+def iniciar_verificacao_sla():
+    agendador.iniciar(metricas.instrumentar(services.verificar_sla_vencido))
+
+
+# 📊 Resumos diários de SLA: atualização incremental periódica (RESUMO_SLA_INTERVALO)
+def iniciar_resumos():
+    resumos.atualizador.iniciar(metricas.instrumentar(resumos.atualizar, nome="atualizar_resumos"))
+
+
+# 👑 Tarefas únicas só rodam na réplica líder (lideranca.py)
+def iniciar_tarefas_unicas():
+    lider.registrar("verificacao_sla", iniciar_verificacao_sla, agendador.parar)
+    lider.registrar("resumos_sla", iniciar_resumos, resumos.atualizador.parar)
+    reservas = TarefaPeriodica(
+        "reservas-pendentes", INTERVALO_RESERVAS,
+        metricas.instrumentar(lambda: services.recuperar_reservas(services.client_slack), nome="recuperar_reservas")
+    )
+    lider.registrar("reservas_pendentes", reservas.iniciar, reservas.parar)
+    if INTERVALO_LEMBRETES > 0:
+        lembretes = TarefaPeriodica(
+            "lembretes-vencidos", INTERVALO_LEMBRETES,
+            metricas.instrumentar(lambda: services.lembrar_chamados_vencidos(services.client_slack), nome="lembrar_vencidos")
+        )
+        lider.registrar("lembretes_vencidos", lembretes.iniciar, lembretes.parar)
+    lider.iniciar()
+
+
+# 📊 `kill -USR1 <pid>` imprime as estatísticas do pool de conexões
+def registrar_dump_estatisticas():
+    def dump(signum, frame):
+        print(f"📊 Pool do banco: {json.dumps(estatisticas_pool())}")
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, dump)
+
+
+# 📈 Endpoint Prometheus (METRICS_PORT) com gauges do pool, despachante, cache e filas
+def iniciar_metricas():
+    metricas.registrar_coletor("db_pool", estatisticas_pool)
+    metricas.registrar_coletor("despachante", despachante.metricas)
+    metricas.registrar_coletor("cache_usuarios", diretorio.estatisticas)
+    metricas.registrar_coletor("exportacoes", lambda: {"pendentes": exportacoes.fila.pendentes()})
+    metricas.registrar_coletor("cache_exportacoes", cache_exportacoes.cache.estatisticas)
+    metricas.registrar_coletor(
+        "sla", lambda: {"prazos_agendados": agendador.pendentes(), "avisos_recebidos": agendador.avisos}
+    )
+    metricas.registrar_coletor("lideranca", lider.estatisticas)
+    metricas.registrar_coletor("idempotencia", idempotencia.envios.estatisticas)
+    metricas.iniciar_servidor()
@@ -0,0 +1,181 @@
+# 👑 Eleição de líder entre réplicas do bot
+#
+# Várias réplicas podem rodar main.py ao mesmo tempo: o Slack distribui os
+# eventos entre as conexões Socket Mode abertas, então as interações escalam
+# horizontalmente. Tarefas que precisam rodar uma vez só (varredura de SLA,
+# resumos diários, lembretes) ficam com o líder.
+#
+# O líder é quem segura o advisory lock de sessão CHAVE_LOCK_LIDER numa
+# conexão dedicada (fora do pool, em AUTOCOMMIT). Se o processo morre, o
+# Postgres fecha a sessão e solta o lock; outra réplica o pega na próxima
+# tentativa (LIDER_INTERVALO). O líder confere a cada intervalo que ainda tem
+# o lock e, se a conexão cair, para as tarefas antes de tentar de novo. Até
+# essa conferência (no máximo um intervalo) o líder antigo ainda pode rodar uma
+# iteração junto com o novo; as tarefas atuais toleram isso (a varredura de SLA
+# é um UPDATE ... RETURNING e os resumos têm lock próprio).
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from database import engine
+
+INTERVALO = float(os.getenv("LIDER_INTERVALO", "5"))
+CHAVE_LOCK_LIDER = 7_318_003
+
+SQL_TRY_LOCK = text("SELECT pg_try_advisory_lock(:chave)")
+SQL_UNLOCK = text("SELECT pg_advisory_unlock(:chave)")
+SQL_CONFIRMAR = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'advisory' AND pid = pg_backend_pid()
+          AND classid = 0 AND objid = :chave AND objsubid = 1 AND granted
+    )
+""")
+
+# Sem isso, uma réplica isolada da rede só percebe que perdeu a sessão
+# quando o TCP desistir
+KEEPALIVE = {"keepalives": 1, "keepalives_idle": 10, "keepalives_interval": 5, "keepalives_count": 3}
+
+
+class Lideranca:
+    def __init__(self, chave=CHAVE_LOCK_LIDER, intervalo=INTERVALO):
+        self.chave = chave
+        self.intervalo = intervalo
+        self.lider = False
+        self.promocoes = 0
+        self.rebaixamentos = 0
+        self._tarefas = []  # (nome, iniciar, parar)
+        self._engine = None
+        self._conexao = None
+        self._desde = None
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # Tarefa única: `iniciar()` ao virar líder, `parar()` ao perder a liderança
+    def registrar(self, nome, iniciar, parar):
+        self._tarefas.append((nome, iniciar, parar))
+
+    def iniciar(self):
+        if engine.dialect.name != "postgresql":
+            print(f"👑 {engine.dialect.name}: sem advisory lock, esta instância roda as tarefas únicas.")
+            with self._lock:
+                self._promover()
+            return
+        self._engine = create_engine(engine.url, poolclass=NullPool, connect_args=KEEPALIVE)
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="lideranca", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=self.intervalo + 5)
+        with self._lock:
+            self._rebaixar()
+            self._fechar(soltar=True)
+
+    def _loop(self):
+        while not self._parar.is_set():
+            with self._lock:
+                try:
+                    if self.lider:
+                        self._confirmar()
+                    else:
+                        self._tentar()
+                except Exception as e:
+                    print(f"❌ Erro na eleição de líder: {e}")
+                    self._rebaixar()
+                    self._fechar()
+            self._parar.wait(self.intervalo)
+
+    def _tentar(self):
+        if self._conexao is None:
+            self._conexao = self._engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        if self._conexao.execute(SQL_TRY_LOCK, {"chave": self.chave}).scalar():
+            self._promover()
+
+    def _confirmar(self):
+        if not self._conexao.execute(SQL_CONFIRMAR, {"chave": self.chave}).scalar():
+            raise RuntimeError("lock de liderança não está mais com esta réplica")
+
+    def _promover(self):
+        self.lider = True
+        self.promocoes += 1
+        self._desde = time.time()
+        print(f"👑 Réplica {os.getpid()} virou líder; iniciando {len(self._tarefas)} tarefa(s) única(s).")
+        for nome, iniciar, _ in self._tarefas:
+            try:
+                iniciar()
+            except Exception as e:
+                print(f"❌ Erro ao iniciar tarefa {nome}: {e}")
+
+    def _rebaixar(self):
+        if not self.lider:
+            return
+        self.lider = False
+        self.rebaixamentos += 1
+        self._desde = None
+        print(f"👑 Réplica {os.getpid()} deixou a liderança; parando tarefas únicas.")
+        for nome, _, parar in reversed(self._tarefas):
+            try:
+                parar()
+            except Exception as e:
+                print(f"❌ Erro ao parar tarefa {nome}: {e}")
+
+    # Fechar a sessão solta o lock; `soltar` libera antes, no desligamento limpo
+    def _fechar(self, soltar=False):
+        if self._conexao is None:
+            return
+        try:
+            if soltar:
+                self._conexao.execute(SQL_UNLOCK, {"chave": self.chave})
+            self._conexao.close()
+        except Exception as e:
+            print(f"❌ Erro ao fechar conexão de liderança: {e}")
+        self._conexao = None
+
+    def estatisticas(self):
+        return {
+            "lider": int(self.lider),
+            "promocoes": self.promocoes,
+            "rebaixamentos": self.rebaixamentos,
+            "segundos_como_lider": round(time.time() - self._desde, 1) if self._desde else 0,
+        }
+
+
+lider = Lideranca()
+
+
+# 🔁 Tarefa única periódica (ex.: lembretes de chamados vencidos)
+class TarefaPeriodica:
+    def __init__(self, nome, intervalo, funcao):
+        self.nome = nome
+        self.intervalo = intervalo
+        self.funcao = funcao
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.nome, daemon=True)
+        self._thread.start()
+        print(f"🔁 Tarefa {self.nome} a cada {self.intervalo}s.")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=30)
+
+    def _loop(self):
+        # Espera um intervalo antes da primeira execução: trocar de líder não repete a tarefa
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.funcao()
+            except Exception as e:
+                print(f"❌ Erro na tarefa {self.nome}: {e}")
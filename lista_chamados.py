@@ -0,0 +1,218 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, literal_column, or_
+
+from database import SessionLocal
+from models import OrdemServico
+from templates import EMPREENDIMENTOS
+
+# 📋 /minhas-os-comercial paginado (keyset)
+#
+# A lista mostra Em Análise, Abertos, Fechados e Cancelados, nessa ordem e do
+# mais novo para o mais antigo (reservas pendentes da abertura ficam de fora).
+# Cada página é uma única consulta com LIMIT sobre ix_ordens_servico_solicitante_exibicao,
+# partindo da chave da última (ou primeira) linha exibida. O custo de uma
+# página não depende do tamanho do histórico do usuário.
+#
+# A chave é (ORDEM_STATUS, ABERTURA, id): expressões idênticas às do índice
+# (migração 10). data_abertura nula vira 1970-01-01, senão a comparação com
+# NULL tiraria a linha (e as seguintes) da paginação.
+#
+# O estado (filtros e tamanho da página) viaja no block_id dos seletores e
+# no value dos botões; nada fica guardado no servidor.
+
+STATUS_LISTA = ["em análise", "aberto", "fechado", "cancelado"]  # ordem de exibição
+ORDEM_STATUS_SQL = "CASE status WHEN 'em análise' THEN 0 WHEN 'aberto' THEN 1 WHEN 'fechado' THEN 2 ELSE 3 END"
+ABERTURA_SQL = "COALESCE(data_abertura, TIMESTAMP '1970-01-01')"
+ABERTURA_NULA = datetime(1970, 1, 1)
+TAMANHOS_PAGINA = [5, 10, 25]
+TAMANHO_PADRAO = 10
+TODOS = "*"
+
+PROXIMA = "lista_proxima"
+ANTERIOR = "lista_anterior"
+FILTRO_STATUS = "lista_filtro_status"
+FILTRO_EMPREENDIMENTO = "lista_filtro_empreendimento"
+FILTRO_TAMANHO = "lista_tamanho"
+PREFIXO_BLOCO = "lista|"
+
+EMOJI_STATUS = {"aberto": "🟢", "em análise": "🟡", "fechado": "⚪️", "cancelado": "❌"}
+TITULO_STATUS = {"aberto": "Abertos", "em análise": "Em Análise", "fechado": "Fechados", "cancelado": "Cancelados"}
+
+
+def _texto(texto):
+    return {"type": "plain_text", "text": texto}
+
+
+def _opcao(texto, valor=None):
+    return {"text": _texto(texto), "value": texto if valor is None else valor}
+
+
+_OPCAO_TODOS = {"text": _texto("Todos"), "value": TODOS}
+_OPCOES_STATUS = [_OPCAO_TODOS] + [_opcao(s) for s in STATUS_LISTA]
+_OPCOES_EMPREENDIMENTO = [_OPCAO_TODOS] + [_opcao(e) for e in EMPREENDIMENTOS]
+_OPCOES_TAMANHO = [_opcao(f"{n} por página", str(n)) for n in TAMANHOS_PAGINA]
+
+_COLUNAS = (
+    OrdemServico.id, OrdemServico.status, OrdemServico.data_abertura, OrdemServico.empreendimento,
+    OrdemServico.tipo_ticket, OrdemServico.responsavel, OrdemServico.sla_status,
+)
+_ORDEM = literal_column(ORDEM_STATUS_SQL)
+_ABERTURA = literal_column(ABERTURA_SQL)
+
+
+def estado_padrao():
+    return {"s": None, "e": None, "n": TAMANHO_PADRAO}
+
+
+def _chave(linha):
+    return [linha.status, linha.data_abertura.isoformat() if linha.data_abertura else None, linha.id]
+
+
+# 🔎 Uma página: no máximo `n + 1` linhas lidas do índice
+def buscar_pagina(user_id, estado, cursor=None, direcao=PROXIMA):
+    tamanho = estado["n"] if estado["n"] in TAMANHOS_PAGINA else TAMANHO_PADRAO
+    db = SessionLocal()
+    try:
+        q = db.query(*_COLUNAS).filter(
+            OrdemServico.solicitante == user_id, OrdemServico.status.in_(STATUS_LISTA)
+        )
+        if estado["s"]:
+            q = q.filter(OrdemServico.status == estado["s"])
+        if estado["e"]:
+            q = q.filter(OrdemServico.empreendimento == estado["e"])
+
+        if cursor:
+            status, abertura, id_ = cursor
+            ordem = STATUS_LISTA.index(status) if status in STATUS_LISTA else len(STATUS_LISTA) - 1
+            abertura = datetime.fromisoformat(abertura) if abertura else ABERTURA_NULA
+            # O limite simples em _ORDEM vira Index Cond; o OR completo fica como filtro
+            if direcao == PROXIMA:
+                q = q.filter(_ORDEM >= ordem, or_(
+                    _ORDEM > ordem,
+                    and_(_ORDEM == ordem, or_(
+                        _ABERTURA < abertura,
+                        and_(_ABERTURA == abertura, OrdemServico.id < id_),
+                    )),
+                ))
+            else:
+                q = q.filter(_ORDEM <= ordem, or_(
+                    _ORDEM < ordem,
+                    and_(_ORDEM == ordem, or_(
+                        _ABERTURA > abertura,
+                        and_(_ABERTURA == abertura, OrdemServico.id > id_),
+                    )),
+                ))
+
+        if direcao == PROXIMA:
+            q = q.order_by(_ORDEM, _ABERTURA.desc(), OrdemServico.id.desc())
+        else:
+            q = q.order_by(_ORDEM.desc(), _ABERTURA, OrdemServico.id)
+
+        linhas = q.limit(tamanho + 1).all()
+    finally:
+        db.close()
+
+    mais = len(linhas) > tamanho
+    linhas = linhas[:tamanho]
+    if direcao == PROXIMA:
+        tem_anterior, tem_proxima = cursor is not None, mais
+    else:
+        linhas.reverse()
+        tem_anterior, tem_proxima = mais, True
+    return linhas, tem_anterior, tem_proxima
+
+
+def _mencao(valor):
+    if not valor:
+        return "–"
+    if valor.startswith("S"):
+        return f"<!subteam^{valor}>"
+    return f"<@{valor}>"
+
+
+def _selecao(action_id, opcoes, valor, placeholder):
+    atual = next((o for o in opcoes if o["value"] == valor), opcoes[0])
+    return {
+        "type": "static_select",
+        "action_id": action_id,
+        "placeholder": _texto(placeholder),
+        "options": opcoes,
+        "initial_option": atual,
+    }
+
+
+def _botao(texto, action_id, estado, cursor):
+    return {
+        "type": "button",
+        "text": _texto(texto),
+        "action_id": action_id,
+        "value": json.dumps({"f": estado, "c": cursor}, separators=(",", ":"), ensure_ascii=False),
+    }
+
+
+# 🖨️ Blocos da página (tamanho limitado: no máximo 25 linhas em 4 seções)
+def render_pagina(estado, linhas, tem_anterior, tem_proxima):
+    filtros = {
+        "type": "actions",
+        "block_id": PREFIXO_BLOCO + json.dumps(estado, separators=(",", ":"), ensure_ascii=False),
+        "elements": [
+            _selecao(FILTRO_STATUS, _OPCOES_STATUS, estado["s"] or TODOS, "Status"),
+            _selecao(FILTRO_EMPREENDIMENTO, _OPCOES_EMPREENDIMENTO, estado["e"] or TODOS, "Empreendimento"),
+            _selecao(FILTRO_TAMANHO, _OPCOES_TAMANHO, str(estado["n"]), "Por página"),
+        ],
+    }
+    blocos = [
+        {"type": "section", "text": {"type": "mrkdwn", "text": "📋 *Seus Chamados:*"}},
+        filtros,
+        {"type": "divider"},
+    ]
+
+    if not linhas:
+        blocos.append({"type": "section", "text": {"type": "mrkdwn", "text": "Nenhum chamado encontrado com esses filtros."}})
+
+    grupos = {}
+    for c in linhas:
+        sla_emoji = "🔴" if c.sla_status == "fora do prazo" else "🟢"
+        grupos.setdefault(c.status, []).append(
+            f"{sla_emoji} ID {c.id} | {c.empreendimento} | {c.tipo_ticket} | Resp: {_mencao(c.responsavel)}"
+        )
+    for status, itens in grupos.items():
+        titulo = f"{EMOJI_STATUS.get(status, '•')} *{TITULO_STATUS.get(status, status)}:*"
+        blocos.append({"type": "section", "text": {"type": "mrkdwn", "text": titulo + "\n" + "\n".join(itens)}})
+
+    navegacao = []
+    if tem_anterior:
+        navegacao.append(_botao("⬅️ Anteriores", ANTERIOR, estado, _chave(linhas[0])))
+    if tem_proxima and linhas:
+        navegacao.append(_botao("Próximos ➡️", PROXIMA, estado, _chave(linhas[-1])))
+    if navegacao:
+        blocos.append({"type": "actions", "elements": navegacao})
+
+    return {"text": "📋 Seus Chamados", "blocks": blocos}
+
+
+def pagina(user_id, estado=None, cursor=None, direcao=PROXIMA):
+    estado = estado or estado_padrao()
+    return render_pagina(estado, *buscar_pagina(user_id, estado, cursor, direcao))
+
+
+# 🖱️ Clique em "próximos/anteriores" ou troca de filtro
+def tratar_acao(body):
+    acao = body["actions"][0]
+    user_id = body["user"]["id"]
+
+    if acao["action_id"] in (PROXIMA, ANTERIOR):
+        dados = json.loads(acao["value"])
+        return pagina(user_id, dados["f"], dados["c"], acao["action_id"])
+
+    estado = json.loads(acao["block_id"][len(PREFIXO_BLOCO):])
+    valor = acao["selected_option"]["value"]
+    if acao["action_id"] == FILTRO_STATUS:
+        estado["s"] = None if valor == TODOS else valor
+    elif acao["action_id"] == FILTRO_EMPREENDIMENTO:
+        estado["e"] = None if valor == TODOS else valor
+    elif acao["action_id"] == FILTRO_TAMANHO:
+        estado["n"] = int(valor)
+    return pagina(user_id, estado)
@@ -0,0 +1,311 @@
+import json
+import os
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text
+
+import eventos
+from agendador_sla import agendador
+from database import engine
+from despachante import despachante, PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE
+from transicoes import TRANSICOES
+
+# 📦 Operações em lote (/os-comercial-lote)
+#
+# Os chamados escolhidos por filtro mudam num único comando:
+#   WITH alvo AS (SELECT ... WHERE filtros LIMIT n),
+#        alterado AS (UPDATE ... FROM alvo WHERE status IN (origens) RETURNING ...),
+#        registro AS (INSERT INTO ordens_servico_eventos SELECT ... FROM alterado)
+#   SELECT * FROM alterado
+# O UPDATE reconfere o status de cada linha, então um clique concorrente
+# num chamado do lote vence e o chamado simplesmente fica de fora. Os avisos
+# nas threads saem depois, pelo despachante em PRIORIDADE_LOTE.
+
+LOTE_MAX = int(os.getenv("LOTE_MAX_CHAMADOS", "1000"))
+
+REATRIBUIR = "reatribuir"
+
+# ação -> (status de origem permitidos, status de destino). As transições são as
+# mesmas de um clique (transicoes.TRANSICOES); reatribuir não muda o status
+ACOES = {
+    "capturar": TRANSICOES["capturar"],
+    "finalizar": TRANSICOES["finalizar"],
+    "cancelar": TRANSICOES["cancelar"],
+    REATRIBUIR: (("aberto", "em análise"), None),
+}
+
+# ação -> colunas alteradas além do status
+COLUNAS = {
+    "capturar": ("responsavel", "capturado_por", "data_captura"),
+    "finalizar": ("data_fechamento",),
+    "cancelar": ("motivo_cancelamento", "data_fechamento"),
+    REATRIBUIR: ("responsavel", "data_ultima_edicao", "ultimo_editor"),
+}
+
+TIPOS_EVENTO = {
+    "capturar": eventos.CAPTURAR,
+    "finalizar": eventos.FINALIZAR,
+    "cancelar": eventos.CANCELAR,
+    REATRIBUIR: eventos.REATRIBUIR,
+}
+
+FILTROS = ("empreendimento", "responsavel", "status", "idade_dias")
+
+Pedido = namedtuple("Pedido", ["acao", "empreendimento", "responsavel", "status", "idade_dias",
+                               "novo_responsavel", "motivo"])
+
+_cache_sql = {}
+
+
+# 📝 Lê o modal (templates.render_view_lote)
+def ler_formulario(view):
+    valores = view["state"]["values"]
+
+    def selecionado(bloco):
+        opcao = valores.get(bloco, {}).get("value", {}).get("selected_option")
+        return opcao["value"] if opcao else None
+
+    status = valores.get("status", {}).get("value", {}).get("selected_options") or []
+    idade = valores.get("idade_dias", {}).get("value", {}).get("value")
+    motivo = valores.get("motivo", {}).get("value", {}).get("value")
+    return Pedido(
+        acao=selecionado("acao"),
+        empreendimento=selecionado("empreendimento"),
+        responsavel=selecionado("responsavel"),
+        status=tuple(o["value"] for o in status),
+        idade_dias=int(idade) if idade is not None else None,
+        novo_responsavel=selecionado("novo_responsavel"),
+        motivo=(motivo or "").strip() or None,
+    )
+
+
+# ⚠️ Erros por block_id, no formato do response_action="errors"
+def validar(pedido):
+    erros = {}
+    if not any(getattr(pedido, f) for f in FILTROS):
+        erros["empreendimento"] = "Escolha ao menos um filtro."
+    if pedido.acao in ACOES:
+        permitidos = ACOES[pedido.acao][0]
+        fora = [s for s in pedido.status if s not in permitidos]
+        if fora:
+            erros["status"] = f"Esta ação vale só para chamados {' ou '.join(permitidos)}; tire {', '.join(fora)} do filtro."
+    if pedido.idade_dias is not None and pedido.idade_dias < 0:
+        erros["idade_dias"] = "Informe um número de dias positivo."
+    if pedido.acao == REATRIBUIR and not pedido.novo_responsavel:
+        erros["novo_responsavel"] = "Escolha para quem reatribuir."
+    if pedido.acao == "cancelar" and not pedido.motivo:
+        erros["motivo"] = "Descreva o motivo do cancelamento."
+    return erros
+
+
+# Status de origem da ação restritos ao filtro de status (vazio: nada a fazer)
+def origens(pedido):
+    permitidos = ACOES[pedido.acao][0]
+    if not pedido.status:
+        return list(permitidos)
+    return [s for s in permitidos if s in pedido.status]
+
+
+def montar_sql(acao, filtros):
+    chave = (acao, tuple(filtros))
+    if chave in _cache_sql:
+        return _cache_sql[chave]
+
+    condicoes = "".join({
+        "empreendimento": " AND o.empreendimento = :empreendimento",
+        "responsavel": " AND o.responsavel = :responsavel",
+        "idade_dias": " AND o.data_abertura <= :corte",
+    }[f] for f in filtros)
+    if acao == REATRIBUIR:
+        condicoes += " AND o.responsavel IS DISTINCT FROM :v_responsavel"
+    sets = ", ".join(f"{c} = :v_{c}" for c in COLUNAS[acao])
+    if ACOES[acao][1] is not None:
+        sets = f"status = :novo_status, {sets}"
+    if acao == REATRIBUIR:
+        dados = "jsonb_build_object('responsavel', jsonb_build_array(a_responsavel, responsavel))"
+    else:
+        dados = "jsonb_build_object('status', jsonb_build_array(a_status, status))"
+
+    sql = text(f"""
+        WITH alvo AS (
+            SELECT o.id, o.status AS a_status, o.responsavel AS a_responsavel
+            FROM ordens_servico o
+            WHERE o.status IN :origens{condicoes}
+            ORDER BY o.id
+            LIMIT :limite
+        ), alterado AS (
+            UPDATE ordens_servico o SET {sets}
+            FROM alvo
+            WHERE o.id = alvo.id AND o.status IN :origens
+            RETURNING o.id, alvo.a_status, alvo.a_responsavel, o.status, o.responsavel,
+                      o.thread_ts, o.canal_id, o.sla_limite, o.sla_status
+        ), registro AS (
+            INSERT INTO ordens_servico_eventos (ordem_id, tipo, autor, criado_em, dados)
+            SELECT id, CAST(:tipo AS TEXT), CAST(:autor AS TEXT), CAST(:agora AS TIMESTAMP),
+                   CAST(:extras AS JSONB) || {dados}
+            FROM alterado
+        )
+        SELECT * FROM alterado ORDER BY id
+    """).bindparams(bindparam("origens", expanding=True))
+    _cache_sql[chave] = sql
+    return sql
+
+
+def parametros(pedido, autor, lote_id, agora):
+    valores = {
+        "capturar": {"responsavel": autor, "capturado_por": autor, "data_captura": agora},
+        "finalizar": {"data_fechamento": agora},
+        "cancelar": {"motivo_cancelamento": pedido.motivo, "data_fechamento": agora},
+        REATRIBUIR: {"responsavel": pedido.novo_responsavel, "data_ultima_edicao": agora, "ultimo_editor": autor},
+    }[pedido.acao]
+    extras = {"lote": lote_id}
+    if pedido.acao == "cancelar":
+        extras["motivo"] = pedido.motivo
+
+    params = {
+        "origens": origens(pedido),
+        "limite": LOTE_MAX,
+        "novo_status": ACOES[pedido.acao][1],
+        "tipo": TIPOS_EVENTO[pedido.acao],
+        "autor": autor,
+        "agora": agora,
+        "extras": json.dumps(extras, ensure_ascii=False),
+        "empreendimento": pedido.empreendimento,
+        "responsavel": pedido.responsavel,
+        "corte": agora - timedelta(days=pedido.idade_dias) if pedido.idade_dias is not None else None,
+    }
+    params.update({f"v_{c}": v for c, v in valores.items()})
+    return params
+
+
+def _filtros(pedido):
+    filtros = [f for f in ("empreendimento", "responsavel") if getattr(pedido, f)]
+    if pedido.idade_dias is not None:
+        filtros.append("idade_dias")
+    return filtros
+
+
+# 🚦 Aplica o lote; devolve as linhas alteradas. `conexao` permite compor (ou desfazer, no bench)
+def aplicar(pedido, autor, conexao=None):
+    if not origens(pedido):
+        return []
+    sql = montar_sql(pedido.acao, _filtros(pedido))
+    params = parametros(pedido, autor, uuid.uuid4().hex[:12], datetime.utcnow())
+
+    if conexao is not None:
+        return [dict(l._mapping) for l in conexao.execute(sql, params)]
+
+    with engine.begin() as conn:
+        return [dict(l._mapping) for l in conn.execute(sql, params)]
+
+
+async def aplicar_async(pedido, autor, conexao=None):
+    from database import get_async_engine
+
+    if not origens(pedido):
+        return []
+    sql = montar_sql(pedido.acao, _filtros(pedido))
+    params = parametros(pedido, autor, uuid.uuid4().hex[:12], datetime.utcnow())
+
+    if conexao is not None:
+        return [dict(l._mapping) for l in await conexao.execute(sql, params)]
+
+    async with get_async_engine().begin() as conn:
+        return [dict(l._mapping) for l in await conn.execute(sql, params)]
+
+
+def _mencao(responsavel):
+    return f"<!subteam^{responsavel}>" if responsavel.startswith("S") else f"<@{responsavel}>"
+
+
+def texto_thread(pedido, autor):
+    if pedido.acao == "capturar":
+        return f"🔄 Chamado capturado por <@{autor}> (em lote)."
+    if pedido.acao == "finalizar":
+        return f"✅ Chamado finalizado por <@{autor}> (em lote)."
+    if pedido.acao == "cancelar":
+        return f"❌ Chamado cancelado por <@{autor}> (em lote).\n*Motivo:* {pedido.motivo}"
+    return f"👤 Chamado reatribuído para {_mencao(pedido.novo_responsavel)} por <@{autor}> (em lote)."
+
+
+def texto_resumo(pedido, linhas, duracao_ms):
+    verbo = {
+        "capturar": "capturado(s)", "finalizar": "finalizado(s)",
+        "cancelar": "cancelado(s)", REATRIBUIR: "reatribuído(s)",
+    }[pedido.acao]
+    if not linhas:
+        return "ℹ️ Nenhum chamado atende aos filtros escolhidos."
+    texto = f"📦 {len(linhas)} chamado(s) {verbo} em {duracao_ms:.0f} ms. Os avisos nas threads estão sendo enviados."
+    if len(linhas) >= LOTE_MAX:
+        texto += f"\n⚠️ O lote é limitado a {LOTE_MAX} chamados; rode de novo para continuar."
+    return texto
+
+
+# 📣 Prazos de SLA e avisos nas threads; os avisos entram na fila do despachante
+def notificar(client, pedido, linhas, autor):
+    canal_padrao = os.getenv("SLACK_CANAL_CHAMADOS", "#comercial")
+    texto = texto_thread(pedido, autor)
+    for linha in linhas:
+        if pedido.acao == "capturar":
+            if linha["sla_status"] == "dentro do prazo":
+                agendador.agendar(linha["thread_ts"], linha["sla_limite"])
+        elif pedido.acao in ("finalizar", "cancelar"):
+            agendador.remover(linha["thread_ts"])
+        if linha["thread_ts"]:
+            despachante.enviar(client, "chat.postMessage", PRIORIDADE_LOTE,
+                channel=linha["canal_id"] or canal_padrao,
+                thread_ts=linha["thread_ts"],
+                text=texto
+            )
+
+
+# 🧰 Fluxo completo do modal: aplica, agenda os avisos e responde ao autor
+def _aviso_falha(pedido, erro, autor, canal_resposta):
+    print(f"❌ Erro ao aplicar lote {pedido.acao}: {erro}")
+    return {
+        "channel": canal_resposta or autor, "user": autor,
+        "text": "❌ Não foi possível aplicar o lote. Nenhum chamado foi alterado.",
+    }
+
+
+# Os avisos nas threads vão por `client_threads` (síncrono: o despachante usa threads próprias)
+def _concluir(client_threads, pedido, linhas, autor, canal_resposta, inicio):
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    print(f"📦 Lote {pedido.acao} de <@{autor}>: {len(linhas)} chamado(s) em {duracao_ms:.1f} ms")
+
+    notificar(client_threads, pedido, linhas, autor)
+    return {"channel": canal_resposta or autor, "user": autor, "text": texto_resumo(pedido, linhas, duracao_ms)}
+
+
+def executar(client, pedido, autor, canal_resposta):
+    inicio = time.perf_counter()
+    try:
+        linhas = aplicar(pedido, autor)
+    except Exception as e:
+        despachante.enviar(client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+            **_aviso_falha(pedido, e, autor, canal_resposta)
+        )
+        return []
+    despachante.enviar(client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+        **_concluir(client, pedido, linhas, autor, canal_resposta, inicio)
+    )
+    return linhas
+
+
+# 🔀 Versão asyncio (main_async.py): resposta pelo AsyncWebClient, avisos pelo `client_threads`
+async def executar_async(client, client_threads, pedido, autor, canal_resposta):
+    inicio = time.perf_counter()
+    try:
+        linhas = await aplicar_async(pedido, autor)
+    except Exception as e:
+        await despachante.enviar_async(client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+            **_aviso_falha(pedido, e, autor, canal_resposta)
+        )
+        return []
+    await despachante.enviar_async(client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+        **_concluir(client_threads, pedido, linhas, autor, canal_resposta, inicio)
+    )
+    return linhas
@@ -0,0 +1,231 @@
+# 📦 Slack Bolt em modo asyncio
+# Alternativa ao main.py: um único event loop atende todas as interações,
+# com AsyncWebClient (aiohttp) e acesso assíncrono ao banco (asyncpg).
+#
+#   python main_async.py
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+
+# 🗃️ Banco de dados
+from database import engine, get_async_engine
+
+# 📚 Serviços internos (os fluxos são os mesmos do main.py, na versão asyncio)
+import services
+import exportacoes
+import templates
+import metricas
+import lista_chamados
+import resumos
+import lote
+import inicializacao
+from despachante import despachante, PRIORIDADE_INTERATIVA
+
+# 🛠️ Utilitários
+import asyncio
+import re
+import os
+from dotenv import load_dotenv
+
+# 🔐 Variáveis de ambiente
+load_dotenv()
+# SLACK_API_URL troca o host da Web API (ex.: o Slack falso do bench/carga.py)
+SLACK_API_URL = os.getenv("SLACK_API_URL", WebClient.BASE_URL)
+if SLACK_API_URL == WebClient.BASE_URL:
+    app = AsyncApp(token=os.getenv("SLACK_BOT_TOKEN"))
+else:
+    app = AsyncApp(client=AsyncWebClient(token=os.getenv("SLACK_BOT_TOKEN"), base_url=SLACK_API_URL))
+
+# Exportações, a lista de chamados e os avisos do lote continuam síncronos e rodam fora do event loop
+client_sync = WebClient(token=os.getenv("SLACK_BOT_TOKEN"), base_url=SLACK_API_URL)
+
+# 📈 Latência até o ack, tempo de banco e de Slack API por listener
+app.use(metricas.middleware_ack_async)
+metricas.instrumentar_engine(engine)
+metricas.instrumentar_engine(get_async_engine())
+metricas.instrumentar_cliente(client_sync)
+metricas.instrumentar_cliente(services.client_slack)
+
+
+@app.command("/comercial-os")
+@metricas.instrumentar
+async def handle_chamado_command(ack, body, client, logger):
+    await ack()
+
+    try:
+        await client.views_open(trigger_id=body["trigger_id"], view=templates.VIEW_ABERTURA)
+    except Exception as e:
+        logger.error(f"❌ Erro ao abrir modal de chamado: {e}")
+        await despachante.enviar_async(
+            client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+            channel=body.get("channel_id", os.getenv("SLACK_CANAL_CHAMADOS", "#comercial")),
+            user=body["user_id"],
+            text="❌ Ocorreu um erro ao abrir o formulário de chamado. Tente novamente."
+        )
+
+
+@app.view("modal_abertura_chamado")
+@metricas.instrumentar
+async def handle_modal_submission(ack, body, view, client, logger):
+    await ack()
+    await services.abrir_chamado_async(client, body, view, logger)
+
+
+# 🎯 Ações de Botões
+@app.action("capturar_chamado")
+@metricas.instrumentar
+async def handle_capturar(ack, body, client):
+    await ack()
+    await services.transicionar_chamado_async(client, services.pedido_captura(body))
+
+
+@app.action("finalizar_chamado")
+@metricas.instrumentar
+async def handle_finalizar(ack, body, client):
+    await ack()
+    await services.transicionar_chamado_async(client, services.pedido_finalizacao(body))
+
+
+@app.action("reabrir_chamado")
+@metricas.instrumentar
+async def handle_reabrir(ack, body, client):
+    await ack()
+    await client.views_open(trigger_id=body["trigger_id"], view=services.montar_view_reabertura(body["message"]["ts"]))
+
+
+@app.action("editar_chamado")
+@metricas.instrumentar
+async def handle_editar(ack, body, client):
+    await ack()
+    await services.abrir_modal_edicao_async(client, body["trigger_id"], body["message"]["ts"])
+
+
+@app.action("cancelar_chamado")
+@metricas.instrumentar
+async def handle_cancelar(ack, body, client):
+    await ack()
+    await client.views_open(trigger_id=body["trigger_id"], view=services.montar_view_cancelamento(body["message"]["ts"]))
+
+
+# 🎯 View Submissions
+@app.view("cancelar_chamado_modal")
+@metricas.instrumentar
+async def handle_cancelar_submit(ack, body, view, client):
+    await ack()
+    await services.transicionar_chamado_async(client, services.pedido_cancelamento(body, view))
+
+
+@app.view("reabrir_chamado_modal")
+@metricas.instrumentar
+async def handle_reabrir_submit(ack, body, view, client):
+    await ack()
+    nome_real = await services.get_nome_slack_async(client, body["user"]["id"])
+    await services.transicionar_chamado_async(client, services.pedido_reabertura(body, view, nome_real))
+
+
+@app.view("editar_chamado_modal")
+@metricas.instrumentar
+async def handle_editar_submit(ack, body, view, client):
+    await ack()
+    await services.editar_chamado_async(client, body, view)
+
+
+# 📋 Comando listar meus chamados
+@app.command("/minhas-os-comercial")
+@metricas.instrumentar
+async def handle_meus_chamados(ack, body):
+    await ack()
+    await asyncio.to_thread(services.exibir_lista, client_sync, body["user_id"])
+
+
+@app.action(re.compile(r"^lista_"))
+@metricas.instrumentar
+async def handle_lista(ack, body, respond):
+    await ack()
+    pagina = await asyncio.to_thread(lista_chamados.tratar_acao, body)
+    await respond(replace_original=True, **pagina)
+
+
+# 📊 Resumo de SLA (lê só os resumos diários pré-agregados)
+@app.command("/sla-comercial")
+@metricas.instrumentar
+async def handle_sla_command(ack, body, respond):
+    await ack()
+    mensagem = await asyncio.to_thread(resumos.mensagem, body.get("text"))
+    await respond(response_type="ephemeral", **mensagem)
+
+
+# 📦 Operações em lote: filtra os chamados e aplica a ação num único UPDATE (lote.py)
+@app.command("/os-comercial-lote")
+@metricas.instrumentar
+async def handle_lote_command(ack, body, client):
+    await ack()
+    await client.views_open(trigger_id=body["trigger_id"], view=templates.render_view_lote(body["channel_id"]))
+
+
+@app.view("lote_chamados_modal")
+@metricas.instrumentar
+async def handle_lote_submit(ack, body, view, client):
+    pedido = lote.ler_formulario(view)
+    erros = lote.validar(pedido)
+    if erros:
+        await ack(response_action="errors", errors=erros)
+        return
+    await ack()
+    await lote.executar_async(client, client_sync, pedido, body["user"]["id"], view["private_metadata"])
+
+
+# 📤 Exportar chamados
+@app.command("/exportar-os-comercial")
+@metricas.instrumentar
+async def handle_exportar_command(ack, body, client, logger):
+    await ack()
+
+    try:
+        await client.views_open(
+            trigger_id=body["trigger_id"],
+            view=templates.render_view_exportacao(body["user_id"])
+        )
+    except Exception as e:
+        logger.error(f"❌ Erro ao abrir modal de exportação: {e}")
+        await despachante.enviar_async(
+            client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+            channel=body["channel_id"],
+            user=body["user_id"],
+            text="❌ Ocorreu um erro ao abrir o modal de exportação. Tente novamente."
+        )
+
+
+@app.view("escolher_exportacao")
+@metricas.instrumentar
+async def exportar_chamados_handler(ack, body, view, client):
+    await ack()
+    user_id = body["user"]["id"]
+    tipo, data_inicio, data_fim = exportacoes.ler_formulario(view)
+
+    try:
+        await asyncio.to_thread(exportacoes.fila.enviar, client_sync, user_id, tipo, data_inicio, data_fim)
+    except exportacoes.FilaCheia:
+        await despachante.enviar_async(
+            client, "chat.postEphemeral", PRIORIDADE_INTERATIVA,
+            channel=user_id,
+            user=user_id,
+            text=exportacoes.TEXTO_FILA_CHEIA
+        )
+
+
+async def main():
+    inicializacao.registrar_dump_estatisticas()
+    inicializacao.iniciar_metricas()
+    inicializacao.iniciar_tarefas_unicas()
+    handler = AsyncSocketModeHandler(app, os.getenv("SLACK_APP_TOKEN"))
+    await handler.connect_async()
+    services.precarregar_backends()
+    services.aquecer_diretorio()
+    print("⚡️ Bolt app is running!")
+    await asyncio.sleep(float("inf"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
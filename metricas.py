@@ -0,0 +1,333 @@
+import contextvars
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event
+
+# 📈 Métricas do bot em formato Prometheus
+#
+#   GET http://METRICS_HOST:METRICS_PORT/metrics
+#
+# - middleware_ack / middleware_ack_async (Bolt, global): tempo até o ack()
+# - @instrumentar nos listeners e jobs: duração total, tempo de banco e de
+#   Slack API por execução, e contagem de erros
+# - instrumentar_engine: eventos before/after_cursor_execute do SQLAlchemy
+# - instrumentar_cliente: envolve o api_call de um WebClient/AsyncWebClient
+# - registrar_coletor: gauges lidos na hora do scrape (pool, despachante, cache)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 desliga o endpoint
+
+# O Slack desiste da interação em 3s; os limites ficam densos até lá
+LIMITES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 2.5, 3.0, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def amostras(self):
+        with self._lock:
+            itens = list(self._valores.items())
+        for valores, total in itens:
+            yield f"{self.nome}{_rotulos(self.rotulos, valores)} {total}"
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(limites)
+        self._series = {}  # valores dos rótulos -> [contagens por faixa..., soma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, segundos, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * len(self.limites) + [0.0, 0]
+            for i, limite in enumerate(self.limites):
+                if segundos <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += segundos
+            serie[-1] += 1
+
+    def amostras(self):
+        with self._lock:
+            itens = [(v, list(s)) for v, s in self._series.items()]
+        for valores, serie in itens:
+            acumulado = 0
+            for limite, n in zip(self.limites, serie):
+                acumulado += n
+                le = 'le="%s"' % limite
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {acumulado}"
+            le = 'le="+Inf"'
+            yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {serie[-1]}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {serie[-2]}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, valores)} {serie[-1]}"
+
+
+ack_segundos = Histograma(
+    "bolt_ack_segundos", "Tempo entre a chegada da requisição e o ack()", ("tipo", "listener"))
+listener_segundos = Histograma(
+    "listener_duracao_segundos", "Duração total do listener/job", ("listener",))
+listener_db_segundos = Histograma(
+    "listener_db_segundos", "Tempo de banco por execução do listener/job", ("listener",))
+listener_slack_segundos = Histograma(
+    "listener_slack_segundos", "Tempo de Slack API por execução do listener/job", ("listener",))
+listener_erros = Contador(
+    "listener_erros_total", "Exceções levantadas por listener/job", ("listener",))
+db_consulta_segundos = Histograma(
+    "db_consulta_segundos", "Duração de cada comando SQL")
+slack_api_segundos = Histograma(
+    "slack_api_segundos", "Duração de cada chamada à Slack Web API", ("metodo",))
+slack_api_erros = Contador(
+    "slack_api_erros_total", "Chamadas à Slack Web API que falharam", ("metodo",))
+
+METRICAS = [
+    ack_segundos, listener_segundos, listener_db_segundos, listener_slack_segundos, listener_erros,
+    db_consulta_segundos, slack_api_segundos, slack_api_erros,
+]
+
+_coletores = []
+
+
+# 📊 Gauges calculados no scrape; dicts aninhados viram prefixo_chave_subchave
+def registrar_coletor(prefixo, funcao):
+    _coletores.append((prefixo, funcao))
+
+
+def _achatar(prefixo, dados):
+    for chave, valor in dados.items():
+        nome = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefixo}_{chave}")
+        if isinstance(valor, dict):
+            yield from _achatar(nome, valor)
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            yield nome, valor
+
+
+def texto_prometheus():
+    linhas = []
+    for metrica in METRICAS:
+        linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+        linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        linhas.extend(metrica.amostras())
+    for prefixo, funcao in _coletores:
+        try:
+            valores = list(_achatar(prefixo, funcao()))
+        except Exception as e:
+            print(f"❌ Erro ao coletar métricas de {prefixo}: {e}")
+            continue
+        for nome, valor in valores:
+            linhas.append(f"# TYPE {nome} gauge")
+            linhas.append(f"{nome} {valor}")
+    return "\n".join(linhas) + "\n"
+
+
+# 🧵 Tempo de banco/Slack da execução corrente (thread ou task asyncio)
+_execucao = contextvars.ContextVar("metricas_execucao", default=None)
+
+
+def _somar(campo, segundos):
+    atual = _execucao.get()
+    if atual is not None:
+        atual[campo] += segundos
+
+
+def _finalizar(nome, inicio, atual):
+    listener_segundos.observar(time.perf_counter() - inicio, nome)
+    listener_db_segundos.observar(atual["db"], nome)
+    listener_slack_segundos.observar(atual["slack"], nome)
+
+
+# ⏱️ Decorator para listeners (sync ou async) e jobs; preserva a assinatura
+# para a injeção de argumentos do Bolt
+def instrumentar(funcao=None, nome=None):
+    if funcao is None:
+        return functools.partial(instrumentar, nome=nome)
+    nome = nome or funcao.__name__
+
+    if inspect.iscoroutinefunction(funcao):
+        @functools.wraps(funcao)
+        async def envolvida(*args, **kwargs):
+            atual = {"db": 0.0, "slack": 0.0}
+            token = _execucao.set(atual)
+            inicio = time.perf_counter()
+            try:
+                return await funcao(*args, **kwargs)
+            except Exception:
+                listener_erros.inc(nome)
+                raise
+            finally:
+                _finalizar(nome, inicio, atual)
+                _execucao.reset(token)
+    else:
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            atual = {"db": 0.0, "slack": 0.0}
+            token = _execucao.set(atual)
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            except Exception:
+                listener_erros.inc(nome)
+                raise
+            finally:
+                _finalizar(nome, inicio, atual)
+                _execucao.reset(token)
+
+    return envolvida
+
+
+# 🗃️ Hooks do SQLAlchemy (aceita Engine ou AsyncEngine)
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    context._metricas_inicio = time.perf_counter()
+
+
+def _depois_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_metricas_inicio", None)
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    db_consulta_segundos.observar(segundos)
+    _somar("db", segundos)
+
+
+def instrumentar_engine(engine):
+    alvo = getattr(engine, "sync_engine", engine)
+    if not event.contains(alvo, "before_cursor_execute", _antes_consulta):
+        event.listen(alvo, "before_cursor_execute", _antes_consulta)
+        event.listen(alvo, "after_cursor_execute", _depois_consulta)
+    return engine
+
+
+# 💬 Slack API: envolve o api_call da instância (todos os métodos passam por ele)
+def _registrar_slack(metodo, inicio):
+    segundos = time.perf_counter() - inicio
+    slack_api_segundos.observar(segundos, metodo)
+    _somar("slack", segundos)
+
+
+def instrumentar_cliente(client):
+    if getattr(client, "_metricas_instrumentado", False):
+        return client
+    original = client.api_call
+
+    if inspect.iscoroutinefunction(original):
+        async def api_call(api_method, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return await original(api_method, **kwargs)
+            except Exception:
+                slack_api_erros.inc(api_method)
+                raise
+            finally:
+                _registrar_slack(api_method, inicio)
+    else:
+        def api_call(api_method, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return original(api_method, **kwargs)
+            except Exception:
+                slack_api_erros.inc(api_method)
+                raise
+            finally:
+                _registrar_slack(api_method, inicio)
+
+    client.api_call = api_call
+    client._metricas_instrumentado = True
+    return client
+
+
+# 🧭 Middleware global do Bolt: latência até o ack e cliente instrumentado
+def nome_requisicao(body):
+    tipo = body.get("type") or ("slash_command" if "command" in body else "desconhecido")
+    if "command" in body:
+        return tipo, body["command"]
+    if body.get("actions"):
+        return tipo, body["actions"][0].get("action_id", "")
+    if body.get("view"):
+        return tipo, body["view"].get("callback_id", "")
+    if body.get("event"):
+        return tipo, body["event"].get("type", "")
+    return tipo, ""
+
+
+def middleware_ack(body, context, next):
+    instrumentar_cliente(context.client)
+    inicio = time.perf_counter()
+    try:
+        return next()
+    finally:
+        ack_segundos.observar(time.perf_counter() - inicio, *nome_requisicao(body))
+
+
+async def middleware_ack_async(body, context, next):
+    instrumentar_cliente(context.client)
+    inicio = time.perf_counter()
+    try:
+        return await next()
+    finally:
+        ack_segundos.observar(time.perf_counter() - inicio, *nome_requisicao(body))
+
+
+# 🌐 Endpoint de scrape
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        corpo = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+_servidor = None
+
+
+def iniciar_servidor(host=METRICS_HOST, porta=METRICS_PORT):
+    global _servidor
+    if _servidor is not None or not porta:
+        return _servidor
+    _servidor = ThreadingHTTPServer((host, porta), _Handler)
+    _servidor.daemon_threads = True
+    threading.Thread(target=_servidor.serve_forever, name="metricas-http", daemon=True).start()
+    print(f"📈 Métricas em http://{host}:{porta}/metrics")
+    return _servidor
@@ -0,0 +1,515 @@
+import json
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import engine
+import lista_chamados
+
+
+# 🧊 Passos em Python das migrações. Ficam congelados aqui, sem chamar o código
+# da aplicação: repetir uma migração depois precisa dar o mesmo resultado.
+
+# Migração 2: thread_ts repetido impediria o índice único. Fica com o chamado
+# mais antigo de cada thread; os demais perdem o thread_ts (os ids vão pro log)
+def _deduplicar_thread_ts(conn):
+    ids = [i for (i,) in conn.execute(text("""
+        UPDATE ordens_servico o SET thread_ts = NULL
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY thread_ts ORDER BY id) AS n
+            FROM ordens_servico WHERE thread_ts IS NOT NULL
+        ) d
+        WHERE o.id = d.id AND d.n > 1
+        RETURNING o.id
+    """))]
+    if ids:
+        print(f"⚠️ thread_ts repetido removido de {len(ids)} chamado(s): {sorted(ids)}")
+
+
+# Migração 3: log_edicoes / historico_reaberturas -> ordens_servico_eventos
+_RE_LOG_REABERTURA = re.compile(
+    r"\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.+?) alterou campos:\n((?:•[^\n]*\n?)*)"
+)
+_RE_HISTORICO_REABERTURA = re.compile(
+    r"\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.+?) reabriu para \*(.+?)\*"
+)
+
+
+def _data_legada(valor, formato):
+    try:
+        return datetime.strptime(valor, formato)
+    except (TypeError, ValueError):
+        return None
+
+
+# log_edicoes pode ter: JSON das edições, texto das reaberturas, ou JSON seguido de texto
+def _separar_log_legado(log):
+    log = (log or "").strip()
+    if log.startswith("[{") or log == "[]":
+        try:
+            edicoes, fim = json.JSONDecoder().raw_decode(log)
+            return (edicoes if isinstance(edicoes, list) else []), log[fim:]
+        except ValueError:
+            pass
+    return [], log
+
+
+# data_padrao (abertura do chamado) cobre entradas sem data legível
+def _eventos_legados(ordem_id, log_edicoes, historico_reaberturas, data_padrao):
+    edicoes, texto = _separar_log_legado(log_edicoes)
+    eventos = []
+
+    def evento(tipo, dados, criado_em):
+        eventos.append({
+            "ordem_id": ordem_id,
+            "tipo": tipo,
+            "criado_em": criado_em or data_padrao or datetime.utcnow(),
+            "dados": json.dumps(dados, default=str, ensure_ascii=False),
+        })
+
+    for edicao in edicoes:
+        if not isinstance(edicao, dict):
+            continue
+        antes, depois = edicao.get("antes") or {}, edicao.get("depois") or {}
+        evento("editar", {
+            "editor": edicao.get("editado_por"),
+            "alteracoes": {c: [antes.get(c), depois.get(c)] for c in depois if antes.get(c) != depois.get(c)},
+            "origem": "backfill",
+        }, _data_legada(edicao.get("data_edicao"), "%Y-%m-%d"))
+
+    reaberturas = {}
+    for data, nome, tipo in _RE_HISTORICO_REABERTURA.findall(historico_reaberturas or ""):
+        reaberturas[data] = {"nome": nome, "tipo_ticket": tipo, "origem": "backfill"}
+    for data, nome, resumo in _RE_LOG_REABERTURA.findall(texto):
+        reaberturas.setdefault(data, {"nome": nome, "origem": "backfill"})["resumo"] = resumo.strip()
+
+    for data, dados in reaberturas.items():
+        evento("reabrir", dados, _data_legada(data, "%Y-%m-%d %H:%M:%S"))
+    return eventos
+
+
+def _backfill_eventos(conn):
+    linhas = conn.execute(text("""
+        SELECT o.id, o.log_edicoes, o.historico_reaberturas, o.data_abertura
+        FROM ordens_servico o
+        WHERE (COALESCE(o.log_edicoes, '') <> '' OR COALESCE(o.historico_reaberturas, '') <> '')
+          AND NOT EXISTS (
+              SELECT 1 FROM ordens_servico_eventos e
+              WHERE e.ordem_id = o.id AND e.dados->>'origem' = 'backfill'
+          )
+    """)).fetchall()
+
+    total = 0
+    for ordem_id, log_edicoes, historico_reaberturas, data_abertura in linhas:
+        eventos = _eventos_legados(ordem_id, log_edicoes, historico_reaberturas, data_abertura)
+        if eventos:
+            conn.execute(text("""
+                INSERT INTO ordens_servico_eventos (ordem_id, tipo, criado_em, dados)
+                VALUES (:ordem_id, :tipo, :criado_em, CAST(:dados AS JSONB))
+            """), eventos)
+            total += len(eventos)
+    print(f"🚚 Backfill de eventos: {total} eventos de {len(linhas)} chamados")
+
+
+# 🗂️ Migrações versionadas do schema
+# Cada entrada: (versão, descrição, [comandos SQL ou funções que recebem a
+# conexão]). Nunca altere uma migração já aplicada; crie uma nova com a
+# próxima versão.
+MIGRACOES = [
+    (1, "tabela ordens_servico alinhada ao models.py", [
+        """
+        CREATE TABLE IF NOT EXISTS ordens_servico (
+            id SERIAL PRIMARY KEY,
+            tipo_ticket TEXT,
+            tipo_contrato TEXT,
+            locatario TEXT,
+            moradores TEXT,
+            empreendimento TEXT,
+            unidade_metragem TEXT,
+            numero_reserva TEXT,
+            data_entrada DATE,
+            data_saida DATE,
+            valor_locacao NUMERIC,
+            responsavel TEXT,
+            solicitante TEXT,
+            status TEXT DEFAULT 'aberto',
+            responsavel_id TEXT,
+            data_abertura TIMESTAMP DEFAULT NOW(),
+            data_captura TIMESTAMP,
+            data_fechamento TIMESTAMP,
+            sla_limite TIMESTAMP,
+            sla_status TEXT DEFAULT 'dentro do prazo',
+            thread_ts TEXT
+        )
+        """,
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS numero_reserva TEXT",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS capturado_por TEXT",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS historico_reaberturas TEXT DEFAULT ''",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS motivo_cancelamento TEXT",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS thread_detail_ts TEXT",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS data_ultima_edicao TIMESTAMP",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS ultimo_editor TEXT",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS canal_id TEXT",
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS log_edicoes TEXT DEFAULT ''",
+    ]),
+    (2, "índices das consultas quentes", [
+        # Botões, modais e edições localizam o chamado pela thread
+        _deduplicar_thread_ts,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_ordens_servico_thread_ts
+            ON ordens_servico (thread_ts)
+        """,
+        # /minhas-os-comercial
+        """
+        CREATE INDEX IF NOT EXISTS ix_ordens_servico_solicitante_status_abertura
+            ON ordens_servico (solicitante, status, data_abertura)
+        """,
+        # Verificação de SLA: só chamados abertos/em análise
+        """
+        CREATE INDEX IF NOT EXISTS ix_ordens_servico_sla_abertos
+            ON ordens_servico (sla_limite)
+            WHERE status IN ('aberto', 'em análise')
+        """,
+    ]),
+    (3, "histórico append-only em ordens_servico_eventos", [
+        """
+        CREATE TABLE IF NOT EXISTS ordens_servico_eventos (
+            id BIGSERIAL PRIMARY KEY,
+            ordem_id INTEGER NOT NULL REFERENCES ordens_servico (id) ON DELETE CASCADE,
+            tipo TEXT NOT NULL,
+            autor TEXT,
+            criado_em TIMESTAMP NOT NULL DEFAULT NOW(),
+            dados JSONB NOT NULL DEFAULT '{}'::jsonb
+        )
+        """,
+        # Histórico de um chamado, já na ordem de exibição
+        """
+        CREATE INDEX IF NOT EXISTS ix_ordens_servico_eventos_ordem_criado
+            ON ordens_servico_eventos (ordem_id, criado_em, id)
+        """,
+        # Conteúdo legado de log_edicoes / historico_reaberturas
+        _backfill_eventos,
+    ]),
+    (4, "índice da lista paginada do solicitante", [
+        # /minhas-os-comercial: keyset em (status, data_abertura DESC, id DESC)
+        """
+        CREATE INDEX IF NOT EXISTS ix_ordens_servico_solicitante_lista
+            ON ordens_servico (solicitante, status, data_abertura DESC, id DESC)
+        """,
+        # Coberto pelo índice acima
+        "DROP INDEX IF EXISTS ix_ordens_servico_solicitante_status_abertura",
+    ]),
+    (5, "resumos diários de SLA", [
+        # Recalcular um dia lê só os chamados abertos nele
+        """
+        CREATE INDEX IF NOT EXISTS ix_ordens_servico_data_abertura
+            ON ordens_servico (data_abertura)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ordens_servico_resumo_diario (
+            dia DATE NOT NULL,
+            empreendimento TEXT NOT NULL DEFAULT '',
+            tipo_ticket TEXT NOT NULL DEFAULT '',
+            responsavel TEXT NOT NULL DEFAULT '',
+            total INTEGER NOT NULL DEFAULT 0,
+            abertos INTEGER NOT NULL DEFAULT 0,
+            em_analise INTEGER NOT NULL DEFAULT 0,
+            fechados INTEGER NOT NULL DEFAULT 0,
+            cancelados INTEGER NOT NULL DEFAULT 0,
+            capturados INTEGER NOT NULL DEFAULT 0,
+            vencidos INTEGER NOT NULL DEFAULT 0,
+            captura_segundos DOUBLE PRECISION NOT NULL DEFAULT 0,
+            resolucao_segundos DOUBLE PRECISION NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP NOT NULL,
+            PRIMARY KEY (dia, empreendimento, tipo_ticket, responsavel)
+        )
+        """,
+        # Marca d'água da atualização incremental (linha única)
+        """
+        CREATE TABLE IF NOT EXISTS ordens_servico_resumo_marca (
+            id SMALLINT PRIMARY KEY CHECK (id = 1),
+            ultimo_evento_id BIGINT NOT NULL,
+            ultima_ordem_id INTEGER NOT NULL,
+            atualizado_em TIMESTAMP NOT NULL
+        )
+        """,
+        # Carga inicial: todos os dias de uma vez
+        "DELETE FROM ordens_servico_resumo_diario",
+        """
+        INSERT INTO ordens_servico_resumo_diario (
+            dia, empreendimento, tipo_ticket, responsavel,
+            total, abertos, em_analise, fechados, cancelados, capturados, vencidos,
+            captura_segundos, resolucao_segundos, atualizado_em
+        )
+        SELECT
+            CAST(o.data_abertura AS DATE), COALESCE(o.empreendimento, ''), COALESCE(o.tipo_ticket, ''),
+            COALESCE(o.responsavel, ''),
+            COUNT(*),
+            COUNT(*) FILTER (WHERE o.status = 'aberto'),
+            COUNT(*) FILTER (WHERE o.status = 'em análise'),
+            COUNT(*) FILTER (WHERE o.status = 'fechado'),
+            COUNT(*) FILTER (WHERE o.status = 'cancelado'),
+            COUNT(*) FILTER (WHERE o.data_captura IS NOT NULL),
+            COUNT(*) FILTER (
+                WHERE o.status <> 'cancelado'
+                    AND o.sla_limite < COALESCE(o.data_fechamento, NOW() AT TIME ZONE 'utc')
+            ),
+            COALESCE(SUM(EXTRACT(EPOCH FROM o.data_captura - o.data_abertura))
+                FILTER (WHERE o.data_captura IS NOT NULL), 0),
+            COALESCE(SUM(EXTRACT(EPOCH FROM o.data_fechamento - o.data_abertura))
+                FILTER (WHERE o.status = 'fechado' AND o.data_fechamento IS NOT NULL), 0),
+            NOW() AT TIME ZONE 'utc'
+        FROM ordens_servico o
+        WHERE o.data_abertura IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        """,
+        """
+        INSERT INTO ordens_servico_resumo_marca (id, ultimo_evento_id, ultima_ordem_id, atualizado_em)
+        VALUES (
+            1,
+            (SELECT COALESCE(MAX(id), 0) FROM ordens_servico_eventos),
+            (SELECT COALESCE(MAX(id), 0) FROM ordens_servico),
+            NOW() AT TIME ZONE 'utc'
+        )
+        ON CONFLICT (id) DO UPDATE SET
+            ultimo_evento_id = EXCLUDED.ultimo_evento_id,
+            ultima_ordem_id = EXCLUDED.ultima_ordem_id,
+            atualizado_em = EXCLUDED.atualizado_em
+        """,
+    ]),
+    (6, "chave de idempotência da abertura", [
+        "ALTER TABLE ordens_servico ADD COLUMN IF NOT EXISTS chave_idempotencia TEXT",
+        # Um envio de modal (view.id + usuário) cria no máximo um chamado
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_ordens_servico_chave_idempotencia
+            ON ordens_servico (chave_idempotencia)
+        """,
+    ]),
+    (7, "índice da lista na ordem de exibição", [
+        # /minhas-os-comercial: Em Análise, Abertos, Fechados; data_abertura nula no fim
+        """
+        CREATE INDEX IF NOT EXISTS ix_ordens_servico_solicitante_exibicao
+            ON ordens_servico (
+                solicitante, (CASE status WHEN 'em análise' THEN 0 WHEN 'aberto' THEN 1 ELSE 2 END),
+                (COALESCE(data_abertura, TIMESTAMP '1970-01-01')) DESC, id DESC
+            )
+            WHERE status IN ('em análise', 'aberto', 'fechado')
+        """,
+        # Ordenava por status em ordem alfabética; substituído pelo índice acima
+        "DROP INDEX IF EXISTS ix_ordens_servico_solicitante_lista",
+    ]),
+    (8, "dias pendentes dos resumos e horários em UTC", [
+        # Cada alteração em ordens_servico marca o dia de abertura na mesma
+        # transação; resumos.atualizar() consome a tabela (sem unique: nenhum
+        # writer espera pelo outro)
+        """
+        CREATE TABLE IF NOT EXISTS ordens_servico_resumo_pendente (
+            id BIGSERIAL PRIMARY KEY,
+            dia DATE NOT NULL
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION marcar_dia_resumo() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' AND OLD.data_abertura IS NOT NULL THEN
+                INSERT INTO ordens_servico_resumo_pendente (dia) VALUES (CAST(OLD.data_abertura AS DATE));
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.data_abertura IS NOT NULL AND (
+                TG_OP = 'INSERT' OR CAST(NEW.data_abertura AS DATE) IS DISTINCT FROM CAST(OLD.data_abertura AS DATE)
+            ) THEN
+                INSERT INTO ordens_servico_resumo_pendente (dia) VALUES (CAST(NEW.data_abertura AS DATE));
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        "DROP TRIGGER IF EXISTS tg_ordens_servico_resumo_pendente ON ordens_servico",
+        """
+        CREATE TRIGGER tg_ordens_servico_resumo_pendente
+            AFTER INSERT OR UPDATE OR DELETE ON ordens_servico
+            FOR EACH ROW EXECUTE PROCEDURE marcar_dia_resumo()
+        """,
+        # Horários de chamado são UTC sem fuso (datetime.utcnow()), como sla_limite
+        "ALTER TABLE ordens_servico ALTER COLUMN data_abertura SET DEFAULT (NOW() AT TIME ZONE 'utc')",
+        "ALTER TABLE ordens_servico_eventos ALTER COLUMN criado_em SET DEFAULT (NOW() AT TIME ZONE 'utc')",
+    ]),
+    (9, "aviso de prazos de SLA ao líder", [
+        # NOTIFY sai no commit; o agendador do líder (agendador_sla.py) escuta
+        # e recarrega só esses chamados, inclusive os criados em outra réplica
+        """
+        CREATE OR REPLACE FUNCTION avisar_prazo_sla() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF NEW.thread_ts IS NOT NULL THEN
+                PERFORM pg_notify('prazos_sla', NEW.thread_ts);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        "DROP TRIGGER IF EXISTS tg_ordens_servico_prazo_novo ON ordens_servico",
+        """
+        CREATE TRIGGER tg_ordens_servico_prazo_novo
+            AFTER INSERT ON ordens_servico
+            FOR EACH ROW EXECUTE PROCEDURE avisar_prazo_sla()
+        """,
+        "DROP TRIGGER IF EXISTS tg_ordens_servico_prazo_alterado ON ordens_servico",
+        """
+        CREATE TRIGGER tg_ordens_servico_prazo_alterado
+            AFTER UPDATE ON ordens_servico
+            FOR EACH ROW WHEN (
+                OLD.thread_ts IS DISTINCT FROM NEW.thread_ts
+                OR OLD.sla_limite IS DISTINCT FROM NEW.sla_limite
+                OR OLD.status IS DISTINCT FROM NEW.status
+                OR OLD.sla_status IS DISTINCT FROM NEW.sla_status
+            )
+            EXECUTE PROCEDURE avisar_prazo_sla()
+        """,
+    ]),
+    (10, "cancelados na lista do solicitante", [
+        # /minhas-os-comercial: Em Análise, Abertos, Fechados, Cancelados. As
+        # expressões são as de lista_chamados.ORDEM_STATUS_SQL / ABERTURA_SQL
+        "DROP INDEX IF EXISTS ix_ordens_servico_solicitante_exibicao",
+        """
+        CREATE INDEX ix_ordens_servico_solicitante_exibicao
+            ON ordens_servico (
+                solicitante,
+                (CASE status WHEN 'em análise' THEN 0 WHEN 'aberto' THEN 1 WHEN 'fechado' THEN 2 ELSE 3 END),
+                (COALESCE(data_abertura, TIMESTAMP '1970-01-01')) DESC, id DESC
+            )
+            WHERE status IN ('em análise', 'aberto', 'fechado', 'cancelado')
+        """,
+    ]),
+    (11, "marca dos resumos só com o horário", [
+        # Os dias a recalcular vêm de ordens_servico_resumo_pendente (migração 8);
+        # a marca guarda só o horário da última atualização (prazos vencidos desde então)
+        "ALTER TABLE ordens_servico_resumo_marca DROP COLUMN IF EXISTS ultimo_evento_id",
+        "ALTER TABLE ordens_servico_resumo_marca DROP COLUMN IF EXISTS ultima_ordem_id",
+    ]),
+]
+
+# 🔎 Consultas quentes e o índice que cada uma deve usar
+CONSULTAS_QUENTES = [
+    (
+        "busca por thread_ts",
+        "SELECT * FROM ordens_servico WHERE thread_ts = '0000000000.000000'",
+        "ix_ordens_servico_thread_ts",
+    ),
+    (
+        "lista do solicitante",
+        "SELECT * FROM ordens_servico WHERE solicitante = 'U00000000' "
+        "AND status IN ('em análise', 'aberto', 'fechado', 'cancelado') "
+        f"AND ({lista_chamados.ORDEM_STATUS_SQL}) >= 1 "
+        f"ORDER BY {lista_chamados.ORDEM_STATUS_SQL}, {lista_chamados.ABERTURA_SQL} DESC, id DESC LIMIT 11",
+        "ix_ordens_servico_solicitante_exibicao",
+    ),
+    (
+        "varredura de SLA",
+        "SELECT id FROM ordens_servico WHERE status IN ('aberto', 'em análise') "
+        "AND sla_limite < NOW() AND sla_status = 'dentro do prazo'",
+        "ix_ordens_servico_sla_abertos",
+    ),
+    (
+        "histórico do chamado",
+        "SELECT * FROM ordens_servico_eventos WHERE ordem_id = 1 ORDER BY criado_em, id",
+        "ix_ordens_servico_eventos_ordem_criado",
+    ),
+    (
+        "recálculo de um dia do resumo",
+        "SELECT * FROM ordens_servico WHERE data_abertura >= DATE '2024-01-01' "
+        "AND data_abertura < DATE '2024-01-02'",
+        "ix_ordens_servico_data_abertura",
+    ),
+    (
+        "/sla-comercial",
+        "SELECT * FROM ordens_servico_resumo_diario WHERE dia >= DATE '2024-01-01'",
+        "ordens_servico_resumo_diario_pkey",
+    ),
+]
+
+# Chave fixa do advisory lock que serializa migrações entre réplicas
+CHAVE_LOCK_MIGRACAO = 7_318_001
+
+
+def _garantir_tabela_controle(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            versao INTEGER PRIMARY KEY,
+            descricao TEXT NOT NULL,
+            aplicada_em TIMESTAMP NOT NULL
+        )
+    """))
+
+
+def versao_atual():
+    with engine.begin() as conn:
+        _garantir_tabela_controle(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(versao), 0) FROM schema_migrations")).scalar()
+
+
+# 🚀 Aplica as migrações pendentes, uma transação por versão
+def aplicar():
+    aplicadas = []
+    for versao, descricao, comandos in MIGRACOES:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": CHAVE_LOCK_MIGRACAO})
+            _garantir_tabela_controle(conn)
+            ja_aplicada = conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE versao = :v"), {"v": versao}
+            ).first()
+            if ja_aplicada:
+                continue
+            for comando in comandos:
+                if callable(comando):
+                    comando(conn)
+                else:
+                    conn.execute(text(comando))
+            conn.execute(
+                text("INSERT INTO schema_migrations (versao, descricao, aplicada_em) VALUES (:v, :d, :a)"),
+                {"v": versao, "d": descricao, "a": datetime.now()}
+            )
+            aplicadas.append(versao)
+            print(f"✅ Migração {versao} aplicada: {descricao}")
+
+    if not aplicadas:
+        print("✅ Schema já está na versão mais recente.")
+    return aplicadas
+
+
+def _indices_do_plano(no):
+    indices = set()
+    if "Index Name" in no:
+        indices.add(no["Index Name"])
+    for filho in no.get("Plans", []):
+        indices |= _indices_do_plano(filho)
+    return indices
+
+
+# 🔎 Confere via EXPLAIN se cada consulta quente usa o índice esperado
+def verificar_indices():
+    resultados = []
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            # Em tabelas pequenas o planner prefere seq scan; aqui só queremos
+            # saber se o índice é utilizável pela consulta.
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for nome, sql, indice in CONSULTAS_QUENTES:
+                plano = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+                if isinstance(plano, str):
+                    plano = json.loads(plano)
+                usados = _indices_do_plano(plano[0]["Plan"])
+                ok = indice in usados
+                resultados.append((nome, indice, ok, sorted(usados)))
+                print(f"{'✅' if ok else '❌'} {nome}: esperado {indice}, usados {sorted(usados) or 'nenhum'}")
+        finally:
+            trans.rollback()
+    return resultados
+
+
+if __name__ == "__main__":
+    if "--verificar" in sys.argv:
+        falhas = [r for r in verificar_indices() if not r[2]]
+        sys.exit(1 if falhas else 0)
+    aplicar()
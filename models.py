@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, Text, TIMESTAMP
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Date, Numeric, Float, Text, TIMESTAMP, Index, ForeignKey, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -6,6 +7,16 @@ Base = declarative_base()
 
 class OrdemServico(Base):
     __tablename__ = "ordens_servico"
+    # 🔎 Índices criados pelas migrações 2, 5, 6 e 10 (migracoes.py)
+    __table_args__ = (
+        Index("ix_ordens_servico_thread_ts", "thread_ts", unique=True),
+        Index("ix_ordens_servico_chave_idempotencia", "chave_idempotencia", unique=True),
+        Index("ix_ordens_servico_data_abertura", "data_abertura"),
+        Index(
+            "ix_ordens_servico_sla_abertos", "sla_limite",
+            postgresql_where=text("status IN ('aberto', 'em análise')")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tipo_ticket = Column(Text)
@@ -37,4 +48,66 @@ class OrdemServico(Base):
     data_ultima_edicao = Column(TIMESTAMP, nullable=True)
     ultimo_editor = Column(String, nullable=True)
     canal_id = Column(String, nullable=True)
-    log_edicoes = Column(Text, default="")
+    log_edicoes = Column(Text, default="")  # legado: histórico novo fica em ordens_servico_eventos
+    chave_idempotencia = Column(Text, nullable=True)  # view.id:user do envio que criou o chamado
+
+
+# Lista paginada do solicitante, na ordem de exibição (mesmas expressões de lista_chamados; migração 10)
+Index(
+    "ix_ordens_servico_solicitante_exibicao",
+    OrdemServico.solicitante,
+    text("(CASE status WHEN 'em análise' THEN 0 WHEN 'aberto' THEN 1 WHEN 'fechado' THEN 2 ELSE 3 END)"),
+    text("(COALESCE(data_abertura, TIMESTAMP '1970-01-01')) DESC"),
+    OrdemServico.id.desc(),
+    postgresql_where=text("status IN ('em análise', 'aberto', 'fechado', 'cancelado')"),
+)
+
+
+# 🧾 Histórico append-only (migração 3)
+class EventoOrdemServico(Base):
+    __tablename__ = "ordens_servico_eventos"
+    __table_args__ = (
+        Index("ix_ordens_servico_eventos_ordem_criado", "ordem_id", "criado_em", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    ordem_id = Column(Integer, ForeignKey("ordens_servico.id", ondelete="CASCADE"), nullable=False)
+    tipo = Column(Text, nullable=False)  # capturar, finalizar, cancelar, reabrir, reatribuir, editar
+    autor = Column(Text)
+    criado_em = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    dados = Column(JSONB, nullable=False, default=dict)
+
+
+# 📊 Resumos diários de SLA (migração 5, mantidos por resumos.py)
+class ResumoDiario(Base):
+    __tablename__ = "ordens_servico_resumo_diario"
+
+    dia = Column(Date, primary_key=True)
+    empreendimento = Column(Text, primary_key=True, default="")
+    tipo_ticket = Column(Text, primary_key=True, default="")
+    responsavel = Column(Text, primary_key=True, default="")
+    total = Column(Integer, nullable=False, default=0)
+    abertos = Column(Integer, nullable=False, default=0)
+    em_analise = Column(Integer, nullable=False, default=0)
+    fechados = Column(Integer, nullable=False, default=0)
+    cancelados = Column(Integer, nullable=False, default=0)
+    capturados = Column(Integer, nullable=False, default=0)
+    vencidos = Column(Integer, nullable=False, default=0)
+    captura_segundos = Column(Float, nullable=False, default=0)
+    resolucao_segundos = Column(Float, nullable=False, default=0)
+    atualizado_em = Column(TIMESTAMP, nullable=False)
+
+
+class MarcaResumo(Base):
+    __tablename__ = "ordens_servico_resumo_marca"
+
+    id = Column(SmallInteger, primary_key=True)
+    atualizado_em = Column(TIMESTAMP, nullable=False)  # migração 11: só o horário da última atualização
+
+
+# Dias a recalcular, gravados por trigger em ordens_servico (migração 8)
+class DiaPendenteResumo(Base):
+    __tablename__ = "ordens_servico_resumo_pendente"
+
+    id = Column(BigInteger, primary_key=True)
+    dia = Column(Date, nullable=False)
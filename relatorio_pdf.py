@@ -0,0 +1,56 @@
+# 📕 Backend do PDF (reportlab), importado sob demanda por services.py
+import io
+import urllib.request
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+LOGO_URL = "https://raw.githubusercontent.com/jflrealty/images/main/JFL_logotipo_completo.jpg"
+
+CABECALHO_PDF = [
+    "ID", "Tipo", "Contrato", "Locatário", "Empreendimento", "Unidade",
+    "Valor", "Responsável", "Solicitante", "Status", "SLA", "Histórico"
+]
+
+
+# 📤 Relatório com logo JFL e histórico; `linhas` já vêm formatadas
+def escrever_pdf(linhas, destino):
+    doc = SimpleDocTemplate(destino, pagesize=landscape(A4))
+    estilos = getSampleStyleSheet()
+    elementos = []
+
+    try:
+        img_data = urllib.request.urlopen(LOGO_URL).read()
+        img_io = io.BytesIO(img_data)
+        logo = Image(img_io)
+        logo._restrictSize(5*inch, 1*inch)
+        elementos.append(logo)
+        elementos.append(Spacer(1, 12))
+    except Exception as e:
+        print(f"❌ Erro ao carregar logo: {e}")
+
+    elementos.append(Paragraph(f"📋 Relatório de Chamados - {datetime.now().strftime('%d/%m/%Y')}", estilos["Heading2"]))
+    elementos.append(Spacer(1, 12))
+
+    tabela = Table([CABECALHO_PDF] + list(linhas), repeatRows=1, colWidths=[
+        0, 70, 70, 80, 70, 60, 50, 70, 70, 50, 60, 30, 130
+    ])
+
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#e0e0e0")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
+    ]))
+
+    elementos.append(tabela)
+    doc.build(elementos)
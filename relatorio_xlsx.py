@@ -0,0 +1,36 @@
+# 📗 Backend do Excel (openpyxl), importado sob demanda por services.py
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+
+CABECALHO_XLSX = [
+    "ID", "Tipo", "Contrato", "Locatário", "Moradores", "Empreendimento", "Unidade",
+    "Data Entrada", "Data Saída", "Valor", "Responsável", "Capturado Por", "Solicitante",
+    "Status", "Aberto em", "SLA", "Histórico Reaberturas"
+]
+
+
+# 🌊 Excel em modo write-only: cada linha é serializada assim que chega
+def escrever_xlsx(linhas, destino):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Chamados")
+
+    # Larguras precisam ser definidas antes da primeira linha
+    for col_num in range(1, len(CABECALHO_XLSX) + 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = 18
+
+    bold = Font(bold=True)
+    center = Alignment(horizontal="center", vertical="center")
+    cabecalho = []
+    for header in CABECALHO_XLSX:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = bold
+        cell.alignment = center
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
+    for linha in linhas:
+        ws.append(linha)
+
+    wb.save(destino)
@@ -0,0 +1,280 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import engine
+
+# 📊 Resumos diários de SLA (tabela ordens_servico_resumo_diario)
+#
+# Uma linha por (dia de abertura, empreendimento, tipo_ticket, responsável)
+# com contagens por status, SLA vencido e tempos somados de captura e de
+# resolução. /sla-comercial lê só esta tabela, nunca ordens_servico.
+#
+# atualizar() recalcula apenas os dias "sujos":
+# - os da tabela ordens_servico_resumo_pendente, que um trigger preenche na
+#   mesma transação de cada INSERT/UPDATE/DELETE em ordens_servico (migração 8)
+# - os de chamados abertos cujo sla_limite passou desde a última atualização
+# Um advisory lock serializa atualizações entre réplicas. Todos os horários
+# são UTC sem fuso (datetime.utcnow()), como data_abertura e sla_limite.
+
+INTERVALO = int(os.getenv("RESUMO_SLA_INTERVALO", "300"))
+DIAS_PADRAO = 30
+DIAS_MAX = 366
+CHAVE_LOCK_RESUMOS = 7_318_002
+
+SQL_LOCK = text("SELECT pg_advisory_xact_lock(:chave)")
+SQL_TRY_LOCK = text("SELECT pg_try_advisory_xact_lock(:chave)")
+
+# Horário da última atualização: início da janela de prazos vencidos
+SQL_MARCA = text("SELECT atualizado_em FROM ordens_servico_resumo_marca WHERE id = 1")
+
+SQL_GRAVAR_MARCA = text("""
+    INSERT INTO ordens_servico_resumo_marca (id, atualizado_em)
+    VALUES (1, :agora)
+    ON CONFLICT (id) DO UPDATE SET atualizado_em = EXCLUDED.atualizado_em
+""")
+
+# Só apaga o que já tinha commit; o que chegar depois fica para a próxima rodada
+SQL_CONSUMIR_PENDENTES = text("DELETE FROM ordens_servico_resumo_pendente RETURNING dia")
+
+# Lido em ix_ordens_servico_sla_abertos
+SQL_DIAS_VENCIDOS = text("""
+    SELECT DISTINCT CAST(data_abertura AS DATE)
+    FROM ordens_servico
+    WHERE status IN ('aberto', 'em análise') AND sla_limite >= :desde AND sla_limite < :agora
+        AND data_abertura IS NOT NULL
+""")
+
+SQL_TODOS_DIAS = text("""
+    SELECT DISTINCT CAST(data_abertura AS DATE) FROM ordens_servico WHERE data_abertura IS NOT NULL
+""")
+
+SQL_APAGAR_DIAS = text("DELETE FROM ordens_servico_resumo_diario WHERE dia = ANY(CAST(:dias AS DATE[]))")
+
+# Vencido: passou do sla_limite antes de fechar (ou ainda aberto depois dele);
+# cancelados não contam. Reservas pendentes (services.reservar_ordem_servico)
+# ficam fora de tudo. Cada dia é lido por faixa em ix_ordens_servico_data_abertura.
+SQL_RECALCULAR = text("""
+    INSERT INTO ordens_servico_resumo_diario (
+        dia, empreendimento, tipo_ticket, responsavel,
+        total, abertos, em_analise, fechados, cancelados, capturados, vencidos,
+        captura_segundos, resolucao_segundos, atualizado_em
+    )
+    SELECT
+        d.dia, COALESCE(o.empreendimento, ''), COALESCE(o.tipo_ticket, ''), COALESCE(o.responsavel, ''),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE o.status = 'aberto'),
+        COUNT(*) FILTER (WHERE o.status = 'em análise'),
+        COUNT(*) FILTER (WHERE o.status = 'fechado'),
+        COUNT(*) FILTER (WHERE o.status = 'cancelado'),
+        COUNT(*) FILTER (WHERE o.data_captura IS NOT NULL),
+        COUNT(*) FILTER (
+            WHERE o.status <> 'cancelado' AND o.sla_limite < COALESCE(o.data_fechamento, :agora)
+        ),
+        COALESCE(SUM(EXTRACT(EPOCH FROM o.data_captura - o.data_abertura))
+            FILTER (WHERE o.data_captura IS NOT NULL), 0),
+        COALESCE(SUM(EXTRACT(EPOCH FROM o.data_fechamento - o.data_abertura))
+            FILTER (WHERE o.status = 'fechado' AND o.data_fechamento IS NOT NULL), 0),
+        :agora
+    FROM unnest(CAST(:dias AS DATE[])) AS d(dia)
+    JOIN ordens_servico o ON o.data_abertura >= d.dia AND o.data_abertura < d.dia + 1
+        AND o.status <> 'pendente'
+    GROUP BY 1, 2, 3, 4
+""")
+
+# Totais, por empreendimento, por responsável e por tipo numa só leitura
+SQL_CONSULTA = text("""
+    SELECT
+        GROUPING(empreendimento) AS g_emp, GROUPING(responsavel) AS g_resp, GROUPING(tipo_ticket) AS g_tipo,
+        empreendimento, responsavel, tipo_ticket,
+        SUM(total) AS total, SUM(abertos) AS abertos, SUM(em_analise) AS em_analise,
+        SUM(fechados) AS fechados, SUM(cancelados) AS cancelados, SUM(capturados) AS capturados,
+        SUM(vencidos) AS vencidos, SUM(captura_segundos) AS captura_segundos,
+        SUM(resolucao_segundos) AS resolucao_segundos, MAX(atualizado_em) AS atualizado_em
+    FROM ordens_servico_resumo_diario
+    WHERE dia >= :desde
+    GROUP BY GROUPING SETS ((), (empreendimento), (responsavel), (tipo_ticket))
+""")
+
+
+def _recalcular(conn, dias, agora):
+    dias = sorted(dias)
+    conn.execute(SQL_APAGAR_DIAS, {"dias": dias})
+    conn.execute(SQL_RECALCULAR, {"dias": dias, "agora": agora})
+
+
+# 🧱 Recalcula tudo (sem marca gravada e reparo manual)
+def reconstruir(conn, agora=None):
+    agora = agora or datetime.utcnow()
+    dias = [d for (d,) in conn.execute(SQL_TODOS_DIAS)]
+    conn.execute(text("DELETE FROM ordens_servico_resumo_diario"))
+    if dias:
+        conn.execute(SQL_RECALCULAR, {"dias": dias, "agora": agora})
+    conn.execute(SQL_GRAVAR_MARCA, {"agora": agora})
+    print(f"📊 Resumos de SLA reconstruídos: {len(dias)} dia(s)")
+    return len(dias)
+
+
+# 🔁 Atualização incremental; com bloquear=False desiste se outra já estiver rodando
+def atualizar(bloquear=True):
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        if bloquear:
+            conn.execute(SQL_LOCK, {"chave": CHAVE_LOCK_RESUMOS})
+        elif not conn.execute(SQL_TRY_LOCK, {"chave": CHAVE_LOCK_RESUMOS}).scalar():
+            return None
+
+        # Consome antes de ler: o recálculo enxerga tudo o que foi consumido
+        dias = {d for (d,) in conn.execute(SQL_CONSUMIR_PENDENTES)}
+        marca = conn.execute(SQL_MARCA).first()
+        if marca is None:
+            return reconstruir(conn, agora)
+
+        desde = marca[0]
+        dias.update(d for (d,) in conn.execute(SQL_DIAS_VENCIDOS, {"desde": desde, "agora": agora}))
+        if dias:
+            _recalcular(conn, dias, agora)
+        conn.execute(SQL_GRAVAR_MARCA, {"agora": agora})
+    return len(dias)
+
+
+def consultar(dias=DIAS_PADRAO):
+    desde = (datetime.utcnow() - timedelta(days=dias - 1)).date()
+    with engine.connect() as conn:
+        linhas = [dict(l._mapping) for l in conn.execute(SQL_CONSULTA, {"desde": desde})]
+
+    resumo = {"dias": dias, "desde": desde, "total": None, "empreendimentos": [], "responsaveis": [], "tipos": []}
+    for linha in linhas:
+        if linha["g_emp"] and linha["g_resp"] and linha["g_tipo"]:
+            resumo["total"] = linha
+        elif not linha["g_emp"]:
+            resumo["empreendimentos"].append(linha)
+        elif not linha["g_resp"]:
+            resumo["responsaveis"].append(linha)
+        else:
+            resumo["tipos"].append(linha)
+    return resumo
+
+
+# 🖨️ Mensagem do /sla-comercial
+def _duracao(segundos, quantidade):
+    if not quantidade:
+        return "–"
+    minutos = int(segundos / quantidade // 60)
+    return f"{minutos // 60}h{minutos % 60:02d}" if minutos >= 60 else f"{minutos}min"
+
+
+def _pct(parte, total):
+    return f"{parte / total * 100:.1f}%" if total else "–"
+
+
+def _mencao(valor):
+    if not valor:
+        return "sem responsável"
+    if valor.startswith("S"):
+        return f"<!subteam^{valor}>"
+    if valor.startswith("U"):
+        return f"<@{valor}>"
+    return valor
+
+
+def _secao(texto):
+    return {"type": "section", "text": {"type": "mrkdwn", "text": texto}}
+
+
+def render_resumo(resumo):
+    total = resumo["total"]
+    titulo = f"📊 *SLA dos chamados abertos nos últimos {resumo['dias']} dia(s)* (desde {resumo['desde']:%d/%m/%Y})"
+    if not total or not total["total"]:
+        return {"text": "📊 Resumo de SLA", "blocks": [_secao(titulo), _secao("Nenhum chamado no período.")]}
+
+    nao_cancelados = total["total"] - total["cancelados"]
+    geral = (
+        f"*Total:* {total['total']} | 🟢 {total['abertos']} abertos | 🟡 {total['em_analise']} em análise | "
+        f"⚪️ {total['fechados']} fechados | ❌ {total['cancelados']} cancelados\n"
+        f"*SLA vencido:* {total['vencidos']} ({_pct(total['vencidos'], nao_cancelados)})\n"
+        f"*Captura média:* {_duracao(total['captura_segundos'], total['capturados'])} | "
+        f"*Resolução média:* {_duracao(total['resolucao_segundos'], total['fechados'])}"
+    )
+
+    empreendimentos = sorted(resumo["empreendimentos"], key=lambda l: -l["vencidos"])
+    por_empreendimento = "\n".join(
+        f"• {l['empreendimento'] or '–'}: {l['vencidos']} vencido(s) de {l['total']} "
+        f"({_pct(l['vencidos'], l['total'] - l['cancelados'])})"
+        for l in empreendimentos
+    )
+
+    responsaveis = sorted(resumo["responsaveis"], key=lambda l: -l["capturados"])[:10]
+    por_responsavel = "\n".join(
+        f"• {_mencao(l['responsavel'])}: {l['capturados']} capturado(s), "
+        f"captura média {_duracao(l['captura_segundos'], l['capturados'])}"
+        for l in responsaveis
+    )
+
+    tipos = sorted(resumo["tipos"], key=lambda l: -l["total"])
+    por_tipo = "\n".join(
+        f"• {l['tipo_ticket'] or '–'}: {l['total']} ({l['total'] / resumo['dias']:.1f}/dia)"
+        for l in tipos
+    )
+
+    return {
+        "text": "📊 Resumo de SLA",
+        "blocks": [
+            _secao(titulo),
+            _secao(geral),
+            {"type": "divider"},
+            _secao("🏢 *Vencidos por empreendimento:*\n" + por_empreendimento),
+            _secao("👤 *Captura por responsável:*\n" + por_responsavel),
+            _secao("🏷️ *Chamados por tipo:*\n" + por_tipo),
+            {"type": "context", "elements": [
+                {"type": "mrkdwn", "text": f"Atualizado em {total['atualizado_em']:%d/%m/%Y %H:%M} (UTC)"}
+            ]},
+        ],
+    }
+
+
+def ler_dias(texto):
+    try:
+        dias = int((texto or "").strip() or DIAS_PADRAO)
+    except ValueError:
+        return DIAS_PADRAO
+    return min(max(dias, 1), DIAS_MAX)
+
+
+# Só lê a tabela de resumos; quem atualiza é o job periódico (atualizador)
+def mensagem(texto=None):
+    return render_resumo(consultar(ler_dias(texto)))
+
+
+# 🔁 Job periódico de atualização
+class AtualizadorResumos:
+    def __init__(self, intervalo=INTERVALO):
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self, funcao=atualizar):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, args=(funcao,), name="resumos-sla", daemon=True)
+        self._thread.start()
+        print(f"📊 Atualização de resumos de SLA a cada {self.intervalo}s.")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=30)
+
+    def _loop(self, funcao):
+        while not self._parar.is_set():
+            try:
+                funcao()
+            except Exception as e:
+                print(f"❌ Erro na atualização dos resumos de SLA: {e}")
+            self._parar.wait(self.intervalo)
+
+
+atualizador = AtualizadorResumos()
@@ -1,137 +1,122 @@
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from collections import namedtuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
 from models import OrdemServico
-from database import SessionLocal
+from database import AsyncSessionLocal, SessionLocal, engine, get_async_engine
+import transicoes
+import eventos
+import diff_campos
+import idempotencia
+import lista_chamados
+import templates
+from despachante import despachante, PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE
 import csv
-import os
+import codecs
+import gzip
 import io
-import urllib.request
+import os
+import itertools
+import tempfile
+import zipfile
+import time
+import importlib
+import threading
 
 from slack_sdk import WebClient
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, Image
-from reportlab.lib.pagesizes import landscape, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
-from openpyxl.utils import get_column_letter
+from slack_sdk.errors import SlackApiError
+from cache_usuarios import diretorio
+from agendador_sla import agendador
 
-client_slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+client_slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN"), base_url=os.getenv("SLACK_API_URL", WebClient.BASE_URL))
 
 # 🧠 Buscar nome real do usuário no Slack
+def _nome_conhecido(user_id):
+    if not user_id:
+        return user_id
+
+    nome = diretorio.obter(user_id)
+    if nome:
+        return nome
+
+    if not user_id.startswith("U") or diretorio.em_falha(user_id):
+        return user_id  # Retorna como está se não for Slack ID (ex: login, e-mail, etc.) ou se acabou de falhar
+    return None
+
+def _guardar_nome(user_id, user_info):
+    nome = user_info["user"]["real_name"]
+    diretorio.definir(user_id, nome)
+    return nome
+
+def _falha_nome(user_id, e):
+    print(f"❌ Erro ao buscar nome do usuário {user_id}: {e}")
+    diretorio.registrar_falha(user_id)
+    return user_id
+
 def get_nome_slack(user_id):
-    if not user_id or not user_id.startswith("U"):
-        return user_id  # Retorna como está se não for Slack ID (ex: login, e-mail, etc.)
+    nome = _nome_conhecido(user_id)
+    if nome is not None:
+        return nome
+    try:
+        return _guardar_nome(user_id, client_slack.users_info(user=user_id))
+    except Exception as e:
+        return _falha_nome(user_id, e)
 
+# 🔀 Versão asyncio (main_async.py), com o AsyncWebClient do app
+async def get_nome_slack_async(client, user_id):
+    nome = _nome_conhecido(user_id)
+    if nome is not None:
+        return nome
     try:
-        user_info = client_slack.users_info(user=user_id)
-        return user_info["user"]["real_name"]
+        return _guardar_nome(user_id, await client.users_info(user=user_id))
     except Exception as e:
-        print(f"❌ Erro ao buscar nome do usuário {user_id}: {e}")
-        return user_id
+        return _falha_nome(user_id, e)
 
-# 🔧 Função para montar o modal
-def montar_blocos_modal():
-    return [
-        {
-            "type": "input",
-            "block_id": "tipo_ticket",
-            "element": {
-                "type": "static_select",
-                "action_id": "value",
-                "placeholder": {"type": "plain_text", "text": "Escolha"},
-                "options": [{"text": {"type": "plain_text", "text": opt}, "value": opt}
-                            for opt in ["Lista de Espera", "Pré bloqueio", "Reserva", "Aditivo", "Prorrogação",
-                                        "Saída Antecipada", "Saída Confirmada", "Background Check", "Fatura"]],
-            },
-            "label": {"type": "plain_text", "text": "Tipo de Ticket"}
-        },
-        {
-            "type": "input",
-            "block_id": "locatario",
-            "element": {"type": "plain_text_input", "action_id": "value"},
-            "label": {"type": "plain_text", "text": "Locatário"}
-        },
-        {
-            "type": "input",
-            "block_id": "empreendimento",
-            "element": {
-                "type": "static_select",
-                "action_id": "value",
-                "placeholder": {"type": "plain_text", "text": "Escolha"},
-                "options": [{"text": {"type": "plain_text", "text": opt}, "value": opt}
-                            for opt in ["JFL125", "JML747", "VO699", "VHOUSE", "AVNU"]],
-            },
-            "label": {"type": "plain_text", "text": "Empreendimento"}
-        },
-        {
-            "type": "input",
-            "block_id": "unidade_metragem",
-            "element": {"type": "plain_text_input", "action_id": "value", "max_length": 10},
-            "label": {"type": "plain_text", "text": "Unidade"}
-        },
-        {
-            "type": "input",
-            "block_id": "numero_reserva",
-            "element": {"type": "plain_text_input", "action_id": "value", "max_length": 16},
-            "label": {"type": "plain_text", "text": "Número da Reserva"}
-        },
-        {
-            "type": "input",
-            "block_id": "responsavel",
-            "element": {
-                "type": "static_select",
-                "action_id": "value",
-                "placeholder": {"type": "plain_text", "text": "Escolha um responsável"},
-                "options": [
-                    {"text": {"type": "plain_text", "text": "Rigol"}, "value": "U06TZRECVC4"},
-                    {"text": {"type": "plain_text", "text": "Gina"}, "value": "U0B109PABN0"},
-                    {"text": {"type": "plain_text", "text": "Victor"}, "value": "U07B2130TKQ"},
-                    {"text": {"type": "plain_text", "text": "Gabriel"}, "value": "U06TNKNRZHT"},
-                    {"text": {"type": "plain_text", "text": "Douglas"}, "value": "U08ANPS7V7Y"},
-                    {"text": {"type": "plain_text", "text": "Reservas"}, "value": "S08STJCNMHR"}
-                ]
-            },
-            "label": {"type": "plain_text", "text": "Responsável"}
-        }
-    ]
+# 🔥 Carga em lote do diretório fora do caminho interativo (na subida do app);
+# depois disso, um id que falte é resolvido sozinho por users.info em get_nome_slack
+def aquecer_diretorio(client=None):
+    threading.Thread(
+        target=diretorio.aquecer, args=(client or client_slack,), name="aquecer-diretorio", daemon=True
+    ).start()
 
 # 🧾 Criar novo chamado
+def nova_ordem_servico(data, thread_ts=None, canal_id=None):
+    sla_prazo = datetime.utcnow() + timedelta(hours=24)
+    return OrdemServico(
+        tipo_ticket=data.get("tipo_ticket"),
+
+        # ✅ NOVO FLUXO (6 campos)
+        locatario=data.get("locatario"),
+        empreendimento=data.get("empreendimento"),
+        unidade_metragem=data.get("unidade_metragem"),
+        numero_reserva=data.get("numero_reserva"),
+        responsavel=data.get("responsavel"),
+
+        solicitante=data.get("solicitante"),
+
+        status="aberto",
+        data_abertura=datetime.utcnow(),
+        sla_limite=sla_prazo,
+        sla_status="dentro do prazo",
+        thread_ts=thread_ts,
+        canal_id=canal_id,
+
+        # 🧊 CAMPOS ANTIGOS (não usados por enquanto)
+        # tipo_contrato=data.get("tipo_contrato"),
+        # moradores=data.get("moradores"),
+        # data_entrada=data.get("data_entrada"),
+        # data_saida=data.get("data_saida"),
+        # valor_locacao=data.get("valor_locacao"),
+    )
+
 def criar_ordem_servico(data, thread_ts=None, canal_id=None):
     session = SessionLocal()
     try:
-        sla_prazo = datetime.utcnow() + timedelta(hours=24)
-        nova_os = OrdemServico(
-            tipo_ticket=data.get("tipo_ticket"),
-
-            # ✅ NOVO FLUXO (6 campos)
-            locatario=data.get("locatario"),
-            empreendimento=data.get("empreendimento"),
-            unidade_metragem=data.get("unidade_metragem"),
-            numero_reserva=data.get("numero_reserva"),
-            responsavel=data.get("responsavel"),
-
-            solicitante=data.get("solicitante"),
-
-            status="aberto",
-            data_abertura=datetime.utcnow(),
-            sla_limite=sla_prazo,
-            sla_status="dentro do prazo",
-            thread_ts=thread_ts,
-            canal_id=canal_id,
-
-            # 🧊 CAMPOS ANTIGOS (não usados por enquanto)
-            # tipo_contrato=data.get("tipo_contrato"),
-            # moradores=data.get("moradores"),
-            # data_entrada=data.get("data_entrada"),
-            # data_saida=data.get("data_saida"),
-            # valor_locacao=data.get("valor_locacao"),
-        )
+        nova_os = nova_ordem_servico(data, thread_ts, canal_id)
         session.add(nova_os)
         session.commit()
         session.refresh(nova_os)
+        agendador.agendar(thread_ts, nova_os.sla_limite)
     except Exception as e:
         print("❌ Erro ao salvar no banco:", e)
         session.rollback()
@@ -140,9 +125,201 @@ def criar_ordem_servico(data, thread_ts=None, canal_id=None):
         session.close()
     return nova_os
 
-# Buscar chamados
-def buscar_chamados(data_inicio=None, data_fim=None):
+# 🔁 Abertura idempotente: o chamado é gravado com a chave do envio antes de
+# qualquer mensagem; um envio repetido esbarra na chave única e não posta nada.
+# A reserva nasce com status "pendente" (fora de listas, exportações, resumos,
+# SLA e lote) e só vira "aberto" quando a mensagem no canal sai.
+# Devolve None para repetição; outro erro libera a chave e é repassado.
+STATUS_PENDENTE = "pendente"
+TEXTO_ERRO_ABERTURA = "❌ Não foi possível registrar o chamado. Tente novamente."
+TEXTO_ABERTURA_INCERTA = (
+    "⚠️ Não foi possível confirmar a publicação do chamado no canal. "
+    "Se ele não aparecer em alguns minutos, abra-o novamente."
+)
+
+def nova_reserva(data, chave, canal_id=None):
+    nova_os = nova_ordem_servico(data, None, canal_id)
+    nova_os.status = STATUS_PENDENTE
+    nova_os.chave_idempotencia = chave
+    return nova_os
+
+def _reserva_repetida(chave):
+    idempotencia.envios.repetido_no_banco()
+    print(f"🔁 Envio repetido ignorado (chave {chave} já existe no banco)")
+
+def _reserva_falhou(chave, e):
+    print("❌ Erro ao salvar no banco:", e)
+    idempotencia.envios.liberar(chave)
+
+def reservar_ordem_servico(data, chave, canal_id=None):
+    session = SessionLocal()
+    try:
+        nova_os = nova_reserva(data, chave, canal_id)
+        session.add(nova_os)
+        session.commit()
+        session.refresh(nova_os)
+    except IntegrityError:
+        session.rollback()
+        _reserva_repetida(chave)
+        nova_os = None
+    except Exception as e:
+        session.rollback()
+        _reserva_falhou(chave, e)
+        raise
+    finally:
+        session.close()
+    return nova_os
+
+async def reservar_ordem_servico_async(data, chave, canal_id=None):
+    async with AsyncSessionLocal() as session:
+        try:
+            nova_os = nova_reserva(data, chave, canal_id)
+            session.add(nova_os)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            _reserva_repetida(chave)
+            return None
+        except Exception as e:
+            await session.rollback()
+            _reserva_falhou(chave, e)
+            raise
+    return nova_os
+
+# Metadados da mensagem principal: recuperar_reservas acha a mensagem pelo id
+EVENTO_ABERTURA = "chamado_aberto"
+
+def metadados_abertura(ordem_id):
+    return {"event_type": EVENTO_ABERTURA, "event_payload": {"ordem_id": ordem_id}}
+
+# Só uma reserva ainda pendente é ativada (a recuperação pode ter chegado antes)
+# ou apagada (a recuperação pode já tê-la ativado)
+def _reserva_pendente(ordem_id):
+    return (OrdemServico.id == ordem_id) & (OrdemServico.status == STATUS_PENDENTE)
+
+def _sql_ativar_reserva(ordem_id, thread_ts):
+    return update(OrdemServico).where(_reserva_pendente(ordem_id)).values(thread_ts=thread_ts, status="aberto")
+
+def _sql_descartar_reserva(ordem_id):
+    return delete(OrdemServico).where(_reserva_pendente(ordem_id))
+
+def _reserva_ativada(ativada, thread_ts, sla_limite):
+    if ativada:
+        agendador.agendar(thread_ts, sla_limite)
+    return bool(ativada)
+
+def _ativar_reserva(ordem_id, thread_ts, sla_limite):
+    with engine.begin() as conn:
+        ativada = conn.execute(_sql_ativar_reserva(ordem_id, thread_ts)).rowcount
+    return _reserva_ativada(ativada, thread_ts, sla_limite)
+
+async def _ativar_reserva_async(ordem_id, thread_ts, sla_limite):
+    async with get_async_engine().begin() as conn:
+        ativada = (await conn.execute(_sql_ativar_reserva(ordem_id, thread_ts))).rowcount
+    return _reserva_ativada(ativada, thread_ts, sla_limite)
+
+def vincular_thread(nova_os, thread_ts):
+    _ativar_reserva(nova_os.id, thread_ts, nova_os.sla_limite)
+    nova_os.thread_ts = thread_ts
+    nova_os.status = "aberto"
+
+async def vincular_thread_async(nova_os, thread_ts):
+    await _ativar_reserva_async(nova_os.id, thread_ts, nova_os.sla_limite)
+    nova_os.thread_ts = thread_ts
+    nova_os.status = "aberto"
+
+# Erro devolvido pelo Slack (ok=false): a mensagem certamente não saiu.
+# Timeout ou conexão caída não dizem nada; aí a reserva fica pendente.
+def falha_definitiva(erro):
+    return isinstance(erro, SlackApiError)
+
+# A mensagem no canal falhou de vez: remove a reserva e libera a chave para nova tentativa
+def descartar_ordem_servico(nova_os):
+    with engine.begin() as conn:
+        conn.execute(_sql_descartar_reserva(nova_os.id))
+    idempotencia.envios.liberar(nova_os.chave_idempotencia)
+
+async def descartar_ordem_servico_async(nova_os):
+    async with get_async_engine().begin() as conn:
+        await conn.execute(_sql_descartar_reserva(nova_os.id))
+    idempotencia.envios.liberar(nova_os.chave_idempotencia)
+
+# 🧹 Reservas pendentes há mais de RESERVA_RECUPERAR_APOS (queda entre o insert
+# e o vínculo, ou falha ambígua no postMessage): procura a mensagem no histórico
+# do canal pelos metadados e ativa o chamado; sem mensagem depois de
+# RESERVA_EXPIRA, apaga a reserva.
+RESERVA_RECUPERAR_APOS = int(os.getenv("RESERVA_RECUPERAR_APOS", "120"))
+RESERVA_EXPIRA = int(os.getenv("RESERVA_EXPIRA", "900"))
+RESERVA_PAGINAS_HISTORICO = 10
+
+def _mensagens_abertura(client, canal_id, desde):
+    achadas = {}
+    cursor = None
+    for _ in range(RESERVA_PAGINAS_HISTORICO):
+        resposta = despachante.enviar(client, "conversations.history", PRIORIDADE_LOTE,
+            channel=canal_id, oldest=f"{desde:.6f}", include_all_metadata=True, limit=200, cursor=cursor
+        ).result()
+        for mensagem in resposta.get("messages") or []:
+            metadados = mensagem.get("metadata") or {}
+            if metadados.get("event_type") == EVENTO_ABERTURA:
+                achadas[(metadados.get("event_payload") or {}).get("ordem_id")] = mensagem["ts"]
+        cursor = (resposta.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            break
+    return achadas
+
+def recuperar_reservas(client):
+    agora = datetime.utcnow()
     db = SessionLocal()
+    try:
+        pendentes = db.query(OrdemServico).filter(
+            OrdemServico.status == STATUS_PENDENTE,
+            OrdemServico.data_abertura < agora - timedelta(seconds=RESERVA_RECUPERAR_APOS)
+        ).all()
+        db.expunge_all()
+    finally:
+        db.close()
+
+    por_canal = {}
+    for reserva in pendentes:
+        por_canal.setdefault(reserva.canal_id, []).append(reserva)
+
+    recuperadas = expiradas = 0
+    for canal_id, reservas in por_canal.items():
+        # data_abertura é UTC sem fuso; o ts do Slack é epoch
+        desde = min(r.data_abertura for r in reservas).replace(tzinfo=timezone.utc).timestamp() - 60
+        try:
+            achadas = _mensagens_abertura(client, canal_id, desde) if canal_id else {}
+        except Exception as e:
+            print(f"❌ Erro ao ler o histórico de {canal_id} para recuperar reservas: {e}")
+            achadas = {}
+        for reserva in reservas:
+            thread_ts = achadas.get(reserva.id)
+            if thread_ts:
+                if _ativar_reserva(reserva.id, thread_ts, reserva.sla_limite):
+                    recuperadas += 1
+                    despachante.enviar(client, "chat.postMessage", PRIORIDADE_LOTE,
+                        channel=canal_id,
+                        thread_ts=thread_ts,
+                        text=formatar_mensagem_chamado({
+                            "tipo_ticket": reserva.tipo_ticket,
+                            "locatario": reserva.locatario,
+                            "empreendimento": reserva.empreendimento,
+                            "unidade_metragem": reserva.unidade_metragem,
+                            "numero_reserva": reserva.numero_reserva,
+                            "responsavel": reserva.responsavel,
+                        }, reserva.solicitante)
+                    )
+            elif reserva.data_abertura < agora - timedelta(seconds=RESERVA_EXPIRA):
+                descartar_ordem_servico(reserva)
+                expiradas += 1
+
+    if recuperadas or expiradas:
+        print(f"🧹 Reservas pendentes: {recuperadas} recuperada(s), {expiradas} expirada(s)")
+    return recuperadas, expiradas
+
+# Buscar chamados
+def _query_chamados(db, data_inicio=None, data_fim=None):
     query = db.query(OrdemServico).filter(
         OrdemServico.status.in_(["aberto", "em análise", "fechado", "cancelado"])
     )
@@ -150,112 +327,191 @@ def buscar_chamados(data_inicio=None, data_fim=None):
         query = query.filter(OrdemServico.data_abertura >= data_inicio)
     if data_fim:
         query = query.filter(OrdemServico.data_abertura <= data_fim)
+    return query.order_by(OrdemServico.id.desc())
 
-    chamados = query.order_by(OrdemServico.id.desc()).all()
+def buscar_chamados(data_inicio=None, data_fim=None):
+    db = SessionLocal()
+    chamados = _query_chamados(db, data_inicio, data_fim).all()
     db.close()
     return chamados
 
-# 📋 Exportar CSV
-def enviar_relatorio(client, user_id, data_inicio=None, data_fim=None):
-    chamados = buscar_chamados(data_inicio, data_fim)
-
-    if not chamados:
-        client.chat_postEphemeral(channel=user_id, user=user_id, text="❌ Nenhum chamado encontrado para exportar.")
-        return
+# 🌊 Iterar chamados em lotes com cursor do lado do servidor
+TAMANHO_LOTE_EXPORTACAO = int(os.getenv("EXPORT_TAMANHO_LOTE", "1000"))
 
-    agora = datetime.now().strftime("%Y%m%d")
-    caminho = f"/tmp/chamados_{agora}.csv"
+# `contador` ([0]) recebe o total de chamados percorridos
+def com_progresso(chamados, progresso=None, a_cada=500, contador=None):
+    total = 0
+    for chamado in chamados:
+        yield chamado
+        total += 1
+        if contador is not None:
+            contador[0] = total
+        if progresso and total % a_cada == 0:
+            progresso(total)
+    if progresso:
+        progresso(total)
+
+def iterar_chamados(data_inicio=None, data_fim=None, tamanho_lote=TAMANHO_LOTE_EXPORTACAO):
+    db = SessionLocal()
+    try:
+        query = (
+            _query_chamados(db, data_inicio, data_fim)
+            .execution_options(stream_results=True)
+            .yield_per(tamanho_lote)
+        )
+        for chamado in query:
+            yield chamado
+            db.expunge(chamado)  # não acumula objetos no identity map
+    finally:
+        db.close()
 
-    def formatar_data(data):
-        return data.strftime("%d/%m/%Y") if data else "–"
+# 📋 Exportar CSV
+CABECALHO_CSV = [
+    "ID", "Tipo", "Contrato", "Locatário", "Moradores", "Empreendimento", "Unidade",
+    "Data Entrada", "Data Saída", "Valor", "Responsável", "Solicitante",
+    "Status", "Aberto em", "SLA", "Histórico Reaberturas"
+]
 
-    def formatar_valor(valor):
-        try:
-            return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except:
-            return "–"
+def _formatar_data(data):
+    return data.strftime("%d/%m/%Y") if data else "–"
 
-    def resolver_nome(id_ou_grupo):
-        if not id_ou_grupo:
-            return "–"
-        if id_ou_grupo == "S08STJCNMHR":
-            return "Reservas"
-        return get_nome_slack(id_ou_grupo)
-
-    with open(caminho, mode="w", newline="", encoding="utf-8-sig") as arquivo_csv:
-        writer = csv.writer(arquivo_csv)
-        writer.writerow([
-            "ID", "Tipo", "Contrato", "Locatário", "Moradores", "Empreendimento", "Unidade",
-            "Data Entrada", "Data Saída", "Valor", "Responsável", "Solicitante",
-            "Status", "Aberto em", "SLA", "Histórico Reaberturas"
-        ])
-        for c in chamados:
-            writer.writerow([
-                c.id,
-                c.tipo_ticket or "–",
-                c.tipo_contrato or "–",
-                c.locatario or "–",
-                c.moradores or "–",
-                c.empreendimento or "–",
-                c.unidade_metragem or "–",
-                formatar_data(c.data_entrada),
-                formatar_data(c.data_saida),
-                formatar_valor(c.valor_locacao),
-                resolver_nome(c.responsavel),
-                resolver_nome(c.solicitante),
-                c.status or "–",
-                formatar_data(c.data_abertura),
-                c.sla_status or "–",
-                c.historico_reaberturas or "–"
-            ])
+def _formatar_valor(valor):
+    try:
+        return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except:
+        return "–"
 
+def linhas_csv(chamados):
+    for c in chamados:
+        yield [
+            c.id,
+            c.tipo_ticket or "–",
+            c.tipo_contrato or "–",
+            c.locatario or "–",
+            c.moradores or "–",
+            c.empreendimento or "–",
+            c.unidade_metragem or "–",
+            _formatar_data(c.data_entrada),
+            _formatar_data(c.data_saida),
+            _formatar_valor(c.valor_locacao),
+            resolver_nome(c.responsavel),
+            resolver_nome(c.solicitante),
+            c.status or "–",
+            _formatar_data(c.data_abertura),
+            c.sla_status or "–",
+            c.historico_reaberturas or "–"
+        ]
+
+# 📦 Relatórios são gerados num buffer: em memória até EXPORT_SPOOL_MAX bytes,
+# depois num arquivo temporário anônimo. Nada de caminho fixo em /tmp.
+# 🔥 Backends pesados (reportlab, openpyxl) só carregam no primeiro uso;
+# PRECARREGAR_BACKENDS=1 os importa numa thread depois da conexão
+BACKENDS_PESADOS = ("relatorio_xlsx", "relatorio_pdf")
+PRECARREGAR_BACKENDS = os.getenv("PRECARREGAR_BACKENDS", "1") == "1"
+
+def precarregar_backends():
+    def carregar():
+        inicio = time.perf_counter()
+        for nome in BACKENDS_PESADOS:
+            try:
+                importlib.import_module(nome)
+            except Exception as e:
+                print(f"❌ Erro ao pré-carregar {nome}: {e}")
+        print(f"🔥 Backends de exportação carregados em {time.perf_counter() - inicio:.2f}s")
+
+    if PRECARREGAR_BACKENDS:
+        threading.Thread(target=carregar, name="precarregar-backends", daemon=True).start()
+
+EXPORT_SPOOL_MAX = int(os.getenv("EXPORT_SPOOL_MAX", str(8 * 1024 * 1024)))
+EXPORT_CSV_COMPRESSAO = os.getenv("EXPORT_CSV_COMPRESSAO", "").lower()  # "", "gzip" ou "zip"
+
+def novo_buffer():
+    return tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX, mode="w+b")
+
+# O files_upload_v2 recebe o próprio arquivo (file=), sem uma cópia nossa em
+# bytes durante o upload. SpooledTemporaryFile só é io.IOBase a partir do
+# Python 3.11; antes disso caímos para os bytes.
+# `guardar(buffer, meta)` recebe o arquivo pronto (cache_exportacoes), que
+# confere o tamanho antes de ler o buffer
+def enviar_buffer(client, user_id, buffer, filename, title, initial_comment, guardar=None):
     response = client.conversations_open(users=user_id)
     channel_id = response["channel"]["id"]
 
+    buffer.seek(0)
     client.files_upload_v2(
         channel=channel_id,
-        file=caminho,
-        title=f"Relatório de Chamados - {agora}",
-        initial_comment="📎 Aqui está seu relatório de chamados."
+        file=buffer if isinstance(buffer, io.IOBase) else buffer.read(),
+        filename=filename,
+        title=title,
+        initial_comment=initial_comment
     )
-# 📤 Exportar PDF com logo JFL e histórico
-def exportar_pdf(client, user_id, data_inicio=None, data_fim=None):
-    db = SessionLocal()
-    chamados = buscar_chamados(data_inicio, data_fim)
+    if guardar:
+        guardar(buffer, {"filename": filename, "title": title, "initial_comment": initial_comment})
+
+# CSV em UTF-8 com BOM (Excel), direto no buffer ou dentro de um .gz/.zip
+def escrever_csv(linhas, buffer, nome, compressao=""):
+    if compressao == "gzip":
+        destino = gzip.GzipFile(filename=nome, mode="wb", fileobj=buffer)
+    elif compressao == "zip":
+        arquivo_zip = zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED)
+        destino = arquivo_zip.open(nome, mode="w", force_zip64=True)
+    else:
+        destino = buffer
 
-    if not chamados:
-        client.chat_postEphemeral(channel=user_id, user=user_id, text="❌ Nenhum chamado encontrado para exportar.")
-        return
+    destino.write(codecs.BOM_UTF8)
+    writer = csv.writer(codecs.getwriter("utf-8")(destino))
+    writer.writerow(CABECALHO_CSV)
+    writer.writerows(linhas)
 
-    agora = datetime.now().strftime("%Y%m%d%")
-    caminho = f"/tmp/chamados_{agora}.pdf"
+    if compressao == "gzip":
+        destino.close()
+    elif compressao == "zip":
+        destino.close()
+        arquivo_zip.close()
 
-    doc = SimpleDocTemplate(caminho, pagesize=landscape(A4))
-    estilos = getSampleStyleSheet()
-    elementos = []
+EXTENSOES_CSV = {"gzip": ".csv.gz", "zip": ".zip"}
 
-    logo_url = "https://raw.githubusercontent.com/jflrealty/images/main/JFL_logotipo_completo.jpg"
-    try:
-        img_data = urllib.request.urlopen(logo_url).read()
-        img_io = io.BytesIO(img_data)
-        logo = Image(img_io)
-        logo._restrictSize(5*inch, 1*inch)
-        elementos.append(logo)
-        elementos.append(Spacer(1, 12))
-    except Exception as e:
-        print(f"❌ Erro ao carregar logo: {e}")
+def enviar_relatorio(client, user_id, data_inicio=None, data_fim=None, progresso=None, compressao=None, guardar=None):
+    chamados = iterar_chamados(data_inicio, data_fim)
+    primeiro = next(chamados, None)
 
-    elementos.append(Paragraph(f"📋 Relatório de Chamados - {datetime.now().strftime('%d/%m/%Y')}", estilos["Heading2"]))
-    elementos.append(Spacer(1, 12))
+    if primeiro is None:
+        return 0  # a fila de exportação avisa o usuário
 
-    dados = [[
-        "ID", "Tipo", "Contrato", "Locatário", "Empreendimento", "Unidade",
-        "Valor", "Responsável", "Solicitante", "Status", "SLA", "Histórico"
-    ]]
+    compressao = EXPORT_CSV_COMPRESSAO if compressao is None else compressao
+    agora = datetime.now().strftime("%Y%m%d")
+    diretorio.aquecer(client)
 
-    for c in chamados:
+    total = [0]
+    with novo_buffer() as buffer:
+        escrever_csv(
+            linhas_csv(com_progresso(itertools.chain([primeiro], chamados), progresso, contador=total)),
+            buffer, f"chamados_{agora}.csv", compressao
+        )
+        enviar_buffer(
+            client, user_id, buffer,
+            filename=f"chamados_{agora}{EXTENSOES_CSV.get(compressao, '.csv')}",
+            title=f"Relatório de Chamados - {agora}",
+            initial_comment="📎 Aqui está seu relatório de chamados.",
+            guardar=guardar
+        )
+    return total[0]
+# 📤 Exportar PDF com logo JFL e histórico
+def exportar_pdf(client, user_id, data_inicio=None, data_fim=None, progresso=None, guardar=None):
+    chamados = buscar_chamados(data_inicio, data_fim)
+
+    if not chamados:
+        return 0  # a fila de exportação avisa o usuário
+
+    agora = datetime.now().strftime("%Y%m%d")
+    diretorio.aquecer(client)
+
+    import relatorio_pdf
+
+    linhas = []
+    for c in com_progresso(chamados, progresso):
         valor = f"R$ {c.valor_locacao:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if c.valor_locacao else ""
-        dados.append([
+        linhas.append([
             c.id,
             c.tipo_ticket,
             c.tipo_contrato,
@@ -271,83 +527,82 @@ def exportar_pdf(client, user_id, data_inicio=None, data_fim=None):
             c.historico_reaberturas or "–"
         ])
 
-    tabela = Table(dados, repeatRows=1, colWidths=[
-        0, 70, 70, 80, 70, 60, 50, 70, 70, 50, 60, 30, 130
-    ])
-
-    tabela.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#e0e0e0")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
-    ]))
-
-    elementos.append(tabela)
-    doc.build(elementos)
+    with novo_buffer() as buffer:
+        relatorio_pdf.escrever_pdf(linhas, buffer)
+        enviar_buffer(
+            client, user_id, buffer,
+            filename=f"chamados_{agora}.pdf",
+            title=f"Relatório Chamados {agora}.pdf",
+            initial_comment="📎 Aqui está seu relatório em PDF.",
+            guardar=guardar
+        )
+    return len(linhas)
 
-    response = client.conversations_open(users=user_id)
-    channel_id = response["channel"]["id"]
+# 🧩 Views do Block Kit (pré-montadas em templates.py)
+def montar_blocos_modal():
+    return templates.BLOCOS_ABERTURA
 
-    client.files_upload_v2(
-        channel=channel_id,
-        file=caminho,
-        title=f"Relatório Chamados {agora}.pdf",
-        initial_comment="📎 Aqui está seu relatório em PDF."
-    )
+def montar_blocos_exportacao():
+    return templates.BLOCOS_EXPORTACAO
+
+def montar_view_reabertura(ts):
+    return templates.render_view_reabertura(ts)
+
+def montar_view_edicao(chamado, thread_ts):
+    return templates.render_view_edicao(chamado, thread_ts)
+
+def montar_view_cancelamento(ts):
+    return templates.render_view_cancelamento(ts)
 
 # 📋 Exibir lista de chamados do usuário
 def exibir_lista(client, user_id):
-    db = SessionLocal()
-    chamados = db.query(OrdemServico).filter(OrdemServico.solicitante == user_id).order_by(
-        OrdemServico.status, OrdemServico.data_abertura.desc()).all()
-    db.close()
+    estado = lista_chamados.estado_padrao()
+    linhas, tem_anterior, tem_proxima = lista_chamados.buscar_pagina(user_id, estado)
 
-    if not chamados:
+    if not linhas:
         client.chat_postEphemeral(channel=user_id, user=user_id, text="✅ Você não possui chamados registrados.")
         return
 
-    abertos, em_analise, fechados = [], [], []
-
-    for c in chamados:
-        sla_emoji = "🔴" if c.sla_status == "fora do prazo" else "🟢"
-        linha = f"{sla_emoji} ID {c.id} | {c.empreendimento} | {c.tipo_ticket} | Resp: <@{c.responsavel}>"
-        if c.status == "aberto":
-            abertos.append(linha)
-        elif c.status == "em análise":
-            em_analise.append(linha)
-        elif c.status == "fechado":
-            fechados.append(linha)
-
-    texto = "📋 *Seus Chamados:*\n"
-    if em_analise:
-        texto += "\n🟡 *Em Análise:*\n" + "\n".join(em_analise)
-    if abertos:
-        texto += "\n🟢 *Abertos:*\n" + "\n".join(abertos)
-    if fechados:
-        texto += "\n⚪️ *Fechados:*\n" + "\n".join(fechados)
-
-    client.chat_postEphemeral(channel=user_id, user=user_id, text=texto)
+    # Primeira página; os botões e filtros seguem em lista_chamados.tratar_acao
+    client.chat_postEphemeral(
+        channel=user_id, user=user_id, **lista_chamados.render_pagina(estado, linhas, tem_anterior, tem_proxima)
+    )
 
 # ⏰ Verificar chamados vencidos
 def verificar_sla_vencido():
-    db = SessionLocal()
-    agora = datetime.now()
-    chamados = db.query(OrdemServico).filter(
-        OrdemServico.status.in_(["aberto", "em análise"]),
-        OrdemServico.sla_limite < agora,
-        OrdemServico.sla_status == "dentro do prazo"
-    ).all()
+    inicio = time.perf_counter()
+    agora = datetime.utcnow()  # mesma base de sla_limite
+    stmt = (
+        update(OrdemServico)
+        .where(
+            OrdemServico.status.in_(["aberto", "em análise"]),
+            OrdemServico.sla_limite < agora,
+            OrdemServico.sla_status == "dentro do prazo"
+        )
+        .values(sla_status="fora do prazo")
+        .returning(
+            OrdemServico.id,
+            OrdemServico.thread_ts,
+            OrdemServico.canal_id,
+            OrdemServico.responsavel
+        )
+        .execution_options(synchronize_session=False)
+    )
 
-    for chamado in chamados:
-        chamado.sla_status = "fora do prazo"
+    db = SessionLocal()
+    try:
+        vencidos = db.execute(stmt).fetchall()
         db.commit()
+    except Exception as e:
+        print(f"❌ Erro na verificação de SLA: {e}")
+        db.rollback()
+        vencidos = []
+    finally:
+        db.close()
 
-    db.close()
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    print(f"⏰ Verificação de SLA: {len(vencidos)} chamado(s) marcados fora do prazo em {duracao_ms:.1f} ms")
+    return vencidos
 
 # 🔔 Lembrar responsáveis sobre chamados vencidos
 def lembrar_chamados_vencidos(client):
@@ -358,13 +613,102 @@ def lembrar_chamados_vencidos(client):
     ).all()
 
     for chamado in chamados:
-        client.chat_postMessage(
+        despachante.enviar(client, "chat.postMessage", PRIORIDADE_LOTE,
             channel=os.getenv("SLACK_CANAL_CHAMADOS", "#comercial"),
             thread_ts=chamado.thread_ts,
             text=f"🔔 *Lembrete:* <@{chamado.responsavel}> o chamado ID *{chamado.id}* ainda está vencido! 🚨"
         )
     db.close()
 
+# 📝 Ler formulário de abertura
+def ler_formulario_abertura(view, user):
+    data = {}
+    for block_id, value in view["state"]["values"].items():
+        action = list(value.values())[0]
+        data[block_id] = (
+            action.get("selected_user")
+            or action.get("selected_date")
+            or action.get("selected_option", {}).get("value")
+            or action.get("value")
+        )
+
+    data["solicitante"] = user
+
+    # ✅ campos antigos: mantém compatibilidade com criar_ordem_servico atual
+    data["tipo_contrato"] = None
+    data["moradores"] = None
+    data["data_entrada"] = None
+    data["data_saida"] = None
+    data["valor_locacao"] = None
+    return data
+
+# 📣 Mensagem principal do chamado no canal
+def mensagem_abertura(data, user):
+    numero_reserva = data.get("numero_reserva") or "–"
+    texto = (
+        f"({data['locatario']}) - {data['empreendimento']} - {data['unidade_metragem']} "
+        f"- *Reserva:* {numero_reserva} <@{user}>: *{data['tipo_ticket']}*"
+    )
+    texto_notificacao = (
+        f"({data['locatario']}) - {data['empreendimento']} - {data['unidade_metragem']} "
+        f"- Reserva: {numero_reserva} <@{user}>: *{data['tipo_ticket']}*"
+    )
+    return texto_notificacao, templates.render_mensagem_chamado(texto)
+
+def mensagem_chamado_editado(chamado):
+    texto = (
+        f"({chamado.locatario}) - {chamado.empreendimento} - {chamado.unidade_metragem} "
+        f"<@{chamado.solicitante}>: *{chamado.tipo_ticket}*"
+    )
+    return texto, templates.render_mensagem_chamado(texto, editavel=True)
+
+# ✏️ Ler formulário de edição
+def ler_formulario_edicao(valores):
+    def pegar_valor(campo):
+        bloco = valores.get(campo, {})
+        if not bloco:
+            return ""
+        item = list(bloco.values())[0]
+        return (
+            item.get("selected_option", {}).get("value")
+            or item.get("value")
+            or ""
+        )
+
+    valor_str = pegar_valor("valor_locacao")
+    try:
+        valor_locacao = float(valor_str.replace("R$", "").replace(".", "").replace(",", ".").strip())
+    except Exception:
+        valor_locacao = None
+
+    return {
+        "tipo_contrato": pegar_valor("tipo_contrato"),
+        "locatario": pegar_valor("locatario"),
+        "moradores": pegar_valor("moradores"),
+        "empreendimento": pegar_valor("empreendimento"),
+        "unidade_metragem": pegar_valor("unidade_metragem"),
+        "valor_locacao": valor_locacao,
+    }
+
+# ✏️ Aplicar edição no chamado (sem commit); devolve {campo: [antes, depois]} do que mudou
+CAMPOS_EDICAO = ["tipo_contrato", "locatario", "moradores", "empreendimento", "unidade_metragem", "valor_locacao"]
+
+def aplicar_edicao(chamado, campos, nome_editor):
+    antes = diff_campos.retrato(chamado, CAMPOS_EDICAO)
+    antes["valor_locacao"] = str(chamado.valor_locacao or "")
+    depois = dict(campos, valor_locacao=str(campos["valor_locacao"] or ""))
+
+    chamado.tipo_contrato = campos["tipo_contrato"]
+    chamado.locatario = campos["locatario"]
+    chamado.moradores = campos["moradores"]
+    chamado.empreendimento = campos["empreendimento"]
+    chamado.unidade_metragem = campos["unidade_metragem"]
+    chamado.valor_locacao = campos["valor_locacao"]
+    chamado.data_ultima_edicao = datetime.utcnow()
+    chamado.ultimo_editor = nome_editor
+
+    return diff_campos.como_dict(diff_campos.diferencas(antes, depois, CAMPOS_EDICAO))
+
 # 📄 Formatar mensagem
 def formatar_mensagem_chamado(data, user_id):
     def formatar_para_slack(valor):
@@ -389,282 +733,350 @@ def formatar_mensagem_chamado(data, user_id):
         f"*Responsável:* {formatar_para_slack(data.get('responsavel'))}\n"
         f"*Solicitante:* <@{user_id}>"
     )
-    
-from database import SessionLocal
-from models import OrdemServico
-from datetime import datetime
-import os
 
-# 🔄 Capturar chamado
-def capturar_chamado(client, body):
-    ts = body["message"]["ts"]
-    user_id = body["user"]["id"]
-    db = SessionLocal()
-    chamado = db.query(OrdemServico).filter(OrdemServico.thread_ts == ts).first()
+# 🔀 Fluxos dos listeners, comuns a main.py e main_async.py: o que gravar, o
+# evento e as mensagens de resposta são decididos aqui uma vez só; cada fluxo
+# tem a versão síncrona e a asyncio só no acesso ao banco e no envio ao Slack.
+# Uma resposta é (método da Web API, argumentos) e sai pelo despachante.
+def _efemera(canal, user_id, texto):
+    return ("chat.postEphemeral", {"channel": canal, "user": user_id, "text": texto})
+
+def _na_thread(canal, thread_ts, texto):
+    return ("chat.postMessage", {"channel": canal, "thread_ts": thread_ts, "text": texto})
+
+# Com `aguardar`, cada resposta só sai depois da anterior e um erro do Slack é levantado
+def enviar_respostas(client, respostas, aguardar=False):
+    enviadas = []
+    for metodo, argumentos in respostas:
+        futuro = despachante.enviar(client, metodo, PRIORIDADE_INTERATIVA, **argumentos)
+        enviadas.append(futuro.result() if aguardar else futuro)
+    return enviadas
+
+async def enviar_respostas_async(client, respostas):
+    return [
+        await despachante.enviar_async(client, metodo, PRIORIDADE_INTERATIVA, **argumentos)
+        for metodo, argumentos in respostas
+    ]
 
-    if not chamado:
-        client.chat_postEphemeral(channel=body["channel"]["id"], user=user_id, text="❌ Chamado não encontrado.")
-        db.close()
+# 🧾 Abertura: reserva, mensagem principal, vínculo da thread e detalhes
+Abertura = namedtuple("Abertura", "user canal_id chave data")
+
+# Retry do Slack ou duplo clique: mesmo view.id, nada de I/O (devolve None)
+def preparar_abertura(body, view):
+    user = body["user"]["id"]
+    chave = idempotencia.chave_envio(view, user)
+    if not idempotencia.envios.reservar(chave):
+        print(f"🔁 Envio repetido ignorado ({chave})")
+        return None
+    return Abertura(user, os.getenv("SLACK_CANAL_ID", "C06TTKNEBHA"), chave, ler_formulario_abertura(view, user))
+
+def publicacao_abertura(abertura, nova_os):
+    texto, blocos = mensagem_abertura(abertura.data, abertura.user)
+    return ("chat.postMessage", {
+        "channel": abertura.canal_id, "text": texto, "blocks": blocos, "metadata": metadados_abertura(nova_os.id),
+    })
+
+def detalhes_abertura(abertura, thread_ts):
+    return _na_thread(abertura.canal_id, thread_ts, formatar_mensagem_chamado(abertura.data, abertura.user))
+
+def aviso_erro_abertura(abertura):
+    return _efemera(abertura.canal_id, abertura.user, TEXTO_ERRO_ABERTURA)
+
+# Sem resposta clara do Slack a mensagem pode ter saído: a reserva fica
+# pendente e recuperar_reservas a ativa ou expira
+def aviso_falha_publicacao(abertura, nova_os, erro, logger):
+    logger.error(f"❌ Erro ao publicar chamado {nova_os.id}: {erro}")
+    texto = TEXTO_ERRO_ABERTURA if falha_definitiva(erro) else TEXTO_ABERTURA_INCERTA
+    return _efemera(abertura.canal_id, abertura.user, texto)
+
+def abrir_chamado(client, body, view, logger):
+    abertura = preparar_abertura(body, view)
+    if abertura is None:
         return
 
-    if chamado.status != "aberto":
-        client.chat_postEphemeral(
-            channel=body["channel"]["id"],
-            user=user_id,
-            text=f"⚠️ O chamado já está em status *{chamado.status}*. Não é possível capturar."
-        )
-        db.close()
+    # ✅ Reserva a ordem (pendente) antes de qualquer mensagem (chave única no banco)
+    try:
+        nova_os = reservar_ordem_servico(abertura.data, abertura.chave, abertura.canal_id)
+    except Exception:
+        enviar_respostas(client, [aviso_erro_abertura(abertura)])
+        return
+    if nova_os is None:
         return
 
-    chamado.status = "em análise"
-    chamado.responsavel = user_id
-    chamado.capturado_por = user_id
-    chamado.data_captura = datetime.now()
-    db.commit()
-    db.close()
+    # ✅ Mensagem principal no canal público
+    try:
+        resposta, = enviar_respostas(client, [publicacao_abertura(abertura, nova_os)], aguardar=True)
+    except Exception as e:
+        if falha_definitiva(e):
+            descartar_ordem_servico(nova_os)
+        enviar_respostas(client, [aviso_falha_publicacao(abertura, nova_os, e, logger)])
+        return
 
-    client.chat_postMessage(
-        channel=body["channel"]["id"],
-        thread_ts=ts,
-        text=f"🔄 Chamado capturado por <@{user_id}>!"
-    )
+    vincular_thread(nova_os, resposta["ts"])
+    enviar_respostas(client, [detalhes_abertura(abertura, resposta["ts"])])
 
-# ✅ Finalizar chamado
-def finalizar_chamado(client, body):
+async def abrir_chamado_async(client, body, view, logger):
+    abertura = preparar_abertura(body, view)
+    if abertura is None:
+        return
+
+    try:
+        nova_os = await reservar_ordem_servico_async(abertura.data, abertura.chave, abertura.canal_id)
+    except Exception:
+        await enviar_respostas_async(client, [aviso_erro_abertura(abertura)])
+        return
+    if nova_os is None:
+        return
+
+    try:
+        resposta, = await enviar_respostas_async(client, [publicacao_abertura(abertura, nova_os)])
+    except Exception as e:
+        if falha_definitiva(e):
+            await descartar_ordem_servico_async(nova_os)
+        await enviar_respostas_async(client, [aviso_falha_publicacao(abertura, nova_os, e, logger)])
+        return
+
+    await vincular_thread_async(nova_os, resposta["ts"])
+    await enviar_respostas_async(client, [detalhes_abertura(abertura, resposta["ts"])])
+
+# 🔀 Transições dos botões e modais. `extras(resultado)` completa o evento e
+# `responder(resultado)` ajusta o prazo de SLA e devolve as respostas.
+PedidoTransicao = namedtuple("PedidoTransicao", "acao ts valores autor extras responder")
+
+def _sem_extras(resultado):
+    return {}
+
+def transicionar_chamado(client, pedido):
+    with engine.begin() as conn:
+        resultado = transicoes.transicionar(pedido.acao, pedido.ts, pedido.valores, conexao=conn)
+        if resultado.codigo == transicoes.OK:
+            eventos.registrar_transicao(conn, pedido.acao, resultado, pedido.autor, **pedido.extras(resultado))
+    enviar_respostas(client, pedido.responder(resultado))
+    return resultado
+
+async def transicionar_chamado_async(client, pedido):
+    async with get_async_engine().begin() as conn:
+        resultado = await transicoes.transicionar_async(pedido.acao, pedido.ts, pedido.valores, conexao=conn)
+        if resultado.codigo == transicoes.OK:
+            await eventos.registrar_transicao_async(conn, pedido.acao, resultado, pedido.autor, **pedido.extras(resultado))
+    await enviar_respostas_async(client, pedido.responder(resultado))
+    return resultado
+
+# Recusa comum a capturar/finalizar (None quando a transição passou)
+def _recusa_botao(resultado, canal, user_id, verbo, texto_status):
+    if resultado.codigo == transicoes.NAO_ENCONTRADO:
+        return [_efemera(canal, user_id, "❌ Chamado não encontrado.")]
+    if resultado.codigo == transicoes.CONFLITO:
+        return [_efemera(canal, user_id, f"⚠️ O chamado acabou de ser alterado por outra pessoa. Não é possível {verbo}.")]
+    if resultado.codigo == transicoes.STATUS_INVALIDO:
+        return [_efemera(canal, user_id, texto_status.format(status=resultado.antes["status"]))]
+    return None
+
+# 🔄 Capturar chamado
+def pedido_captura(body):
     ts = body["message"]["ts"]
     user_id = body["user"]["id"]
-    db = SessionLocal()
-    chamado = db.query(OrdemServico).filter(OrdemServico.thread_ts == ts).first()
+    canal = body["channel"]["id"]
 
-    if not chamado:
-        client.chat_postEphemeral(channel=body["channel"]["id"], user=user_id, text="❌ Chamado não encontrado.")
-        db.close()
-        return
+    def responder(resultado):
+        recusa = _recusa_botao(
+            resultado, canal, user_id, "capturar",
+            "⚠️ O chamado já está em status *{status}*. Não é possível capturar."
+        )
+        if recusa:
+            return recusa
+        if resultado.depois["sla_status"] == "dentro do prazo":
+            agendador.agendar(ts, resultado.depois["sla_limite"])
+        return [_na_thread(canal, ts, f"🔄 Chamado capturado por <@{user_id}>!")]
 
-    if chamado.status == "fechado":
-        client.chat_postEphemeral(
-            channel=body["channel"]["id"],
-            user=user_id,
-            text="⚠️ Esse chamado já está *fechado*. Nenhuma ação realizada."
+    valores = {"responsavel": user_id, "capturado_por": user_id, "data_captura": datetime.utcnow()}
+    return PedidoTransicao(eventos.CAPTURAR, ts, valores, user_id, _sem_extras, responder)
+
+# ✅ Finalizar chamado
+def pedido_finalizacao(body):
+    ts = body["message"]["ts"]
+    user_id = body["user"]["id"]
+    canal = body["channel"]["id"]
+
+    def responder(resultado):
+        recusa = _recusa_botao(
+            resultado, canal, user_id, "finalizar",
+            "⚠️ Esse chamado já está *{status}*. Nenhuma ação realizada."
         )
-        db.close()
-        return
+        if recusa:
+            return recusa
+        agendador.remover(ts)
+        return [_na_thread(canal, ts, f"✅ Chamado finalizado por <@{user_id}>!")]
 
-    chamado.status = "fechado"
-    chamado.data_fechamento = datetime.now()
-    db.commit()
-    db.close()
+    return PedidoTransicao(eventos.FINALIZAR, ts, {"data_fechamento": datetime.utcnow()}, user_id, _sem_extras, responder)
 
-    client.chat_postMessage(
-        channel=body["channel"]["id"],
-        thread_ts=ts,
-        text=f"✅ Chamado finalizado por <@{user_id}>!"
-    )
+# ❌ Cancelar chamado (modal com o motivo)
+def pedido_cancelamento(body, view):
+    ts = view["private_metadata"]
+    motivo = view["state"]["values"]["motivo"]["value"]["value"]
+    user_id = body["user"]["id"]
+
+    def responder(resultado):
+        if resultado.codigo == transicoes.OK:
+            agendador.remover(ts)
+            return [_na_thread(
+                resultado.depois["canal_id"], ts, f"❌ Chamado cancelado por <@{user_id}>!\n*Motivo:* {motivo}"
+            )]
+        if resultado.codigo == transicoes.NAO_ENCONTRADO:
+            return []
+        texto = (
+            "⚠️ O chamado acabou de ser alterado por outra pessoa. Não é possível cancelar."
+            if resultado.codigo == transicoes.CONFLITO
+            else f"⚠️ O chamado está em status *{resultado.antes['status']}*. Não é possível cancelar."
+        )
+        return [_efemera(resultado.antes["canal_id"] or user_id, user_id, texto)]
+
+    valores = {"motivo_cancelamento": motivo, "data_fechamento": datetime.utcnow()}
+    return PedidoTransicao(eventos.CANCELAR, ts, valores, user_id, lambda resultado: {"motivo": motivo}, responder)
 
 # ♻️ Abrir modal de reabertura
 def abrir_modal_reabertura(client, body):
-    ts = body["message"]["ts"]
-    client.views_open(
-        trigger_id=body["trigger_id"],
-        view={
-            "type": "modal",
-            "callback_id": "reabrir_chamado_modal",
-            "title": {"type": "plain_text", "text": "Reabrir Chamado"},
-            "submit": {"type": "plain_text", "text": "Salvar"},
-            "private_metadata": ts,
-            "blocks": [
-                {
-                    "type": "input",
-                    "block_id": "novo_tipo_ticket",
-                    "element": {
-                        "type": "static_select",
-                        "action_id": "value",
-                        "placeholder": {"type": "plain_text", "text": "Escolha o novo tipo de ticket"},
-                        "options": [{"text": {"type": "plain_text", "text": opt}, "value": opt}
-                                    for opt in ["Lista de Espera", "Pré bloqueio", "Reserva", "Aditivo", "Prorrogação", "Saída Antecipada", "Saída Confirmada", "Background Check", "Fatura"]]
-                    },
-                    "label": {"type": "plain_text", "text": "Novo Tipo de Ticket"}
-                }
-            ]
-        }
-    )
+    client.views_open(trigger_id=body["trigger_id"], view=montar_view_reabertura(body["message"]["ts"]))
+
+def _buscar_por_thread(db, thread_ts):
+    return db.query(OrdemServico).filter(OrdemServico.thread_ts == thread_ts).first()
+
+async def _buscar_por_thread_async(session, thread_ts):
+    return (await session.execute(select(OrdemServico).filter(OrdemServico.thread_ts == thread_ts))).scalars().first()
 
 def abrir_modal_edicao(client, trigger_id, thread_ts):
     db = SessionLocal()
-    chamado = db.query(OrdemServico).filter(OrdemServico.thread_ts == thread_ts).first()
+    chamado = _buscar_por_thread(db, thread_ts)
     db.close()
     if not chamado:
         return
 
-    client.views_open(
-        trigger_id=trigger_id,
-        view={
-            "type": "modal",
-            "callback_id": "editar_chamado_modal",
-            "title": {"type": "plain_text", "text": "Editar Chamado"},
-            "submit": {"type": "plain_text", "text": "Salvar"},
-            "private_metadata": thread_ts,
-            "blocks": [
-                {
-                    "type": "section",
-                    "block_id": "tipo_ticket",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"*Tipo de Ticket:* `{chamado.tipo_ticket}` (não editável)"
-                    }
-                },
-                {
-                    "type": "input",
-                    "block_id": "tipo_contrato",
-                    "element": {
-                        "type": "static_select",
-                        "placeholder": {"type": "plain_text", "text": "Escolha"},
-                        "options": [{"text": {"type": "plain_text", "text": opt}, "value": opt}
-                                    for opt in ["Short Stay", "Temporada", "Long Stay", "Comodato"]],
-                        "initial_option": {
-                            "text": {"type": "plain_text", "text": chamado.tipo_contrato},
-                            "value": chamado.tipo_contrato
-                    } if chamado.tipo_contrato else None
-                },
-                "label": {"type": "plain_text", "text": "Tipo de Contrato"}
-                },
-                {
-                    "type": "input",
-                    "block_id": "locatario",
-                    "element": {
-                        "type": "plain_text_input",
-                        "action_id": "value",
-                        "initial_value": chamado.locatario
-                    },
-                    "label": {"type": "plain_text", "text": "Locatário"}
-                },
-                {
-                    "type": "input",
-                    "block_id": "moradores",
-                    "element": {
-                        "type": "plain_text_input",
-                        "action_id": "value",
-                        "initial_value": chamado.moradores
-                    },
-                    "label": {"type": "plain_text", "text": "Moradores"}
-                },
-                {
-                    "type": "input",
-                    "block_id": "empreendimento",
-                    "element": {
-                        "type": "static_select",
-                        "action_id": "value",
-                        "placeholder": {"type": "plain_text", "text": "Escolha"},
-                        "options": [{"text": {"type": "plain_text", "text": opt}, "value": opt}
-                                    for opt in ["JFL125", "JML747", "VO699", "VHOUSE", "AVNU"]],
-                        "initial_option": {
-                        "text": {"type": "plain_text", "text": chamado.empreendimento},
-                        "value": chamado.empreendimento
-                    } if chamado.empreendimento else None
-                },
-                        "label": {"type": "plain_text", "text": "Empreendimento"}
-                },
-                {
-                    "type": "input",
-                    "block_id": "unidade_metragem",
-                    "element": {
-                        "type": "plain_text_input",
-                        "action_id": "value",
-                        "initial_value": chamado.unidade_metragem
-                    },
-                    "label": {"type": "plain_text", "text": "Unidade e Metragem"}
-                },
-                {
-                    "type": "input",
-                    "block_id": "valor_locacao",
-                    "element": {
-                        "type": "plain_text_input",
-                        "action_id": "value",
-                        "initial_value": str(chamado.valor_locacao or "")
-                    },
-                    "label": {"type": "plain_text", "text": "Valor da Locação"}
-                }
-            ]
-        }
-    )
+    client.views_open(trigger_id=trigger_id, view=montar_view_edicao(chamado, thread_ts))
 
-# ♻️ Reabrir chamado
-from deepdiff import DeepDiff
+async def abrir_modal_edicao_async(client, trigger_id, thread_ts):
+    async with AsyncSessionLocal() as session:
+        chamado = await _buscar_por_thread_async(session, thread_ts)
+    if not chamado:
+        return
+
+    await client.views_open(trigger_id=trigger_id, view=montar_view_edicao(chamado, thread_ts))
 
-def reabrir_chamado(client, body, view):
+# ♻️ Reabrir chamado
+CAMPOS_REABERTURA = ["tipo_ticket", "status", "responsavel", "data_captura", "data_fechamento"]
+
+def valores_reabertura(novo_tipo, nome_real, agora):
+    return {
+        "tipo_ticket": novo_tipo,
+        "data_captura": None,
+        "data_fechamento": None,
+        "responsavel": None,
+        "historico_reaberturas": f"[{agora}] {nome_real} reabriu para *{novo_tipo}*\n",
+    }
+
+# Comparar e gerar log de alterações
+def log_reabertura(antes, depois):
+    return diff_campos.como_texto(diff_campos.diferencas(antes, depois, CAMPOS_REABERTURA))
+
+# `nome_real` vem de get_nome_slack (ou get_nome_slack_async)
+def pedido_reabertura(body, view, nome_real):
     novo_tipo = view["state"]["values"]["novo_tipo_ticket"]["value"]["selected_option"]["value"]
     ts = view["private_metadata"]
     user_id = body["user"]["id"]
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    db = SessionLocal()
-    chamado = db.query(OrdemServico).filter(OrdemServico.thread_ts == ts).first()
-
-    if chamado:
-        # Salvar o estado anterior
-        estado_anterior = {
-            "tipo_ticket": chamado.tipo_ticket,
-            "status": chamado.status,
-            "responsavel": chamado.responsavel,
-            "data_captura": chamado.data_captura,
-            "data_fechamento": chamado.data_fechamento
+    def extras(resultado):
+        return {
+            "nome": nome_real, "tipo_ticket": novo_tipo,
+            "resumo": log_reabertura(resultado.antes, resultado.depois).strip(),
         }
 
-        # Aplicar alterações da reabertura
-        chamado.tipo_ticket = novo_tipo
-        chamado.status = "aberto"
-        chamado.data_captura = None
-        chamado.data_fechamento = None
-        chamado.responsavel = None
-
-        # Salvar o novo estado
-        estado_novo = {
-            "tipo_ticket": chamado.tipo_ticket,
-            "status": chamado.status,
-            "responsavel": chamado.responsavel,
-            "data_captura": chamado.data_captura,
-            "data_fechamento": chamado.data_fechamento
-        }
+    def responder(resultado):
+        if resultado.codigo != transicoes.OK:
+            return [_efemera(
+                os.getenv("SLACK_CANAL_CHAMADOS", "#comercial"), user_id, "❌ Chamado não encontrado para reabertura."
+            )]
+        depois = resultado.depois
+        if depois["sla_status"] == "dentro do prazo":
+            agendador.agendar(depois["thread_ts"], depois["sla_limite"])
+        return [_na_thread(
+            depois["canal_id"], depois["thread_ts"],
+            f"♻️ Chamado reaberto por <@{user_id}>!\nNovo Tipo de Ticket: *{novo_tipo}*"
+        )]
+
+    return PedidoTransicao(
+        eventos.REABRIR, ts, valores_reabertura(novo_tipo, nome_real, now), user_id, extras, responder
+    )
 
-        # Comparar e gerar log de alterações
-        diferencas = DeepDiff(estado_anterior, estado_novo, ignore_order=True).to_dict()
-        log = ""
-        if "values_changed" in diferencas:
-            for campo, detalhe in diferencas["values_changed"].items():
-                campo_nome = campo.split("['")[-1].replace("']", "")
-                valor_antigo = detalhe['old_value']
-                valor_novo = detalhe['new_value']
-                log += f"• {campo_nome}: '{valor_antigo}' ➝ '{valor_novo}'\n"
-
-        # Histórico + log
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        nome_real = get_nome_slack(user_id)
-        historico = f"[{now}] {nome_real} reabriu para *{novo_tipo}*\n"
-        chamado.historico_reaberturas = historico
-        if log:
-            chamado.log_edicoes = (chamado.log_edicoes or "") + f"[{now}] {nome_real} alterou campos:\n{log}\n"
-
-        canal_id = chamado.canal_id
-        thread_ts = chamado.thread_ts
+# ✏️ Editar chamado: aplica os campos e o evento na sessão; o commit só
+# acontece depois que a mensagem da thread foi atualizada no Slack
+def nao_encontrado_edicao(user_id):
+    return _efemera(user_id, user_id, "❌ Não foi possível editar. Chamado não encontrado.")
 
-        db.commit()
-        db.close()
+def editar_na_sessao(chamado, campos, nome_editor):
+    return {"editor": nome_editor, "alteracoes": aplicar_edicao(chamado, campos, nome_editor)}
 
-        client.chat_postMessage(
-            channel=canal_id,
-            thread_ts=thread_ts,
-            text=f"♻️ Chamado reaberto por <@{user_id}>!\nNovo Tipo de Ticket: *{novo_tipo}*"
-        )
-    else:
+def respostas_edicao(chamado, user_id):
+    canal = chamado.canal_id or os.getenv("SLACK_CANAL_CHAMADOS", "#comercial")
+    texto, blocos = mensagem_chamado_editado(chamado)
+    return [
+        ("chat.update", {"channel": canal, "ts": chamado.thread_ts, "text": texto, "blocks": blocos}),
+        _na_thread(canal, chamado.thread_ts, f"✏️ Chamado editado com sucesso por <@{user_id}>."),
+    ]
+
+def falha_edicao(chamado, user_id, erro):
+    print(f"❌ Erro ao atualizar mensagem no Slack: {erro}")
+    return _efemera(
+        chamado.canal_id or os.getenv("SLACK_CANAL_ID", "C06TTKNEBHA"), user_id,
+        "❌ Ocorreu um erro ao atualizar a mensagem da thread."
+    )
+
+def editar_chamado(client, body, view):
+    ts = view["private_metadata"]
+    user_id = body["user"]["id"]
+    campos = ler_formulario_edicao(view["state"]["values"])
+    nome_editor = get_nome_slack(user_id) or user_id
+
+    db = SessionLocal()
+    try:
+        chamado = _buscar_por_thread(db, ts)
+        if not chamado:
+            enviar_respostas(client, [nao_encontrado_edicao(user_id)])
+            return
+
+        eventos.registrar(db, chamado.id, eventos.EDITAR, user_id, editar_na_sessao(chamado, campos, nome_editor))
+        try:
+            enviar_respostas(client, respostas_edicao(chamado, user_id), aguardar=True)
+            db.commit()
+        except Exception as e:
+            enviar_respostas(client, [falha_edicao(chamado, user_id, e)])
+    finally:
         db.close()
-        client.chat_postEphemeral(
-            channel=os.getenv("SLACK_CANAL_CHAMADOS", "#comercial"),
-            user=user_id,
-            text="❌ Chamado não encontrado para reabertura."
+
+async def editar_chamado_async(client, body, view):
+    ts = view["private_metadata"]
+    user_id = body["user"]["id"]
+    campos = ler_formulario_edicao(view["state"]["values"])
+    nome_editor = await get_nome_slack_async(client, user_id) or user_id
+
+    async with AsyncSessionLocal() as session:
+        chamado = await _buscar_por_thread_async(session, ts)
+        if not chamado:
+            await enviar_respostas_async(client, [nao_encontrado_edicao(user_id)])
+            return
+
+        await eventos.registrar_async(
+            session, chamado.id, eventos.EDITAR, user_id, editar_na_sessao(chamado, campos, nome_editor)
         )
+        try:
+            await enviar_respostas_async(client, respostas_edicao(chamado, user_id))
+            await session.commit()
+        except Exception as e:
+            await enviar_respostas_async(client, [falha_edicao(chamado, user_id, e)])
 
 def ajustar_historico(texto):
     if not texto:
         return "–"
+    diretorio.aquecer(client_slack)
     palavras = texto.split()
     for palavra in palavras:
         if palavra.startswith("<@") and palavra.endswith(">"):
@@ -673,82 +1085,6 @@ def ajustar_historico(texto):
             texto = texto.replace(palavra, nome)
     return texto
 
-# 📦 Modal de exportação com filtro por data e tipo
-def montar_blocos_exportacao():
-    return [
-        {
-            "type": "input",
-            "block_id": "tipo_arquivo",
-            "label": {
-                "type": "plain_text",
-                "text": "Formato do Arquivo"
-            },
-            "element": {
-                "type": "static_select",
-                "action_id": "value",
-                "placeholder": {
-                    "type": "plain_text",
-                    "text": "Escolha o formato"
-                },
-                "options": [
-                    {
-                        "text": {
-                            "type": "plain_text",
-                            "text": "PDF"
-                        },
-                        "value": "pdf"
-                    },
-                    {
-                        "text": {
-                            "type": "plain_text",
-                            "text": "CSV"
-                        },
-                        "value": "csv"
-                    },
-                    {
-                        "text": {
-                            "type": "plain_text",
-                            "text": "Excel"
-                        },
-                        "value": "xlsx"
-                    }
-                ]
-            }
-        },
-        {
-            "type": "input",
-            "block_id": "data_inicio",
-            "label": {
-                "type": "plain_text",
-                "text": "Data Inicial"
-            },
-            "element": {
-                "type": "datepicker",
-                "action_id": "value",
-                "placeholder": {
-                    "type": "plain_text",
-                    "text": "Escolha a data inicial"
-                }
-            }
-        },
-        {
-            "type": "input",
-            "block_id": "data_fim",
-            "label": {
-                "type": "plain_text",
-                "text": "Data Final"
-            },
-            "element": {
-                "type": "datepicker",
-                "action_id": "value",
-                "placeholder": {
-                    "type": "plain_text",
-                    "text": "Escolha a data final"
-                }
-            }
-        }
-    ]
-
 # 🔧 Resolvedor de nome (antes da função principal)
 def resolver_nome(id_ou_grupo):
     if not id_ou_grupo:
@@ -757,38 +1093,9 @@ def resolver_nome(id_ou_grupo):
         return "Reservas"
     return get_nome_slack(id_ou_grupo)
     
-def enviar_relatorio_xlsx(client, user_id, data_inicio=None, data_fim=None):
-    chamados = buscar_chamados(data_inicio, data_fim)
-
-    if not chamados:
-        client.chat_postEphemeral(channel=user_id, user=user_id, text="❌ Nenhum chamado encontrado para exportar.")
-        return
-
-    agora = datetime.now().strftime("%Y%m%d")
-    caminho = f"/tmp/chamados_{agora}.xlsx"
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Chamados"
-
-    headers = [
-        "ID", "Tipo", "Contrato", "Locatário", "Moradores", "Empreendimento", "Unidade",
-        "Data Entrada", "Data Saída", "Valor", "Responsável", "Capturado Por", "Solicitante",
-        "Status", "Aberto em", "SLA", "Histórico Reaberturas"
-    ]
-    ws.append(headers)
-
-    bold = Font(bold=True)
-    center = Alignment(horizontal="center", vertical="center")
-
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = bold
-        cell.alignment = center
-        ws.column_dimensions[get_column_letter(col_num)].width = 18
-
+def linhas_xlsx(chamados):
     for c in chamados:
-        ws.append([
+        yield [
             c.id,
             c.tipo_ticket or "–",
             c.tipo_contrato or "–",
@@ -806,17 +1113,30 @@ def enviar_relatorio_xlsx(client, user_id, data_inicio=None, data_fim=None):
             c.data_abertura.strftime("%d/%m/%Y") if c.data_abertura else "–",
             c.sla_status or "–",
             c.historico_reaberturas or "–"
-        ])
+        ]
 
-    wb.save(caminho)
+def enviar_relatorio_xlsx(client, user_id, data_inicio=None, data_fim=None, progresso=None, guardar=None):
+    chamados = iterar_chamados(data_inicio, data_fim)
+    primeiro = next(chamados, None)
 
-    response = client.conversations_open(users=user_id)
-    channel_id = response["channel"]["id"]
+    if primeiro is None:
+        return 0  # a fila de exportação avisa o usuário
 
-    client.files_upload_v2(
-        channel=channel_id,
-        file=caminho,
-        title=f"Relatório de Chamados - {agora}.xlsx",
-        initial_comment="📎 Aqui está seu relatório em Excel."
-    )
-    
+    agora = datetime.now().strftime("%Y%m%d")
+    diretorio.aquecer(client)
+
+    import relatorio_xlsx
+
+    total = [0]
+    with novo_buffer() as buffer:
+        relatorio_xlsx.escrever_xlsx(
+            linhas_xlsx(com_progresso(itertools.chain([primeiro], chamados), progresso, contador=total)), buffer
+        )
+        enviar_buffer(
+            client, user_id, buffer,
+            filename=f"chamados_{agora}.xlsx",
+            title=f"Relatório de Chamados - {agora}.xlsx",
+            initial_comment="📎 Aqui está seu relatório em Excel.",
+            guardar=guardar
+        )
+    return total[0]
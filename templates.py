@@ -0,0 +1,384 @@
+# 🧩 Registro de templates Block Kit
+#
+# As views estáticas e as fileiras de botões são montadas uma única vez na
+# importação (listas viram tuplas; o json do Slack serializa tuplas como
+# arrays). Na hora de responder, só os campos do chamado são preenchidos,
+# reaproveitando os blocos estáticos por referência.
+# Os dicts continuam dicts comuns (o WebClient serializa com json.dumps, que
+# não aceita MappingProxyType) e são compartilhados entre todas as respostas:
+# nunca altere os objetos devolvidos por este módulo; copie antes.
+
+TIPOS_TICKET = [
+    "Lista de Espera", "Pré bloqueio", "Reserva", "Aditivo", "Prorrogação",
+    "Saída Antecipada", "Saída Confirmada", "Background Check", "Fatura",
+]
+EMPREENDIMENTOS = ["JFL125", "JML747", "VO699", "VHOUSE", "AVNU"]
+TIPOS_CONTRATO = ["Short Stay", "Temporada", "Long Stay", "Comodato"]
+RESPONSAVEIS = [
+    ("Rigol", "U06TZRECVC4"),
+    ("Gina", "U0B109PABN0"),
+    ("Victor", "U07B2130TKQ"),
+    ("Gabriel", "U06TNKNRZHT"),
+    ("Douglas", "U08ANPS7V7Y"),
+    ("Reservas", "S08STJCNMHR"),
+]
+FORMATOS_EXPORTACAO = [("PDF", "pdf"), ("CSV", "csv"), ("Excel", "xlsx")]
+STATUS_LOTE = ["aberto", "em análise"]  # status de origem das ações em lote (lote.ACOES)
+ACOES_LOTE = [
+    ("🔄 Capturar", "capturar"),
+    ("✅ Finalizar", "finalizar"),
+    ("❌ Cancelar", "cancelar"),
+    ("👤 Reatribuir", "reatribuir"),
+]
+
+
+def _texto(texto):
+    return {"type": "plain_text", "text": texto}
+
+
+def _opcao(texto, valor=None):
+    return {"text": _texto(texto), "value": texto if valor is None else valor}
+
+
+def _tuplas(obj):
+    if isinstance(obj, dict):
+        return {k: _tuplas(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return tuple(_tuplas(v) for v in obj)
+    return obj
+
+
+# 🏗️ Construtores (rodam uma vez; também servem de linha de base no bench)
+def construir_blocos_abertura():
+    return [
+        {
+            "type": "input",
+            "block_id": "tipo_ticket",
+            "element": {
+                "type": "static_select",
+                "action_id": "value",
+                "placeholder": _texto("Escolha"),
+                "options": [_opcao(opt) for opt in TIPOS_TICKET],
+            },
+            "label": _texto("Tipo de Ticket")
+        },
+        {
+            "type": "input",
+            "block_id": "locatario",
+            "element": {"type": "plain_text_input", "action_id": "value"},
+            "label": _texto("Locatário")
+        },
+        {
+            "type": "input",
+            "block_id": "empreendimento",
+            "element": {
+                "type": "static_select",
+                "action_id": "value",
+                "placeholder": _texto("Escolha"),
+                "options": [_opcao(opt) for opt in EMPREENDIMENTOS],
+            },
+            "label": _texto("Empreendimento")
+        },
+        {
+            "type": "input",
+            "block_id": "unidade_metragem",
+            "element": {"type": "plain_text_input", "action_id": "value", "max_length": 10},
+            "label": _texto("Unidade")
+        },
+        {
+            "type": "input",
+            "block_id": "numero_reserva",
+            "element": {"type": "plain_text_input", "action_id": "value", "max_length": 16},
+            "label": _texto("Número da Reserva")
+        },
+        {
+            "type": "input",
+            "block_id": "responsavel",
+            "element": {
+                "type": "static_select",
+                "action_id": "value",
+                "placeholder": _texto("Escolha um responsável"),
+                "options": [_opcao(nome, user_id) for nome, user_id in RESPONSAVEIS]
+            },
+            "label": _texto("Responsável")
+        }
+    ]
+
+
+def construir_blocos_exportacao():
+    return [
+        {
+            "type": "input",
+            "block_id": "tipo_arquivo",
+            "label": _texto("Formato do Arquivo"),
+            "element": {
+                "type": "static_select",
+                "action_id": "value",
+                "placeholder": _texto("Escolha o formato"),
+                "options": [_opcao(nome, valor) for nome, valor in FORMATOS_EXPORTACAO]
+            }
+        },
+        {
+            "type": "input",
+            "block_id": "data_inicio",
+            "label": _texto("Data Inicial"),
+            "element": {
+                "type": "datepicker",
+                "action_id": "value",
+                "placeholder": _texto("Escolha a data inicial")
+            }
+        },
+        {
+            "type": "input",
+            "block_id": "data_fim",
+            "label": _texto("Data Final"),
+            "element": {
+                "type": "datepicker",
+                "action_id": "value",
+                "placeholder": _texto("Escolha a data final")
+            }
+        }
+    ]
+
+
+def construir_view_abertura():
+    return {
+        "type": "modal",
+        "callback_id": "modal_abertura_chamado",
+        "title": _texto("Novo Chamado"),
+        "submit": _texto("Abrir"),
+        "blocks": construir_blocos_abertura()
+    }
+
+
+def construir_view_exportacao(user_id):
+    return {
+        "type": "modal",
+        "callback_id": "escolher_exportacao",
+        "title": _texto("Exportar Chamados"),
+        "submit": _texto("Exportar"),
+        "private_metadata": user_id,
+        "blocks": construir_blocos_exportacao()
+    }
+
+
+def construir_view_reabertura(ts):
+    return {
+        "type": "modal",
+        "callback_id": "reabrir_chamado_modal",
+        "title": _texto("Reabrir Chamado"),
+        "submit": _texto("Salvar"),
+        "private_metadata": ts,
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "novo_tipo_ticket",
+                "element": {
+                    "type": "static_select",
+                    "action_id": "value",
+                    "placeholder": _texto("Escolha o novo tipo de ticket"),
+                    "options": [_opcao(opt) for opt in TIPOS_TICKET]
+                },
+                "label": _texto("Novo Tipo de Ticket")
+            }
+        ]
+    }
+
+
+def construir_view_cancelamento(ts):
+    return {
+        "type": "modal",
+        "callback_id": "cancelar_chamado_modal",
+        "title": _texto("Cancelar Chamado"),
+        "submit": _texto("Confirmar"),
+        "private_metadata": ts,
+        "blocks": [{
+            "type": "input",
+            "block_id": "motivo",
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "value",
+                "multiline": True,
+                "placeholder": _texto("Descreva o motivo do cancelamento")
+            },
+            "label": _texto("Motivo do Cancelamento")
+        }]
+    }
+
+
+def _select_opcional(block_id, rotulo, opcoes, multiplo=False):
+    return {
+        "type": "input",
+        "block_id": block_id,
+        "optional": True,
+        "element": {
+            "type": "multi_static_select" if multiplo else "static_select",
+            "action_id": "value",
+            "placeholder": _texto("Qualquer"),
+            "options": opcoes,
+        },
+        "label": _texto(rotulo)
+    }
+
+
+def construir_view_lote(canal_id):
+    return {
+        "type": "modal",
+        "callback_id": "lote_chamados_modal",
+        "title": _texto("Chamados em Lote"),
+        "submit": _texto("Aplicar"),
+        "private_metadata": canal_id,
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "acao",
+                "element": {
+                    "type": "static_select",
+                    "action_id": "value",
+                    "placeholder": _texto("Escolha a ação"),
+                    "options": [_opcao(nome, valor) for nome, valor in ACOES_LOTE]
+                },
+                "label": _texto("Ação")
+            },
+            {"type": "section", "text": {"type": "mrkdwn", "text": "*Filtros* (ao menos um)"}},
+            _select_opcional("empreendimento", "Empreendimento", [_opcao(opt) for opt in EMPREENDIMENTOS]),
+            _select_opcional("responsavel", "Responsável atual", [_opcao(nome, user_id) for nome, user_id in RESPONSAVEIS]),
+            _select_opcional("status", "Status", [_opcao(opt) for opt in STATUS_LOTE], multiplo=True),
+            {
+                "type": "input",
+                "block_id": "idade_dias",
+                "optional": True,
+                "element": {"type": "number_input", "action_id": "value", "is_decimal_allowed": False, "min_value": "0"},
+                "label": _texto("Abertos há pelo menos (dias)")
+            },
+            {"type": "divider"},
+            _select_opcional("novo_responsavel", "Novo responsável (reatribuir)", [_opcao(nome, user_id) for nome, user_id in RESPONSAVEIS]),
+            {
+                "type": "input",
+                "block_id": "motivo",
+                "optional": True,
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "value",
+                    "multiline": True,
+                    "placeholder": _texto("Obrigatório para cancelar")
+                },
+                "label": _texto("Motivo do Cancelamento")
+            },
+        ]
+    }
+
+
+def construir_botoes(editavel=False):
+    botoes = [
+        {"type": "button", "text": _texto("🔄 Capturar"), "action_id": "capturar_chamado"},
+        {"type": "button", "text": _texto("✅ Finalizar"), "action_id": "finalizar_chamado"},
+        {"type": "button", "text": _texto("♻️ Reabrir"), "action_id": "reabrir_chamado"},
+        {"type": "button", "text": _texto("❌ Cancelar"), "action_id": "cancelar_chamado"},
+    ]
+    if editavel:
+        botoes.append({"type": "button", "text": _texto("✏️ Editar"), "action_id": "editar_chamado"})
+    return {"type": "actions", "elements": botoes}
+
+
+# 🧊 Estruturas pré-montadas
+BLOCOS_ABERTURA = _tuplas(construir_blocos_abertura())
+BLOCOS_EXPORTACAO = _tuplas(construir_blocos_exportacao())
+VIEW_ABERTURA = _tuplas(construir_view_abertura())
+_VIEW_EXPORTACAO = _tuplas(construir_view_exportacao(None))
+_VIEW_REABERTURA = _tuplas(construir_view_reabertura(None))
+_VIEW_CANCELAMENTO = _tuplas(construir_view_cancelamento(None))
+_VIEW_LOTE = _tuplas(construir_view_lote(None))
+_ACOES_CHAMADO = _tuplas(construir_botoes(editavel=False))
+_ACOES_CHAMADO_EDITAVEL = _tuplas(construir_botoes(editavel=True))
+
+_EDICAO_TITULO = _texto("Editar Chamado")
+_EDICAO_SALVAR = _texto("Salvar")
+_PLACEHOLDER_ESCOLHA = _texto("Escolha")
+_OPCOES_CONTRATO = _tuplas([_opcao(opt) for opt in TIPOS_CONTRATO])
+_OPCOES_EMPREENDIMENTO = _tuplas([_opcao(opt) for opt in EMPREENDIMENTOS])
+_ROTULOS_EDICAO = {
+    "tipo_contrato": _texto("Tipo de Contrato"),
+    "locatario": _texto("Locatário"),
+    "moradores": _texto("Moradores"),
+    "empreendimento": _texto("Empreendimento"),
+    "unidade_metragem": _texto("Unidade e Metragem"),
+    "valor_locacao": _texto("Valor da Locação"),
+}
+
+
+# 🖨️ Renderização: só os campos do chamado são alocados
+def render_view_exportacao(user_id):
+    return dict(_VIEW_EXPORTACAO, private_metadata=user_id)
+
+
+def render_view_reabertura(ts):
+    return dict(_VIEW_REABERTURA, private_metadata=ts)
+
+
+def render_view_cancelamento(ts):
+    return dict(_VIEW_CANCELAMENTO, private_metadata=ts)
+
+
+def render_view_lote(canal_id):
+    return dict(_VIEW_LOTE, private_metadata=canal_id)
+
+
+def _input_texto(block_id, valor, rotulo):
+    return {
+        "type": "input",
+        "block_id": block_id,
+        "element": {"type": "plain_text_input", "action_id": "value", "initial_value": valor},
+        "label": rotulo
+    }
+
+
+def render_view_edicao(chamado, thread_ts):
+    return {
+        "type": "modal",
+        "callback_id": "editar_chamado_modal",
+        "title": _EDICAO_TITULO,
+        "submit": _EDICAO_SALVAR,
+        "private_metadata": thread_ts,
+        "blocks": (
+            {
+                "type": "section",
+                "block_id": "tipo_ticket",
+                "text": {"type": "mrkdwn", "text": f"*Tipo de Ticket:* `{chamado.tipo_ticket}` (não editável)"}
+            },
+            {
+                "type": "input",
+                "block_id": "tipo_contrato",
+                "element": {
+                    "type": "static_select",
+                    "placeholder": _PLACEHOLDER_ESCOLHA,
+                    "options": _OPCOES_CONTRATO,
+                    "initial_option": _opcao(chamado.tipo_contrato) if chamado.tipo_contrato else None
+                },
+                "label": _ROTULOS_EDICAO["tipo_contrato"]
+            },
+            _input_texto("locatario", chamado.locatario, _ROTULOS_EDICAO["locatario"]),
+            _input_texto("moradores", chamado.moradores, _ROTULOS_EDICAO["moradores"]),
+            {
+                "type": "input",
+                "block_id": "empreendimento",
+                "element": {
+                    "type": "static_select",
+                    "action_id": "value",
+                    "placeholder": _PLACEHOLDER_ESCOLHA,
+                    "options": _OPCOES_EMPREENDIMENTO,
+                    "initial_option": _opcao(chamado.empreendimento) if chamado.empreendimento else None
+                },
+                "label": _ROTULOS_EDICAO["empreendimento"]
+            },
+            _input_texto("unidade_metragem", chamado.unidade_metragem, _ROTULOS_EDICAO["unidade_metragem"]),
+            _input_texto("valor_locacao", str(chamado.valor_locacao or ""), _ROTULOS_EDICAO["valor_locacao"]),
+        )
+    }
+
+
+def render_mensagem_chamado(texto, editavel=False):
+    return (
+        {"type": "section", "text": {"type": "mrkdwn", "text": texto}},
+        _ACOES_CHAMADO_EDITAVEL if editavel else _ACOES_CHAMADO,
+    )
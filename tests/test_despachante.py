@@ -0,0 +1,115 @@
+import contextvars
+import time
+
+import pytest
+from slack_sdk import WebClient
+
+from bench.slack_falso import ServidorSlackFalso
+from despachante import Despachante, PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE
+
+# 🧪 Despachante contra a Web API falsa (bench/slack_falso.py)
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSlackFalso().iniciar()
+    yield servidor
+    servidor.parar()
+
+
+@pytest.fixture
+def client(servidor):
+    return WebClient(token="xoxb-teste", base_url=servidor.url_api)
+
+
+def postagens(servidor, status=200):
+    return [(t, args) for t, metodo, args, s in servidor.registro if metodo == "chat.postMessage" and s == status]
+
+
+def test_retry_after_bloqueia_so_o_balde_afetado(servidor, client):
+    despachante = Despachante(workers=2)
+    servidor.limitar("chat.postMessage", vezes=1, retry_after=1)
+
+    inicio = time.monotonic()
+    limitado = despachante.enviar(client, "chat.postMessage", channel="C1", text="a")
+    time.sleep(0.1)  # o 429 chega antes do envio no outro canal
+    livre = despachante.enviar(client, "chat.postMessage", channel="C2", text="b")
+
+    assert livre.result(timeout=5)["ok"]
+    assert time.monotonic() - inicio < 0.9
+    assert limitado.result(timeout=5)["ok"]
+    assert time.monotonic() - inicio >= 1.0
+    assert len(postagens(servidor, 429)) == 1
+    assert despachante.metricas()["contadores"]["retries_429"] == 1
+
+
+def test_ritmo_por_canal(servidor, client):
+    # 10 por segundo, rajada de 2: a 3ª mensagem do canal espera ~0,1 s
+    despachante = Despachante(workers=2, limites={"chat.postMessage": (10.0, 2)})
+
+    futuros = [despachante.enviar(client, "chat.postMessage", channel=canal, text=str(i))
+               for i in range(6) for canal in ("C1", "C2")]
+    for futuro in futuros:
+        futuro.result(timeout=5)
+
+    for canal in ("C1", "C2"):
+        instantes = [t for t, args in postagens(servidor) if args["channel"] == canal]
+        assert len(instantes) == 6
+        # Depois da rajada, uma por token: 4 tokens a 10/s levam ~0,4 s
+        assert instantes[-1] - instantes[0] >= 0.35
+        assert all(b - a >= 0.08 for a, b in zip(instantes[2:], instantes[3:]))
+    # Canais independentes: a rajada de C2 não espera pelo C1
+    primeiros = {canal: min(t for t, args in postagens(servidor) if args["channel"] == canal) for canal in ("C1", "C2")}
+    assert abs(primeiros["C1"] - primeiros["C2"]) < 0.05
+
+
+def test_interativa_passa_na_frente_do_lote(servidor, client):
+    despachante = Despachante(workers=1, limites={"chat.postMessage": (5.0, 1)})
+
+    # O primeiro lote leva o único token; os outros esperam no balde
+    despachante.enviar(client, "chat.postMessage", PRIORIDADE_LOTE, channel="C1", text="lote 0").result(timeout=5)
+    futuros = [despachante.enviar(client, "chat.postMessage", PRIORIDADE_LOTE, channel="C1", text=f"lote {i}")
+               for i in range(1, 4)]
+    futuros.append(despachante.enviar(client, "chat.postMessage", PRIORIDADE_INTERATIVA,
+                                      channel="C1", text="interativa"))
+    for futuro in futuros:
+        futuro.result(timeout=5)
+
+    textos = [args["text"] for _, args in postagens(servidor)]
+    assert textos == ["lote 0", "interativa", "lote 1", "lote 2", "lote 3"]
+    assert despachante.metricas()["aguardando_limite"] == 0
+
+
+def test_adiados_nao_giram_em_loop(servidor, client):
+    despachante = Despachante(workers=1, limites={"chat.postMessage": (2.0, 1)})
+    reservas = []
+    reservar = despachante._reservar
+
+    def contar(pedido):
+        reservas.append(pedido)
+        return reservar(pedido)
+
+    despachante._reservar = contar
+    futuros = [despachante.enviar(client, "chat.postMessage", channel="C1", text=str(i)) for i in range(3)]
+    for futuro in futuros:
+        futuro.result(timeout=5)
+
+    # Cada pedido tenta o token uma vez; depois espera no balde até o despertar
+    assert len(reservas) == 3
+
+
+def test_contexto_de_quem_enviou(servidor, client):
+    despachante = Despachante(workers=1)
+    execucao = contextvars.ContextVar("execucao", default=None)
+    vistos = []
+    api_call = client.api_call
+
+    def gravar(*args, **kwargs):
+        vistos.append(execucao.get())
+        return api_call(*args, **kwargs)
+
+    client.api_call = gravar
+    execucao.set("listener")
+    despachante.enviar(client, "chat.postMessage", channel="C1", text="a").result(timeout=5)
+
+    assert vistos == ["listener"]
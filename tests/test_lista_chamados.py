@@ -0,0 +1,92 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+# 🧪 /minhas-os-comercial paginado contra um Postgres de teste
+# (TEST_DATABASE_URL; o banco recebe as migrações e chamados de um solicitante novo)
+
+URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not URL, reason="TEST_DATABASE_URL não definido")
+
+
+@pytest.fixture(scope="module")
+def lista():
+    os.environ["DATABASE_URL"] = URL
+    import migracoes
+    import lista_chamados
+
+    migracoes.aplicar()
+    return lista_chamados
+
+
+@pytest.fixture
+def solicitante(lista):
+    from database import engine
+    from sqlalchemy import text
+
+    user_id = "U" + uuid.uuid4().hex[:10].upper()
+    base = datetime(2024, 1, 1)
+    chamados = [
+        ("aberto", base), ("cancelado", base + timedelta(days=3)), ("fechado", base + timedelta(days=1)),
+        ("em análise", base + timedelta(days=2)), ("cancelado", base + timedelta(days=1)), ("aberto", None),
+        ("fechado", base + timedelta(days=4)), ("cancelado", None), ("pendente", base), ("em análise", base),
+    ]
+    with engine.begin() as conn:
+        for status, abertura in chamados:
+            conn.execute(text(
+                "INSERT INTO ordens_servico (solicitante, status, data_abertura, empreendimento, tipo_ticket) "
+                "VALUES (:u, :s, :d, 'AVNU', 'Reserva')"
+            ), {"u": user_id, "s": status, "d": abertura})
+    yield user_id
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM ordens_servico WHERE solicitante = :u"), {"u": user_id})
+
+
+def esperado(lista, user_id):
+    from database import engine
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        linhas = conn.execute(text(
+            "SELECT id, status, data_abertura FROM ordens_servico WHERE solicitante = :u AND status <> 'pendente'"
+        ), {"u": user_id}).all()
+    return [l.id for l in sorted(linhas, key=lambda l: (
+        lista.STATUS_LISTA.index(l.status), -(l.data_abertura or lista.ABERTURA_NULA).timestamp(), -l.id
+    ))]
+
+
+def test_cancelados_entram_na_lista_em_ordem(lista, solicitante):
+    estado = dict(lista.estado_padrao(), n=5)
+
+    paginas, cursor = [], None
+    while True:
+        linhas, _, tem_proxima = lista.buscar_pagina(solicitante, estado, cursor)
+        paginas.append(linhas)
+        if not tem_proxima:
+            break
+        cursor = lista._chave(linhas[-1])
+
+    assert [l.id for p in paginas for l in p] == esperado(lista, solicitante)
+    assert [len(p) for p in paginas] == [5, 4]
+    assert [l.status for l in paginas[1]][-3:] == ["cancelado"] * 3
+
+    # Voltando da segunda página chega-se à primeira
+    anterior, tem_anterior, _ = lista.buscar_pagina(solicitante, estado, lista._chave(paginas[1][0]), lista.ANTERIOR)
+    assert [l.id for l in anterior] == [l.id for l in paginas[0]]
+    assert not tem_anterior
+
+
+def test_filtro_cancelado(lista, solicitante):
+    estado = dict(lista.estado_padrao(), s="cancelado")
+    linhas, _, _ = lista.buscar_pagina(solicitante, estado)
+    assert [l.status for l in linhas] == ["cancelado"] * 3
+    assert "Cancelados" in lista.render_pagina(estado, linhas, False, False)["blocks"][3]["text"]["text"]
+
+
+def test_indice_da_lista(lista):
+    import migracoes
+
+    resultado = {nome: ok for nome, _, ok, _ in migracoes.verificar_indices()}
+    assert resultado["lista do solicitante"]
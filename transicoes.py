@@ -0,0 +1,116 @@
+from collections import namedtuple
+
+from sqlalchemy import bindparam, text
+
+from database import engine
+
+# 🔁 Motor de transições de status com compare-and-set atômico
+#
+# Cada transição vira um único UPDATE condicional:
+#   UPDATE ... WHERE thread_ts = :ts AND status IN (origens) RETURNING ...
+# A CTE "alvo" lê a linha no mesmo comando, então uma transição recusada
+# volta com o status atual sem precisar de uma segunda consulta.
+
+OK = "ok"
+NAO_ENCONTRADO = "nao_encontrado"
+STATUS_INVALIDO = "status_invalido"
+CONFLITO = "conflito"  # outro clique alterou o chamado entre a leitura e a escrita
+
+# ação -> (status de origem permitidos, status de destino)
+# Chamado fechado ou cancelado só volta ao fluxo por "reabrir": finalizar um
+# cancelado (ou cancelar um fechado) reescreveria a data e o motivo do encerramento.
+TRANSICOES = {
+    "capturar": (("aberto",), "em análise"),
+    "finalizar": (("aberto", "em análise"), "fechado"),
+    "cancelar": (("aberto", "em análise"), "cancelado"),
+    "reabrir": (("aberto", "em análise", "fechado", "cancelado"), "aberto"),
+}
+
+COLUNAS_RETORNO = (
+    "id", "status", "tipo_ticket", "responsavel", "capturado_por", "solicitante",
+    "data_captura", "data_fechamento", "sla_limite", "sla_status", "canal_id", "thread_ts",
+)
+
+COLUNAS_EDITAVEIS = {
+    "responsavel", "capturado_por", "data_captura", "data_fechamento",
+    "tipo_ticket", "motivo_cancelamento", "historico_reaberturas",
+}
+
+ResultadoTransicao = namedtuple("ResultadoTransicao", ["codigo", "antes", "depois"])
+
+_cache_sql = {}
+
+
+def montar_sql(acao, colunas):
+    chave = (acao, tuple(colunas))
+    if chave in _cache_sql:
+        return _cache_sql[chave]
+
+    invalidas = set(colunas) - COLUNAS_EDITAVEIS
+    if invalidas:
+        raise ValueError(f"Colunas não editáveis por transição: {sorted(invalidas)}")
+
+    sets = "".join(f", {c} = :v_{c}" for c in colunas)
+    antes = ", ".join(f"o.{c} AS a_{c}" for c in COLUNAS_RETORNO)
+    depois = ", ".join(f"o.{c} AS d_{c}" for c in COLUNAS_RETORNO)
+    sql = text(f"""
+        WITH alvo AS (
+            SELECT {antes} FROM ordens_servico o WHERE o.thread_ts = :ts
+        ), alterado AS (
+            UPDATE ordens_servico o SET status = :novo_status{sets}
+            FROM alvo
+            WHERE o.id = alvo.a_id AND o.status IN :origens
+            RETURNING {depois}
+        )
+        SELECT alvo.*, alterado.* FROM alvo LEFT JOIN alterado ON alterado.d_id = alvo.a_id
+    """).bindparams(bindparam("origens", expanding=True))
+    _cache_sql[chave] = sql
+    return sql
+
+
+def parametros(acao, ts, valores):
+    origens, destino = TRANSICOES[acao]
+    params = {"ts": ts, "novo_status": destino, "origens": list(origens)}
+    params.update({f"v_{c}": v for c, v in valores.items()})
+    return params
+
+
+def interpretar(acao, linha):
+    if linha is None:
+        return ResultadoTransicao(NAO_ENCONTRADO, None, None)
+    dados = dict(linha._mapping)
+    antes = {c: dados[f"a_{c}"] for c in COLUNAS_RETORNO}
+    if dados.get("d_id") is None:
+        origens = TRANSICOES[acao][0]
+        codigo = CONFLITO if antes["status"] in origens else STATUS_INVALIDO
+        return ResultadoTransicao(codigo, antes, None)
+    depois = {c: dados[f"d_{c}"] for c in COLUNAS_RETORNO}
+    return ResultadoTransicao(OK, antes, depois)
+
+
+# 🚦 Executa a transição; `conexao` permite compor com outros comandos na mesma transação
+def transicionar(acao, ts, valores=None, conexao=None):
+    valores = valores or {}
+    sql = montar_sql(acao, list(valores))
+    params = parametros(acao, ts, valores)
+
+    if conexao is not None:
+        return interpretar(acao, conexao.execute(sql, params).first())
+
+    with engine.begin() as conn:
+        return interpretar(acao, conn.execute(sql, params).first())
+
+
+# 🔀 Versão asyncio (main_async.py)
+async def transicionar_async(acao, ts, valores=None, conexao=None):
+    from database import get_async_engine
+
+    valores = valores or {}
+    sql = montar_sql(acao, list(valores))
+    params = parametros(acao, ts, valores)
+
+    if conexao is not None:
+        return interpretar(acao, (await conexao.execute(sql, params)).first())
+
+    async with get_async_engine().begin() as conn:
+        return interpretar(acao, (await conn.execute(sql, params)).first())